@@ -18,6 +18,8 @@ a = Analysis(
         'requests',
         'fuzzywuzzy',
         'Levenshtein',
+        'rapidfuzz',
+        'scipy.optimize',
     ],
     hookspath=[],
     hooksconfig={},
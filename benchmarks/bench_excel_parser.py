@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel 方案解析基准测试
+对比 MedicalExamParser 当前实现与改写前基于 df.iterrows() 的状态机，
+以及整本读取与逐 Sheet 读取的 read_excel_data，校验输出完全一致，
+并输出各工作簿的耗时与峰值内存（tracemalloc）
+
+用法：python benchmarks/bench_excel_parser.py [xlsx ...] [-n 重复次数] [--engine calamine]
+"""
+
+import argparse
+import glob
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import excel_parser  # noqa: E402
+from excel_parser import MedicalExamParser, logger  # noqa: E402
+
+
+class LegacyMedicalExamParser(MedicalExamParser):
+    """保留改写前的逐行实现作为基准"""
+
+    def read_excel_data(self) -> None:
+        """改写前逐个 Sheet 调用 pd.read_excel 的实现，原样保留用于对比."""
+        xls = pd.ExcelFile(self.excel_file_path)
+        raw_sheet_names = xls.sheet_names
+        self.sheet_names_in_order = []
+        self.sheet_name_alias_map.clear()
+        if len(raw_sheet_names) == 1 and raw_sheet_names[0].strip().lower() == "sheet":
+            display_name = "方案"
+            self.sheet_names_in_order.append(display_name)
+            self.sheet_name_alias_map[display_name] = raw_sheet_names[0]
+        else:
+            for name in raw_sheet_names:
+                display_name = name.strip()
+                self.sheet_names_in_order.append(display_name)
+                self.sheet_name_alias_map[display_name] = name
+        for sheet_name in self.sheet_names_in_order:
+            actual_sheet_name = self.sheet_name_alias_map.get(sheet_name, sheet_name)
+            df = pd.read_excel(
+                xls,
+                sheet_name=actual_sheet_name,
+                header=None,
+                usecols=[0, 1, 2, 4, 5],
+                names=['项目名称', '子项目', '内容明细', '男', '女']
+            )
+            self.schemes_data[sheet_name] = self._clean_and_filter_projects(df, sheet_name) or []
+
+    def _clean_and_filter_projects(self, df: pd.DataFrame, sheet_name: str) -> List[Dict]:
+        """改写前基于 df.iterrows() 的实现，原样保留用于对比."""
+        projects = []
+        last_main_project_name = ""
+        last_added_package_name = ""
+        # 初始状态为通用
+        current_state = 'NORMAL'
+        data_started = False
+
+        for index, row in df.iterrows():
+            project_name_col_a = str(row['项目名称']).strip() if not pd.isna(row['项目名称']) else ''
+            sub_project_col_b = str(row['子项目']).strip() if not pd.isna(row['子项目']) else ''
+            details_col_c = str(row['内容明细']).strip() if not pd.isna(row['内容明细']) else ''
+
+            header_text = project_name_col_a.replace(" ", "")
+            if header_text == "项目或组合":
+                data_started = True
+                continue
+            if not data_started:
+                continue
+            
+            # 定义状态更新函数，识别区块标题
+            def update_state(text: str) -> str:
+                if '男性检查' in text: return 'MALE'
+                if '女未婚检查' in text: return 'FEMALE_UNMARRIED'
+                # '女已婚检查H' 必须在 '女已婚检查' 之前判断，以避免错误匹配
+                if '女已婚检查H' in text: return 'FEMALE_MARRIED_H'
+                if '女已婚检查' in text: return 'FEMALE_MARRIED'
+                if '女性检查' in text: return 'FEMALE_GENERIC'
+                # 标准早餐作为任何区块的结束标记
+                if '标准早餐' in text: return 'NORMAL'
+                return None
+
+            # 检查整行文本以更新状态，兼容标题独占一行或与项目同在一行的情况
+            full_row_text = f"{project_name_col_a} {sub_project_col_b}"
+            new_state = update_state(full_row_text)
+            if new_state:
+                current_state = new_state
+                logger.debug(f"State changed to {current_state} by text: '{full_row_text}'")
+
+            if project_name_col_a and '健康管理' in project_name_col_a:
+                logger.debug("Encountered '健康管理' section, stop processing further rows.")
+                break
+
+            # 如果当前行是纯标题行（A列有值，B/C列为空），则跳过，因为它只用于改变状态
+            is_pure_header = project_name_col_a and not sub_project_col_b and not details_col_c and update_state(project_name_col_a) is not None
+            if is_pure_header:
+                logger.debug(f"Skipping pure header row: {project_name_col_a}")
+                continue
+            
+            # 记录A列的主项目名称，并排除包含特定关键词的行
+            if project_name_col_a: last_main_project_name = project_name_col_a
+            if any(keyword in last_main_project_name for keyword in self.excluded_keywords): continue
+            
+            # 智能确定最终项目名称
+            final_name = ""
+            if any(keyword in last_main_project_name for keyword in self.package_keywords):
+                if last_main_project_name != last_added_package_name:
+                    final_name = last_main_project_name
+                    last_added_package_name = last_main_project_name
+                else: continue
+            elif sub_project_col_b: final_name = sub_project_col_b
+            elif project_name_col_a: final_name = project_name_col_a
+
+            if not final_name: continue
+            
+            # 清洗项目名称
+            final_name = final_name.replace(' ', '').replace('　', '').replace('（', '(').replace('）', ')')
+            # 排除标题行自身被当作项目
+            header_titles = ['男性检查', '女性检查', '女未婚检查', '女已婚检查', '女已婚检查H']
+            if final_name in header_titles or any(keyword in final_name for keyword in self.excluded_keywords): continue
+            
+            # --- 性别归属判断逻辑 (保留) ---
+            has_male_checkmark = str(row['男']).strip() == '√'
+            has_female_checkmark = str(row['女']).strip() == '√'
+            
+            is_for_male, is_for_female = False, False
+            # 1. 最高优先级：明确的 '√' 标记
+            if has_male_checkmark or has_female_checkmark:
+                is_for_male, is_for_female = has_male_checkmark, has_female_checkmark
+            # 2. 第二优先级：上下文状态推断
+            else:
+                if current_state == 'MALE': is_for_male = True
+                elif current_state in ['FEMALE_UNMARRIED', 'FEMALE_MARRIED', 'FEMALE_MARRIED_H', 'FEMALE_GENERIC']: is_for_female = True
+                # 3. 最低优先级：默认通用规则
+                elif current_state == 'NORMAL' and self.default_to_universal_if_no_checkmark: 
+                    is_for_male, is_for_female = True, True
+
+            # 基础项目信息字典，包含关键的 category_hint
+            base_project = {
+                'project_name': last_main_project_name, 
+                'sub_project': sub_project_col_b, 
+                'full_name': final_name, 
+                'details': details_col_c, 
+                'for_male': is_for_male, 
+                'for_female': is_for_female, 
+                'sheet_name': sheet_name, 
+                'row_index': index + 1,  # align with actual Excel row number (1-based)
+                'category_hint': current_state # 记录项目所属的区块
+            }
+
+            # 处理重命名规则
+            if final_name in self.rename_map:
+                new_names = self.rename_map[final_name]
+                for i, new_name in enumerate(new_names):
+                    if new_name == 'SELF': new_name = final_name
+                    new_project = base_project.copy()
+                    new_project['full_name'] = new_name
+                    new_project['row_index'] += i * 0.1 # 保持排序稳定性
+                    projects.append(new_project)
+                continue
+            
+            projects.append(base_project)
+        return projects
+
+
+def _load_sheets(parser: MedicalExamParser) -> Dict[str, pd.DataFrame]:
+    """预先读取全部 Sheet，使计时只覆盖行状态机本身"""
+    xls = pd.ExcelFile(parser.excel_file_path)
+    return {
+        name.strip(): pd.read_excel(
+            xls,
+            sheet_name=name,
+            header=None,
+            usecols=[0, 1, 2, 4, 5],
+            names=['项目名称', '子项目', '内容明细', '男', '女'],
+        )
+        for name in xls.sheet_names
+    }
+
+
+def _time_state_machine(parser: MedicalExamParser, sheets: Dict[str, pd.DataFrame], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sheet_name, df in sheets.items():
+            parser._clean_and_filter_projects(df, sheet_name)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _measure_read(
+    parser_cls: type, path: str, renames: List[List[str]], repeat: int, engine: Optional[str] = None
+) -> Tuple[float, float, Dict[str, List[Dict]]]:
+    """对完整的 read_excel_data 计时，返回 (中位耗时 ms, 峰值内存 MB, 解析结果)"""
+    excel_parser.EXCEL_ENGINE = engine
+    timings = []
+    for _ in range(repeat):
+        parser = parser_cls(path)
+        parser.build_rename_map(renames)
+        start = time.perf_counter()
+        parser.read_excel_data()
+        timings.append(time.perf_counter() - start)
+    # 峰值内存单独测一次，避免 tracemalloc 的开销计入耗时
+    parser = parser_cls(path)
+    parser.build_rename_map(renames)
+    tracemalloc.start()
+    parser.read_excel_data()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / (1024 * 1024), parser.schemes_data
+
+
+def _bench_read(files: List[str], renames: List[List[str]], repeat: int, engine: Optional[str]) -> None:
+    print(f"\n{'read_excel_data':<40} {'legacy ms':>10} {'peak MB':>8} {'current ms':>11} {'peak MB':>8} {'speedup':>8}")
+    total_legacy = total_current = 0.0
+    for path in files:
+        legacy_ms, legacy_peak, expected = _measure_read(LegacyMedicalExamParser, path, renames, repeat)
+        current_ms, current_peak, actual = _measure_read(MedicalExamParser, path, renames, repeat, engine)
+        if expected != actual:
+            raise SystemExit(f"read_excel_data 输出不一致: {path}")
+        total_legacy += legacy_ms
+        total_current += current_ms
+        print(
+            f"{Path(path).name[:40]:<40} {legacy_ms:>10.2f} {legacy_peak:>8.2f} "
+            f"{current_ms:>11.2f} {current_peak:>8.2f} {legacy_ms / current_ms:>7.1f}x"
+        )
+    print(f"{'total':<40} {total_legacy:>10.2f} {'':>8} {total_current:>11.2f} {'':>8} {total_legacy / total_current:>7.1f}x")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Excel 方案解析基准测试")
+    arg_parser.add_argument("files", nargs="*", help="待测试的 Excel 文件，默认使用 test/ 下的全部工作簿")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=20, help="每个工作簿的重复次数")
+    arg_parser.add_argument("--engine", default=None, help="当前实现使用的 Excel 读取引擎，如 calamine")
+    args = arg_parser.parse_args()
+    logging.disable(logging.INFO)
+
+    files = args.files or sorted(glob.glob(str(ROOT / "test" / "*" / "*.xlsx")))
+    if not files:
+        arg_parser.error("未找到 Excel 文件")
+
+    with open(ROOT / "default_rules.json", "r", encoding="utf-8") as f:
+        renames = json.load(f).get("renames", [])
+
+    print(f"{'workbook':<40} {'rows':>6} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    total_legacy = total_current = 0.0
+    for path in files:
+        legacy = LegacyMedicalExamParser(path)
+        current = MedicalExamParser(path)
+        legacy.build_rename_map(renames)
+        current.build_rename_map(renames)
+        sheets = _load_sheets(current)
+        for sheet_name, df in sheets.items():
+            expected = legacy._clean_and_filter_projects(df, sheet_name)
+            actual = current._clean_and_filter_projects(df, sheet_name)
+            if expected != actual:
+                raise SystemExit(f"输出不一致: {path} / {sheet_name}")
+        legacy_ms = statistics.median(_time_state_machine(legacy, sheets, args.repeat)) * 1000
+        current_ms = statistics.median(_time_state_machine(current, sheets, args.repeat)) * 1000
+        total_legacy += legacy_ms
+        total_current += current_ms
+        rows = sum(len(df) for df in sheets.values())
+        print(f"{Path(path).name[:40]:<40} {rows:>6} {legacy_ms:>10.2f} {current_ms:>11.2f} {legacy_ms / current_ms:>7.1f}x")
+    print(f"{'total':<40} {'':>6} {total_legacy:>10.2f} {total_current:>11.2f} {total_legacy / total_current:>7.1f}x")
+
+    # 读取阶段以 openpyxl 为主，耗时远高于状态机，重复次数相应减少
+    _bench_read(files, renames, max(1, args.repeat // 5), args.engine)
+
+
+if __name__ == "__main__":
+    main()
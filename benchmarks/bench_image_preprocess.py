@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR 图片预处理基准测试
+统计 test/ 下样例图片预处理前后的上传体积与预处理耗时；
+设置 MEC_BENCH_OCR_API_KEY / MEC_BENCH_OCR_SECRET_KEY 后，额外对原图与预处理图各调用一次百度 OCR，
+比较接口耗时与解析结果（方案标题与项目）是否一致
+
+用法：python benchmarks/bench_image_preprocess.py [图片 ...] [--max-edge 2048] [--quality 85] [--crop]
+"""
+
+import argparse
+import glob
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import logic  # noqa: E402
+from image_preprocess import PreprocessOptions, preprocess_image_bytes  # noqa: E402
+from ocr_client import BaiduOcrClient  # noqa: E402
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def _default_images() -> List[str]:
+    files: Set[str] = set()
+    for pattern in IMAGE_PATTERNS:
+        files.update(glob.glob(str(ROOT / "test" / "**" / pattern), recursive=True))
+    return sorted(files)
+
+
+def _parsed_items(payload: Optional[dict]) -> Dict[str, Set[str]]:
+    """OCR 结果解析为 标题 -> 项目集合，用于比较预处理前后的识别一致性"""
+    if not payload or "words_result" not in payload:
+        return {}
+    return {title: set(items) for title, items in logic.extract_data_from_ocr_json(payload)}
+
+
+def _item_recall(reference: Dict[str, Set[str]], candidate: Dict[str, Set[str]]) -> float:
+    expected = {(title, item) for title, items in reference.items() for item in items}
+    if not expected:
+        return 1.0
+    found = {(title, item) for title, items in candidate.items() for item in items}
+    return len(expected & found) / len(expected)
+
+
+def _timed_ocr(client: BaiduOcrClient, token: str, image_bytes: bytes, suffix: str) -> Tuple[float, Optional[dict]]:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as handle:
+        handle.write(image_bytes)
+    try:
+        start = time.perf_counter()
+        payload = client.recognize(token, handle.name)
+        return time.perf_counter() - start, payload
+    finally:
+        os.unlink(handle.name)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="OCR 图片预处理基准测试")
+    arg_parser.add_argument("images", nargs="*", help="待测试的图片，默认使用 test/ 下的全部图片")
+    arg_parser.add_argument("--max-edge", type=int, default=2048, help="缩放后的最长边（像素）")
+    arg_parser.add_argument("--quality", type=int, default=85, help="JPEG 压缩质量")
+    arg_parser.add_argument("--crop", action="store_true", help="裁剪到文字区域")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=3, help="预处理计时的重复次数")
+    args = arg_parser.parse_args()
+    logging.disable(logging.INFO)
+
+    images = args.images or _default_images()
+    if not images:
+        arg_parser.error("未找到图片")
+    options = PreprocessOptions(max_edge=args.max_edge, jpeg_quality=args.quality, crop_to_text=args.crop)
+
+    api_key = os.getenv("MEC_BENCH_OCR_API_KEY")
+    secret_key = os.getenv("MEC_BENCH_OCR_SECRET_KEY")
+    # 不使用结果缓存、不在客户端内部预处理，保证两次请求分别上传原图与预处理图
+    client = BaiduOcrClient() if api_key and secret_key else None
+    token = client.get_access_token(api_key, secret_key) if client else None
+    if client and not token:
+        raise SystemExit("获取 Access Token 失败，请检查 MEC_BENCH_OCR_API_KEY / MEC_BENCH_OCR_SECRET_KEY")
+
+    print(f"options: {options.fingerprint()}")
+    header = f"{'image':<34} {'orig KB':>8} {'prep KB':>8} {'ratio':>6} {'prep ms':>8}"
+    if token:
+        header += f" {'ocr orig s':>10} {'ocr prep s':>10} {'recall':>7}"
+    print(header)
+    total_original = total_processed = 0
+    latencies: List[Tuple[float, float]] = []
+    recalls: List[float] = []
+    for path in images:
+        original = Path(path).read_bytes()
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            processed = preprocess_image_bytes(original, options)
+            timings.append(time.perf_counter() - start)
+        total_original += len(original)
+        total_processed += len(processed)
+        line = (
+            f"{Path(path).name[-34:]:<34} {len(original) / 1024:>8.0f} {len(processed) / 1024:>8.0f} "
+            f"{len(processed) / len(original):>6.2f} {statistics.median(timings) * 1000:>8.1f}"
+        )
+        if token:
+            original_s, original_payload = _timed_ocr(client, token, original, Path(path).suffix)
+            processed_s, processed_payload = _timed_ocr(client, token, processed, ".jpg")
+            recall = _item_recall(_parsed_items(original_payload), _parsed_items(processed_payload))
+            latencies.append((original_s, processed_s))
+            recalls.append(recall)
+            line += f" {original_s:>10.2f} {processed_s:>10.2f} {recall:>7.1%}"
+        print(line)
+    print(
+        f"{'total':<34} {total_original / 1024:>8.0f} {total_processed / 1024:>8.0f} "
+        f"{total_processed / total_original:>6.2f}"
+    )
+    if latencies:
+        print(
+            f"OCR 中位耗时 原图 {statistics.median(l[0] for l in latencies):.2f}s -> "
+            f"预处理 {statistics.median(l[1] for l in latencies):.2f}s，项目召回率均值 {statistics.mean(recalls):.1%}"
+        )
+    else:
+        print("未设置 MEC_BENCH_OCR_API_KEY / MEC_BENCH_OCR_SECRET_KEY，跳过 OCR 耗时与识别一致性对比")
+
+
+if __name__ == "__main__":
+    main()
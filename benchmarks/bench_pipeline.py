@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR 比对全流程基准测试
+用 ReplayOcrEngine 回放 benchmarks/ocr_corpus 中的 OCR JSON（见 record_ocr_corpus.py），
+对 test/1..4 的图片与工作簿离线执行 回放 → 解析 → 方案标题匹配 → 项目比对，
+输出各阶段耗时分位数、吞吐（图片/秒）、峰值内存，以及匹配/缺失/多余项目数用于校验结果一致。
+
+--save 保存本次结果；--baseline 与保存的结果对比，任一阶段耗时或吞吐（取最好一轮）退化超过 --threshold，
+或比对结果不一致时以退出码 1 结束，便于在 CI 中比较两次运行。
+
+用法：python benchmarks/bench_pipeline.py [-n 20] [--save run.json] [--baseline base.json --threshold 0.25]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows 没有 resource 模块，不统计 max RSS
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import logic  # noqa: E402
+from ocr_engines import ReplayOcrEngine  # noqa: E402
+from web_backend.services.comparison_service import (  # noqa: E402
+    ExcelParseResult,
+    _build_scheme_lookup,
+    evaluate_ocr_batch,
+    evaluate_ocr_payload,
+    parse_excel_file,
+)
+
+DEFAULT_CORPUS = ROOT / "benchmarks" / "ocr_corpus"
+STAGES = ("ocr_replay", "parse", "title_match", "compare")
+PERCENTILES = (50, 90, 99)
+# 按比值比较的指标：耗时越大越差，吞吐越小越差
+_LOWER_IS_BETTER = "lower"
+_HIGHER_IS_BETTER = "higher"
+
+
+def load_corpus(corpus_dir: Path) -> List[Dict[str, Any]]:
+    manifest_path = corpus_dir / "manifest.json"
+    if not manifest_path.exists():
+        raise SystemExit(f"未找到 {manifest_path}，请先运行 benchmarks/record_ocr_corpus.py")
+    return json.loads(manifest_path.read_text(encoding="utf-8"))["sets"]
+
+
+def prepare_sets(sets: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ExcelParseResult, Dict[str, str]]]:
+    """解析工作簿与别名规则；工作簿解析不计入流程耗时（Web 端在上传时完成并缓存）"""
+    with open(ROOT / "default_rules.json", "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    alias_map = logic.build_alias_map(rules.get("aliases", []))
+    prepared = []
+    for image_set in sets:
+        parsed = parse_excel_file(ROOT / image_set["workbook"], rules.get("renames", []), rules.get("gender_renames", []))
+        prepared.append((image_set, parsed, alias_map))
+    return prepared
+
+
+def run_pipeline(
+    prepared: List[Tuple[Dict[str, Any], ExcelParseResult, Dict[str, str]]], engine: ReplayOcrEngine
+) -> Tuple[Dict[str, List[float]], List[float], Dict[str, int]]:
+    """
+    执行一遍全流程，返回 (各阶段逐图耗时, 逐图总耗时, 比对结果计数)。
+    阶段划分与 comparison_service.evaluate_ocr_payload 一致，只是分别计时。
+    """
+    stage_times: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    image_times: List[float] = []
+    counts = {"images": 0, "schemes": 0, "unmatched": 0, "matched": 0, "missing": 0, "extra": 0, "ocr_missing": 0}
+    for image_set, parsed, alias_map in prepared:
+        scheme_lookup = {
+            f"{sheet} - {category}": items for sheet, categories in parsed.excel_data.items() for category, items in categories.items()
+        }
+        for image in image_set["images"]:
+            spent = dict.fromkeys(STAGES, 0.0)
+            start = time.perf_counter()
+            payload = engine.recognize("local", str(ROOT / image["path"]), image_sha256=image["sha256"])
+            spent["ocr_replay"] = time.perf_counter() - start
+            counts["images"] += 1
+            if not payload:
+                counts["ocr_missing"] += 1
+                continue
+            start = time.perf_counter()
+            schemes = logic.extract_data_from_ocr_json(payload)
+            spent["parse"] = time.perf_counter() - start
+            for title, items in schemes:
+                counts["schemes"] += 1
+                start = time.perf_counter()
+                matched = logic.find_best_match(title, parsed.scheme_index) if title else None
+                spent["title_match"] += time.perf_counter() - start
+                if not matched:
+                    counts["unmatched"] += 1
+                    continue
+                start = time.perf_counter()
+                comparison = logic.generate_comparison_report(scheme_lookup.get(matched, []), items, alias_map)
+                spent["compare"] += time.perf_counter() - start
+                for entry in comparison:
+                    key = {"匹配": "matched", "缺失": "missing", "多余": "extra"}.get(entry["status"])
+                    if key:
+                        counts[key] += 1
+            for stage in STAGES:
+                stage_times[stage].append(spent[stage])
+            image_times.append(sum(spent.values()))
+    return stage_times, image_times, counts
+
+
+def time_evaluation(
+    prepared: List[Tuple[Dict[str, Any], ExcelParseResult, Dict[str, str]]], engine: ReplayOcrEngine, repeat: int
+) -> Dict[str, float]:
+    """
+    比对阶段（标题匹配 + 项目比对）两种调用方式的最好一轮总耗时（毫秒）：
+    per_scheme 逐张图片调用 evaluate_ocr_payload，batch 每个图片集调用一次 evaluate_ocr_batch
+    """
+    batches = []
+    for image_set, parsed, alias_map in prepared:
+        payloads = []
+        for image in image_set["images"]:
+            payload = engine.recognize("local", str(ROOT / image["path"]), image_sha256=image["sha256"])
+            payloads.append(logic.extract_data_from_ocr_json(payload) if payload else [])
+        batches.append((payloads, _build_scheme_lookup(parsed.excel_data), parsed.scheme_index, alias_map))
+    best = {"per_scheme": float("inf"), "batch": float("inf")}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for payloads, lookup, scheme_index, alias_map in batches:
+            for payload in payloads:
+                evaluate_ocr_payload(payload, lookup, alias_map, scheme_index)
+        best["per_scheme"] = min(best["per_scheme"], (time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        for payloads, lookup, scheme_index, alias_map in batches:
+            evaluate_ocr_batch(payloads, lookup, alias_map, scheme_index)
+        best["batch"] = min(best["batch"], (time.perf_counter() - start) * 1000)
+    return best
+
+
+def _percentiles_ms(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {f"p{q}": 0.0 for q in PERCENTILES}
+    return {f"p{q}": float(np.percentile(values, q)) * 1000 for q in PERCENTILES}
+
+
+def calibrate(repeat: int = 3) -> float:
+    """
+    固定的纯 Python 负载（字符串切分、字典与排序），取最好一轮耗时（毫秒）作为本机速度基准；
+    共享虚拟机上 CPU 速度整体波动时，各阶段耗时按它等比缩放后再与基线比较
+    """
+    text = "、".join(f"项目{idx}" for idx in range(400))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(20):
+            counts: Dict[str, int] = {}
+            for piece in text.split("、"):
+                counts[piece[-2:]] = counts.get(piece[-2:], 0) + len(piece)
+            sorted(counts.items(), key=lambda item: (item[1], item[0]))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def benchmark(corpus_dir: Path, repeat: int) -> Dict[str, Any]:
+    sets = load_corpus(corpus_dir)
+    sources = sorted({image["source"] for image_set in sets for image in image_set["images"]})
+    engine = ReplayOcrEngine(str(corpus_dir))
+    # logic 模块用 print 输出调试日志，计时期间丢弃，避免终端输出影响耗时
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        prepared = prepare_sets(sets)
+        run_pipeline(prepared, engine)  # 预热：导入、正则编译等一次性开销
+        stage_times: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        image_times: List[float] = []
+        # 每轮各阶段的逐图平均耗时与吞吐，取最好的一轮用于回归判定，受机器负载抖动影响最小
+        round_means: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        round_throughput: List[float] = []
+        calibration_ms = float("inf")
+        counts: Dict[str, int] = {}
+        for _ in range(repeat):
+            # 速度基准与流程交替测量，二者的最好一轮来自同一段机器状态
+            calibration_ms = min(calibration_ms, calibrate())
+            start = time.perf_counter()
+            run_stages, run_images, counts = run_pipeline(prepared, engine)
+            wall = time.perf_counter() - start
+            for stage in STAGES:
+                stage_times[stage].extend(run_stages[stage])
+                round_means[stage].append(float(np.mean(run_stages[stage])) * 1000 if run_stages[stage] else 0.0)
+            image_times.extend(run_images)
+            round_throughput.append(len(run_images) / wall if wall else 0.0)
+        evaluate_ms = time_evaluation(prepared, engine, repeat)
+        # 内存单独测一遍：tracemalloc 会显著拖慢计时
+        tracemalloc.start()
+        run_pipeline(prepared, engine)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    max_rss_mb = None
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+        max_rss_mb = max_rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+    return {
+        "python": platform.python_version(),
+        "calibration_ms": calibration_ms,
+        "corpus_sources": sources,
+        "repeat": repeat,
+        "counts": counts,
+        "stages_ms": {stage: _percentiles_ms(values) for stage, values in stage_times.items()},
+        "image_ms": _percentiles_ms(image_times),
+        "stages_best_mean_ms": {stage: min(values) for stage, values in round_means.items()},
+        "images_per_second": max(round_throughput),
+        "evaluate_ms": evaluate_ms,
+        "peak_traced_mb": peak / 1024 / 1024,
+        "max_rss_mb": max_rss_mb,
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"corpus: {', '.join(result['corpus_sources'])}  repeat={result['repeat']}  python {result['python']}")
+    if "synthesized" in result["corpus_sources"]:
+        print("注意：语料含合成数据（record_ocr_corpus.py --synthesize），耗时可比，识别准确性不代表真实截图")
+    print(f"{'stage':<12} " + " ".join(f"{f'p{q} ms':>9}" for q in PERCENTILES))
+    rows = list(result["stages_ms"].items()) + [("per_image", result["image_ms"])]
+    for stage, values in rows:
+        print(f"{stage:<12} " + " ".join(f"{values[f'p{q}']:>9.3f}" for q in PERCENTILES))
+    print("最好一轮逐图平均 " + " ".join(f"{stage}={value:.3f}ms" for stage, value in result["stages_best_mean_ms"].items()))
+    rss = f" / RSS {result['max_rss_mb']:.0f}MB" if result.get("max_rss_mb") is not None else ""
+    print(
+        f"吞吐（最好一轮） {result['images_per_second']:.1f} 图片/秒 | 峰值内存 tracemalloc {result['peak_traced_mb']:.1f}MB{rss}"
+    )
+    evaluate_ms = result["evaluate_ms"]
+    print(f"比对阶段总耗时 逐图 evaluate_ocr_payload {evaluate_ms['per_scheme']:.1f}ms | 整批 evaluate_ocr_batch {evaluate_ms['batch']:.1f}ms")
+    print("结果计数 " + " ".join(f"{key}={value}" for key, value in result["counts"].items()))
+
+
+def compare_with_baseline(
+    result: Dict[str, Any], baseline: Dict[str, Any], threshold: float, normalize: bool = True
+) -> List[str]:
+    """
+    返回退化项。判定使用最好一轮的逐图平均耗时与吞吐：语料很小，单次耗时在毫秒以下，
+    分位数受调度抖动影响大，只用于展示。normalize 时先按两次运行的 calibration_ms 之比换算基线。
+    """
+    regressions: List[str] = []
+    speed = 1.0
+    if normalize and baseline.get("calibration_ms"):
+        speed = result["calibration_ms"] / baseline["calibration_ms"]
+        print(f"本机速度基准 {baseline['calibration_ms']:.2f}ms -> {result['calibration_ms']:.2f}ms，基线按 x{speed:.2f} 换算")
+    metrics: List[Tuple[str, float, float, str]] = []
+    for stage, value in result["stages_best_mean_ms"].items():
+        base_value = baseline.get("stages_best_mean_ms", {}).get(stage)
+        if base_value is not None:
+            metrics.append((f"{stage}.mean", base_value * speed, value, _LOWER_IS_BETTER))
+    metrics.append(("images_per_second", baseline["images_per_second"] / speed, result["images_per_second"], _HIGHER_IS_BETTER))
+    print(f"{'metric':<22} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, base, current, direction in metrics:
+        change = (current - base) / base if base else 0.0
+        worse = change > threshold if direction == _LOWER_IS_BETTER else change < -threshold
+        # 亚微秒级的阶段（如回放命中内存）不判定，避免计时噪声误报
+        if worse and direction == _LOWER_IS_BETTER and current < 0.001:
+            worse = False
+        print(f"{name:<22} {base:>10.3f} {current:>10.3f} {change:>+8.1%}{'  <-- 退化' if worse else ''}")
+        if worse:
+            regressions.append(f"{name} {base:.3f} -> {current:.3f} ({change:+.1%})")
+    if result["counts"] != baseline.get("counts"):
+        regressions.append(f"比对结果不一致：{baseline.get('counts')} -> {result['counts']}")
+    return regressions
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="OCR 比对全流程基准测试")
+    arg_parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="回放语料目录")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=20, help="计时的重复轮数")
+    arg_parser.add_argument("--save", help="将结果保存为 JSON")
+    arg_parser.add_argument("--baseline", help="与保存的结果对比")
+    arg_parser.add_argument("--threshold", type=float, default=0.25, help="允许的退化比例，默认 25%%")
+    arg_parser.add_argument("--no-normalize", action="store_true", help="不按本机速度基准换算基线")
+    args = arg_parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    result = benchmark(Path(args.corpus), max(1, args.repeat))
+    print_report(result)
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"已保存到 {args.save}")
+    if args.baseline:
+        baseline: Optional[Dict[str, Any]] = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare_with_baseline(result, baseline, args.threshold, normalize=not args.no_normalize)
+        if regressions:
+            print("性能或结果退化：")
+            for item in regressions:
+                print(f"  - {item}")
+            sys.exit(1)
+        print(f"未超过退化阈值 {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
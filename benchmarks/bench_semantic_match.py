@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SmartMatcher 语义匹配基准测试
+对比逐项提取特征、逐项计算集合相似度的原实现与按 Excel 列表预编码为位掩码的 FeatureTable，
+输出每个 OCR 项目的平均耗时，并校验两者选出的项目与得分一致。
+
+Excel 项目取 test/ 下全部工作簿，OCR 项目取回放语料（benchmarks/ocr_corpus）解析出的项目；
+--scale 把 Excel 项目列表按后缀复制放大，观察项目数增长时的耗时变化。
+
+用法：python benchmarks/bench_semantic_match.py [-n 5] [--scale 1 4 16]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import logic  # noqa: E402
+from smart_matcher import FeatureTable, SmartMatcher  # noqa: E402
+from web_backend.services.comparison_service import parse_excel_file  # noqa: E402
+
+DEFAULT_CORPUS = ROOT / "benchmarks" / "ocr_corpus"
+# 放大 Excel 列表时追加的后缀，保证复制出的项目互不相同
+_SUFFIXES = [f"({chr(ord('A') + idx)})" for idx in range(26)] + [f"{idx}项" for idx in range(100)]
+
+
+def load_items(corpus_dir: Path) -> Tuple[List[str], List[str]]:
+    with open(ROOT / "default_rules.json", "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    manifest = json.loads((corpus_dir / "manifest.json").read_text(encoding="utf-8"))
+    excel_items: List[str] = []
+    ocr_items: List[str] = []
+    for image_set in manifest["sets"]:
+        parsed = parse_excel_file(ROOT / image_set["workbook"], rules["renames"], rules["gender_renames"])
+        excel_items += [item for categories in parsed.excel_data.values() for items in categories.values() for item in items]
+        for image in image_set["images"]:
+            payload = json.loads((corpus_dir / f"{image['sha256']}.json").read_text(encoding="utf-8"))
+            ocr_items += [item for _, items in logic.extract_data_from_ocr_json(payload) for item in items]
+    return list(dict.fromkeys(excel_items)), list(dict.fromkeys(ocr_items))
+
+
+def reference_semantic_scores(matcher: SmartMatcher, ocr_item: str, excel_items: List[str]) -> List[float]:
+    """原实现：每个 Excel 项目重新提取特征并用集合计算相似度"""
+    ocr_features = matcher._extract_features(matcher._expand_abbreviations(ocr_item))
+    return [
+        matcher._calculate_feature_similarity(ocr_features, matcher._extract_features(item))
+        for item in excel_items
+    ]
+
+
+def reference_semantic_match(matcher: SmartMatcher, ocr_item: str, excel_items: List[str], threshold: int) -> Optional[str]:
+    best_match, best_score = None, 0
+    for item, score in zip(excel_items, reference_semantic_scores(matcher, ocr_item, excel_items)):
+        if score > best_score:
+            best_match, best_score = item, score
+    return best_match if best_score >= threshold else None
+
+
+def _best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="SmartMatcher 语义匹配基准测试")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=5, help="每种实现的重复轮数，取最快一轮")
+    arg_parser.add_argument("--scale", type=int, nargs="+", default=[1, 4, 16], help="Excel 项目列表的放大倍数")
+    arg_parser.add_argument("--threshold", type=int, default=60, help="语义匹配阈值")
+    arg_parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="回放语料目录")
+    args = arg_parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # logic 的解析日志直接打印到标准输出，这里不需要
+    with contextlib.redirect_stdout(io.StringIO()):
+        base_items, ocr_items = load_items(Path(args.corpus))
+    if max(args.scale) > len(_SUFFIXES) + 1:
+        arg_parser.error(f"--scale 最大为 {len(_SUFFIXES) + 1}")
+    matcher = SmartMatcher()
+
+    print(f"OCR 项目 {len(ocr_items)} 个，阈值 {args.threshold}")
+    print(f"{'Excel项目':>9} {'原实现 ms/项':>12} {'位掩码 ms/项':>12} {'含建表 ms/项':>12} {'加速':>6}  一致")
+    for scale in args.scale:
+        excel_items = base_items + [f"{item}{suffix}" for suffix in _SUFFIXES[:scale - 1] for item in base_items]
+        expected = [reference_semantic_match(matcher, item, excel_items, args.threshold) for item in ocr_items]
+        actual = [matcher._semantic_match(item, excel_items, args.threshold) for item in ocr_items]
+        table = FeatureTable(excel_items)
+        same_scores = all(
+            table.similarity(matcher._expand_abbreviations(item)).tolist()
+            == reference_semantic_scores(matcher, item, excel_items)
+            for item in ocr_items
+        )
+
+        reference_time = _best_of(args.repeat, lambda: [
+            reference_semantic_match(matcher, item, excel_items, args.threshold) for item in ocr_items
+        ])
+        cached_time = _best_of(args.repeat, lambda: [
+            matcher._semantic_match(item, excel_items, args.threshold) for item in ocr_items
+        ])
+
+        def with_build() -> None:
+            matcher._feature_cache.clear()
+            for item in ocr_items:
+                matcher._semantic_match(item, excel_items, args.threshold)
+
+        build_time = _best_of(args.repeat, with_build)
+        per_item = 1000 / len(ocr_items)
+        print(
+            f"{len(excel_items):>9} {reference_time * per_item:>12.3f} {cached_time * per_item:>12.3f} "
+            f"{build_time * per_item:>12.3f} {reference_time / cached_time:>5.1f}x  "
+            f"{'是' if expected == actual and same_scores else '否'}"
+        )
+        if expected != actual or not same_scores:
+            raise SystemExit("位掩码实现与原实现的结果不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR 回放语料录制
+为 test/1..4 中的每张图片生成一份 OCR JSON，文件名为图片内容的 SHA-256，供 ReplayOcrEngine 与
+benchmarks/bench_pipeline.py 离线回放；manifest.json 记录图片集、对应工作簿与每份语料的来源。
+
+- 设置 MEC_BENCH_OCR_API_KEY / MEC_BENCH_OCR_SECRET_KEY 时调用百度高精度 OCR 录制真实结果（source=recorded）
+- --synthesize：无密钥时按工作簿中的方案合成版面相近的结果（source=synthesized）。合成数据只模拟
+  百度的行切分、跨行断词、别名与少量缺失/多余项目，不能代替真实识别结果，基准报告中会标明来源
+
+用法：python benchmarks/record_ocr_corpus.py [--synthesize] [--out benchmarks/ocr_corpus] [--force]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ocr_client import ACCURATE_URL, BaiduOcrClient  # noqa: E402
+from ocr_engines import make_words_result  # noqa: E402
+from web_backend.services.comparison_service import parse_excel_file  # noqa: E402
+
+DEFAULT_OUT = ROOT / "benchmarks" / "ocr_corpus"
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+# 版面：test/3 为 HIS 单方案截图，其余为多方案列表
+SINGLE_SCHEME_SETS = {"3"}
+# 合成数据中一行最多的字符数，超出后断行（可能断在词中间，与真实截图一致）
+_LINE_CHARS = 46
+
+
+def discover_sets() -> List[Dict[str, object]]:
+    """test/ 下的每个子目录为一个图片集：一本工作簿加若干截图"""
+    sets = []
+    for directory in sorted(path for path in (ROOT / "test").iterdir() if path.is_dir()):
+        workbooks = sorted(directory.glob("*.xlsx"))
+        images = sorted(
+            {Path(path) for pattern in IMAGE_PATTERNS for path in glob.glob(str(directory / "**" / pattern), recursive=True)}
+        )
+        if workbooks and images:
+            sets.append({"name": directory.name, "workbook": workbooks[0], "images": images})
+    return sets
+
+
+def load_rules() -> Dict[str, list]:
+    with open(ROOT / "default_rules.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _wrap(text: str) -> List[str]:
+    return [text[start:start + _LINE_CHARS] for start in range(0, len(text), _LINE_CHARS)]
+
+
+def _ocr_title(scheme_name: str) -> str:
+    """'方案一 - 女未婚' -> '方案一女未婚'，与截图中的分组名称一致"""
+    sheet, _, category = scheme_name.partition(" - ")
+    return f"{sheet}{category}"
+
+
+def _noisy_items(items: List[str], aliases: Dict[str, List[str]], rng: random.Random) -> List[str]:
+    """部分项目换成别名，偶尔漏掉一项或多出一项，并打乱顺序"""
+    result = [rng.choice(aliases[item]) if item in aliases and rng.random() < 0.3 else item for item in items]
+    if len(result) > 3 and rng.random() < 0.3:
+        result.pop(rng.randrange(len(result)))
+    if rng.random() < 0.2:
+        result.insert(rng.randrange(len(result) + 1), "自选加项")
+    rng.shuffle(result)
+    return result
+
+
+def synthesize_payload(
+    schemes: List[Tuple[str, List[str]]], single_scheme: bool, aliases: Dict[str, List[str]], rng: random.Random
+) -> dict:
+    lines: List[str] = []
+    if single_scheme:
+        title, items = schemes[0]
+        lines += ["订单编码", f"{rng.randrange(10 ** 7, 10 ** 8)}", f"{_ocr_title(title)}（紫单见名单，不可替检）"]
+        lines += ["自定义选项", "复核后执行"]
+        lines += _noisy_items(items, aliases, rng)
+        lines += ["分组信息", "婚姻状况"]
+    else:
+        for title, items in schemes:
+            display = f"{_ocr_title(title)}（紫单、绿单见名单不可替检)"
+            lines += ["分组名称："] + _wrap(display)
+            lines += ["分组价格：", f"￥{rng.randrange(2, 12) * 100}.00"]
+            lines += _wrap("、".join(_noisy_items(items, aliases, rng)))
+            lines += ["分组交费方式：统一结账加项交费方式：用户自费", "备注："]
+    top = 20
+    located = []
+    for text in lines:
+        located.append((text, {"top": top, "left": 24, "width": 28 * len(text), "height": 30}))
+        top += 42
+    payload = make_words_result(located)
+    payload["log_id"] = rng.randrange(10 ** 17, 10 ** 18)
+    return payload
+
+
+def _alias_lookup(alias_data: List[List[str]]) -> Dict[str, List[str]]:
+    aliases: Dict[str, List[str]] = {}
+    for group in alias_data:
+        for name in group:
+            others = [other for other in group if other != name]
+            if others:
+                aliases.setdefault(name, []).extend(others)
+    return aliases
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="录制或合成 OCR 回放语料")
+    arg_parser.add_argument("--synthesize", action="store_true", help="按工作簿合成语料，不调用 OCR 接口")
+    arg_parser.add_argument("--out", default=str(DEFAULT_OUT), help="语料目录")
+    arg_parser.add_argument("--force", action="store_true", help="覆盖已存在的语料（默认跳过已录制的真实结果）")
+    arg_parser.add_argument("--seed", type=int, default=20251017, help="合成数据的随机种子")
+    args = arg_parser.parse_args()
+    logging.disable(logging.INFO)
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / "manifest.json"
+    previous = {}
+    if manifest_path.exists():
+        previous = {
+            image["sha256"]: image["source"]
+            for entry in json.loads(manifest_path.read_text(encoding="utf-8"))["sets"]
+            for image in entry["images"]
+        }
+
+    client = token = None
+    if not args.synthesize:
+        api_key = os.getenv("MEC_BENCH_OCR_API_KEY")
+        secret_key = os.getenv("MEC_BENCH_OCR_SECRET_KEY")
+        if not api_key or not secret_key:
+            arg_parser.error("录制需要 MEC_BENCH_OCR_API_KEY / MEC_BENCH_OCR_SECRET_KEY，或使用 --synthesize")
+        # 不预处理、不走结果缓存：语料保存原图的识别结果
+        client = BaiduOcrClient()
+        token = client.get_access_token(api_key, secret_key)
+        if not token:
+            raise SystemExit("获取 Access Token 失败")
+
+    rules = load_rules()
+    aliases = _alias_lookup(rules.get("aliases", []))
+    manifest_sets = []
+    for image_set in discover_sets():
+        name = str(image_set["name"])
+        images: List[Path] = image_set["images"]
+        workbook: Path = image_set["workbook"]
+        parsed = parse_excel_file(workbook, rules.get("renames", []), rules.get("gender_renames", []))
+        schemes = [
+            (scheme, parsed.excel_data[scheme.split(" - ", 1)[0]][scheme.split(" - ", 1)[1]])
+            for scheme in parsed.scheme_names
+        ]
+        rng = random.Random(f"{args.seed}:{name}")
+        entries = []
+        for position, image_path in enumerate(images):
+            digest = hashlib.sha256(image_path.read_bytes()).hexdigest()
+            target = out_dir / f"{digest}.json"
+            source = previous.get(digest)
+            if target.exists() and source and not args.force and (args.synthesize or source == "recorded"):
+                entries.append({"path": image_path.relative_to(ROOT).as_posix(), "sha256": digest, "source": source})
+                continue
+            if client:
+                payload = client.recognize_with_location(token, image_path.read_bytes(), str(image_path))
+                if not payload or "words_result" not in payload:
+                    print(f"跳过 {image_path}: OCR 失败 {payload}")
+                    continue
+                payload["endpoint"] = ACCURATE_URL
+                source = "recorded"
+            else:
+                # 按顺序把方案均匀分到各张截图
+                page = schemes[position::len(images)]
+                if not page:
+                    continue
+                payload = synthesize_payload(page, name in SINGLE_SCHEME_SETS, aliases, rng)
+                source = "synthesized"
+            target.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+            entries.append({"path": image_path.relative_to(ROOT).as_posix(), "sha256": digest, "source": source})
+            print(f"{source:<12} {image_path.relative_to(ROOT)} -> {target.name}")
+        manifest_sets.append({"name": name, "workbook": workbook.relative_to(ROOT).as_posix(), "images": entries})
+    manifest_path.write_text(json.dumps({"sets": manifest_sets}, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"manifest: {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,9 @@ import logging
 import os
 import re
 import sys
+import time
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 
 import pandas as pd
 
@@ -46,6 +47,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Excel 读取引擎，默认由 pandas 按扩展名选择（xlsx 为 openpyxl）；
+# 安装 python-calamine 且 pandas>=2.2 时可设为 calamine，读取速度约快一个数量级
+EXCEL_ENGINE = os.getenv("MEC_EXCEL_ENGINE") or None
+
+
+# 区块标题关键词 -> 状态，按判断优先级排列
+# '女已婚检查H' 必须在 '女已婚检查' 之前判断，以避免错误匹配；标准早餐作为任何区块的结束标记
+_SECTION_STATE_PRIORITY = (
+    ('男性检查', 'MALE'),
+    ('女未婚检查', 'FEMALE_UNMARRIED'),
+    ('女已婚检查H', 'FEMALE_MARRIED_H'),
+    ('女已婚检查', 'FEMALE_MARRIED'),
+    ('女性检查', 'FEMALE_GENERIC'),
+    ('标准早餐', 'NORMAL'),
+)
+_SECTION_STATE_PATTERN = re.compile('男性检查|女未婚检查|女已婚检查H?|女性检查|标准早餐')
+_SECTION_HEADER_TITLES = frozenset(['男性检查', '女性检查', '女未婚检查', '女已婚检查', '女已婚检查H'])
+_FEMALE_STATES = frozenset(['FEMALE_UNMARRIED', 'FEMALE_MARRIED', 'FEMALE_MARRIED_H', 'FEMALE_GENERIC'])
+_PROJECT_NAME_TRANSLATION = str.maketrans({' ': None, '　': None, '（': '(', '）': ')'})
+
+
+def _detect_section_state(text: str) -> Optional[str]:
+    """识别区块标题，返回对应状态；多个关键词同时出现时按优先级取第一个."""
+    found = _SECTION_STATE_PATTERN.findall(text)
+    if not found:
+        return None
+    for keyword, state in _SECTION_STATE_PRIORITY:
+        if keyword in found:
+            return state
+    return None
+
+
+def _compile_keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """将“包含任一关键词”的判断合并为一个正则；关键词为空时永不匹配."""
+    if not keywords:
+        return re.compile(r'(?!x)x')
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+
+def _cell_text(value) -> str:
+    return '' if pd.isna(value) else str(value).strip()
+
 
 class MedicalExamParser:
     """体检方案解析器"""
@@ -90,33 +133,35 @@ class MedicalExamParser:
         logger.info(f"Built {len(self.gender_rename_map)} gender rename rules from settings.")
 
     def read_excel_data(self) -> None:
-        """读取并解析Excel文件中的所有Sheet页."""
+        """读取并解析Excel文件中的所有Sheet页（工作簿只打开一次，所有Sheet一次读出）."""
         try:
             logger.info(f"Reading Excel file: {self.excel_file_path}")
-            xls = pd.ExcelFile(self.excel_file_path)
-            raw_sheet_names = xls.sheet_names
-            self.sheet_names_in_order = []
-            self.sheet_name_alias_map.clear()
-            if len(raw_sheet_names) == 1 and raw_sheet_names[0].strip().lower() == "sheet":
-                display_name = "方案"
-                self.sheet_names_in_order.append(display_name)
-                self.sheet_name_alias_map[display_name] = raw_sheet_names[0]
-            else:
-                for name in raw_sheet_names:
-                    display_name = name.strip()
+            start = time.perf_counter()
+            with pd.ExcelFile(self.excel_file_path, engine=EXCEL_ENGINE) as xls:
+                raw_sheet_names = xls.sheet_names
+                self.sheet_names_in_order = []
+                self.sheet_name_alias_map.clear()
+                if len(raw_sheet_names) == 1 and raw_sheet_names[0].strip().lower() == "sheet":
+                    display_name = "方案"
                     self.sheet_names_in_order.append(display_name)
-                    self.sheet_name_alias_map[display_name] = name
-            for sheet_name in self.sheet_names_in_order:
-                actual_sheet_name = self.sheet_name_alias_map.get(sheet_name, sheet_name)
-                logger.info(f"Processing sheet: {sheet_name}")
-                df = pd.read_excel(
+                    self.sheet_name_alias_map[display_name] = raw_sheet_names[0]
+                else:
+                    for name in raw_sheet_names:
+                        display_name = name.strip()
+                        self.sheet_names_in_order.append(display_name)
+                        self.sheet_name_alias_map[display_name] = name
+                frames = pd.read_excel(
                     xls,
-                    sheet_name=actual_sheet_name,
+                    sheet_name=list(raw_sheet_names),
                     header=None,
                     usecols=[0, 1, 2, 4, 5],
                     names=['项目名称', '子项目', '内容明细', '男', '女']
                 )
-                projects = self._clean_and_filter_projects(df, sheet_name) or []
+            logger.info(f"Loaded {len(frames)} sheets in {time.perf_counter() - start:.3f}s")
+            for sheet_name in self.sheet_names_in_order:
+                actual_sheet_name = self.sheet_name_alias_map.get(sheet_name, sheet_name)
+                logger.info(f"Processing sheet: {sheet_name}")
+                projects = self._clean_and_filter_projects(frames[actual_sheet_name], sheet_name) or []
                 self.schemes_data[sheet_name] = projects
                 logger.info(f"Sheet {sheet_name} processed: {len(projects)} valid projects found")
         except Exception as e:
@@ -127,6 +172,7 @@ class MedicalExamParser:
         """
         清理和过滤单个Sheet页的数据.
         此方法包含核心的状态机逻辑，用于识别项目所属的区块.
+        各列预先转换为字符串列表后单次遍历，关键词判断使用预编译的组合正则.
         """
         projects = []
         last_main_project_name = ""
@@ -135,33 +181,27 @@ class MedicalExamParser:
         current_state = 'NORMAL'
         data_started = False
 
-        for index, row in df.iterrows():
-            project_name_col_a = str(row['项目名称']).strip() if not pd.isna(row['项目名称']) else ''
-            sub_project_col_b = str(row['子项目']).strip() if not pd.isna(row['子项目']) else ''
-            details_col_c = str(row['内容明细']).strip() if not pd.isna(row['内容明细']) else ''
+        excluded_pattern = _compile_keyword_pattern(self.excluded_keywords)
+        package_pattern = _compile_keyword_pattern(self.package_keywords)
+        col_a = [_cell_text(value) for value in df['项目名称'].tolist()]
+        col_b = [_cell_text(value) for value in df['子项目'].tolist()]
+        col_c = [_cell_text(value) for value in df['内容明细'].tolist()]
+        col_male = df['男'].tolist()
+        col_female = df['女'].tolist()
 
-            header_text = project_name_col_a.replace(" ", "")
-            if header_text == "项目或组合":
-                data_started = True
-                continue
+        for index, project_name_col_a, sub_project_col_b, details_col_c, male_mark, female_mark in zip(
+            df.index.tolist(), col_a, col_b, col_c, col_male, col_female
+        ):
             if not data_started:
+                if project_name_col_a.replace(" ", "") == "项目或组合":
+                    data_started = True
+                continue
+            if project_name_col_a.replace(" ", "") == "项目或组合":
                 continue
-            
-            # 定义状态更新函数，识别区块标题
-            def update_state(text: str) -> str:
-                if '男性检查' in text: return 'MALE'
-                if '女未婚检查' in text: return 'FEMALE_UNMARRIED'
-                # '女已婚检查H' 必须在 '女已婚检查' 之前判断，以避免错误匹配
-                if '女已婚检查H' in text: return 'FEMALE_MARRIED_H'
-                if '女已婚检查' in text: return 'FEMALE_MARRIED'
-                if '女性检查' in text: return 'FEMALE_GENERIC'
-                # 标准早餐作为任何区块的结束标记
-                if '标准早餐' in text: return 'NORMAL'
-                return None
 
             # 检查整行文本以更新状态，兼容标题独占一行或与项目同在一行的情况
             full_row_text = f"{project_name_col_a} {sub_project_col_b}"
-            new_state = update_state(full_row_text)
+            new_state = _detect_section_state(full_row_text)
             if new_state:
                 current_state = new_state
                 logger.debug(f"State changed to {current_state} by text: '{full_row_text}'")
@@ -171,18 +211,18 @@ class MedicalExamParser:
                 break
 
             # 如果当前行是纯标题行（A列有值，B/C列为空），则跳过，因为它只用于改变状态
-            is_pure_header = project_name_col_a and not sub_project_col_b and not details_col_c and update_state(project_name_col_a) is not None
-            if is_pure_header:
+            if project_name_col_a and not sub_project_col_b and not details_col_c \
+                    and _detect_section_state(project_name_col_a) is not None:
                 logger.debug(f"Skipping pure header row: {project_name_col_a}")
                 continue
             
             # 记录A列的主项目名称，并排除包含特定关键词的行
             if project_name_col_a: last_main_project_name = project_name_col_a
-            if any(keyword in last_main_project_name for keyword in self.excluded_keywords): continue
+            if excluded_pattern.search(last_main_project_name): continue
             
             # 智能确定最终项目名称
             final_name = ""
-            if any(keyword in last_main_project_name for keyword in self.package_keywords):
+            if package_pattern.search(last_main_project_name):
                 if last_main_project_name != last_added_package_name:
                     final_name = last_main_project_name
                     last_added_package_name = last_main_project_name
@@ -193,14 +233,13 @@ class MedicalExamParser:
             if not final_name: continue
             
             # 清洗项目名称
-            final_name = final_name.replace(' ', '').replace('　', '').replace('（', '(').replace('）', ')')
+            final_name = final_name.translate(_PROJECT_NAME_TRANSLATION)
             # 排除标题行自身被当作项目
-            header_titles = ['男性检查', '女性检查', '女未婚检查', '女已婚检查', '女已婚检查H']
-            if final_name in header_titles or any(keyword in final_name for keyword in self.excluded_keywords): continue
+            if final_name in _SECTION_HEADER_TITLES or excluded_pattern.search(final_name): continue
             
             # --- 性别归属判断逻辑 (保留) ---
-            has_male_checkmark = str(row['男']).strip() == '√'
-            has_female_checkmark = str(row['女']).strip() == '√'
+            has_male_checkmark = str(male_mark).strip() == '√'
+            has_female_checkmark = str(female_mark).strip() == '√'
             
             is_for_male, is_for_female = False, False
             # 1. 最高优先级：明确的 '√' 标记
@@ -209,7 +248,7 @@ class MedicalExamParser:
             # 2. 第二优先级：上下文状态推断
             else:
                 if current_state == 'MALE': is_for_male = True
-                elif current_state in ['FEMALE_UNMARRIED', 'FEMALE_MARRIED', 'FEMALE_MARRIED_H', 'FEMALE_GENERIC']: is_for_female = True
+                elif current_state in _FEMALE_STATES: is_for_female = True
                 # 3. 最低优先级：默认通用规则
                 elif current_state == 'NORMAL' and self.default_to_universal_if_no_checkmark: 
                     is_for_male, is_for_female = True, True
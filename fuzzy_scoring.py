@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量模糊打分后端
+预处理与取整方式与 fuzzywuzzy 的 process.extractOne 保持一致，各打分器的得分与 extractOne 逐项打分完全相同：
+- ratio / token_sort_ratio 用 rapidfuzz.process.cdist 一次性计算 查询 x 候选 的相似度矩阵（原生实现、多线程）；
+- partial_ratio / token_set_ratio 的 rapidfuzz 实现与 fuzzywuzzy 得分不同（如 partial_ratio 的对齐方式、
+  token_set_ratio 对两个空串给 0 而 fuzzywuzzy 给 100），会改变阈值判断，因此仍逐对调用 fuzzywuzzy。
+  这两种打分器只用于 SmartMatcher 预选后的少量候选。
+"""
+
+from functools import partial
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+from rapidfuzz import fuzz as rf_fuzz
+from rapidfuzz import process as rf_process
+
+
+def _full_process(text: str) -> str:
+    return utils.full_process(text)
+
+
+def _ascii_process(text: str) -> str:
+    return utils.full_process(text, force_ascii=True)
+
+
+def _sorted_ascii_tokens(text: str) -> str:
+    return " ".join(sorted(_ascii_process(text).split()))
+
+
+# 名称 -> (预处理函数, 打分器)
+# extractOne 对 token 类打分器使用 force_ascii=True 的预处理，这里保持同样的行为；
+# token_sort_ratio 即“排序后的词串做 ratio”，直接用 ratio 打分以复用相同的取整与空串语义
+SCORERS: Dict[str, Tuple[Callable[[str], str], Callable]] = {
+    "ratio": (_full_process, rf_fuzz.ratio),
+    "partial_ratio": (_full_process, fuzz.partial_ratio),
+    "token_sort_ratio": (_sorted_ascii_tokens, rf_fuzz.ratio),
+    "token_set_ratio": (_ascii_process, partial(fuzz.token_set_ratio, full_process=False)),
+}
+# 逐对调用 fuzzywuzzy 打分的打分器
+PAIRWISE_SCORERS = frozenset(["partial_ratio", "token_set_ratio"])
+
+
+def preprocess(texts: Sequence[str], scorer: str = "ratio") -> List[str]:
+    """按打分器对应的规则预处理字符串"""
+    processor, _ = SCORERS[scorer]
+    return [processor(text) for text in texts]
+
+
+def score_matrix(
+    queries: Sequence[str],
+    choices: Sequence[str],
+    scorer: str = "ratio",
+    processed: bool = False,
+    workers: int = -1,
+) -> np.ndarray:
+    """
+    返回形状为 (len(queries), len(choices)) 的 int32 得分矩阵（0-100，四舍五入）。
+
+    processed=True 表示输入已经过 preprocess，可避免重复预处理。
+    """
+    if not len(queries) or not len(choices):
+        return np.zeros((len(queries), len(choices)), dtype=np.int32)
+    processor, scorer_func = SCORERS[scorer]
+    if not processed:
+        queries = [processor(text) for text in queries]
+        choices = [processor(text) for text in choices]
+    if scorer in PAIRWISE_SCORERS:
+        return np.array([[scorer_func(query, choice) for choice in choices] for query in queries], dtype=np.int32)
+    scores = rf_process.cdist(queries, choices, scorer=scorer_func, dtype=np.float64, workers=workers)
+    return np.rint(scores).astype(np.int32)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR 前的图片预处理
+按最长边缩放并重新压缩为 JPEG，可选裁剪到文字区域，减少上传体积与 OCR 接口耗时；
+未安装 Pillow 时原样返回图片
+"""
+
+import io
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow 为可选依赖
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# 文字区域检测：灰度低于该值视为墨迹；行/列中墨迹占比超过阈值才计入文字区域，以忽略噪点
+_INK_THRESHOLD = 160
+_INK_LINE_RATIO = 0.01
+_CROP_MARGIN_RATIO = 0.02
+# 未缩放、未裁剪时，重新压缩至少要节省这一比例的体积才替换原图，避免为微小收益引入二次压缩损失
+_MIN_RECOMPRESS_SAVING = 0.1
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    """max_edge 为缩放后的最长边（像素，0 表示不缩放），jpeg_quality 为重新压缩质量"""
+
+    max_edge: int = 2048
+    jpeg_quality: int = 85
+    crop_to_text: bool = False
+
+    @classmethod
+    def from_env(cls) -> Optional["PreprocessOptions"]:
+        """
+        读取 MEC_OCR_PREPROCESS* 环境变量；默认关闭，MEC_OCR_PREPROCESS=1 时开启。
+        有损重新压缩对识别耗时与解析准确率的影响需先用 benchmarks/bench_image_preprocess.py
+        （配置 OCR 密钥）实测，确认后再在部署中开启
+        """
+        if os.getenv("MEC_OCR_PREPROCESS", "0") != "1":
+            return None
+        return cls(
+            max_edge=int(os.getenv("MEC_OCR_MAX_EDGE", "2048")),
+            jpeg_quality=int(os.getenv("MEC_OCR_JPEG_QUALITY", "85")),
+            crop_to_text=os.getenv("MEC_OCR_CROP_TEXT", "0") == "1",
+        )
+
+    def fingerprint(self) -> str:
+        """预处理参数指纹，参与 OCR 结果缓存键，参数变化后不会复用旧结果"""
+        return f"edge={self.max_edge},q={self.jpeg_quality},crop={int(self.crop_to_text)}"
+
+
+def detect_text_bbox(image: "Image.Image") -> Optional[Tuple[int, int, int, int]]:
+    """
+    基于灰度投影估计文字区域 (left, top, right, bottom)，找不到明显墨迹时返回 None。
+    """
+    gray = np.asarray(ImageOps.autocontrast(image.convert("L")))
+    ink = gray < _INK_THRESHOLD
+    rows = np.flatnonzero(ink.mean(axis=1) > _INK_LINE_RATIO)
+    cols = np.flatnonzero(ink.mean(axis=0) > _INK_LINE_RATIO)
+    if not len(rows) or not len(cols):
+        return None
+    height, width = gray.shape
+    margin = int(max(height, width) * _CROP_MARGIN_RATIO)
+    return (
+        max(0, int(cols[0]) - margin),
+        max(0, int(rows[0]) - margin),
+        min(width, int(cols[-1]) + 1 + margin),
+        min(height, int(rows[-1]) + 1 + margin),
+    )
+
+
+def preprocess_image_bytes(image_bytes: bytes, options: Optional[PreprocessOptions]) -> bytes:
+    """
+    返回预处理后的图片字节。处理失败、未安装 Pillow，或无需缩放且重新压缩收益不足时返回原图。
+    """
+    if options is None or Image is None:
+        return image_bytes
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            # 手机照片依赖 EXIF 方向，重新编码会丢弃 EXIF，需先按方向旋正
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            if options.crop_to_text:
+                bbox = detect_text_bbox(image)
+                if bbox and bbox != (0, 0, image.width, image.height):
+                    image = image.crop(bbox)
+            resized = False
+            if options.max_edge and max(image.size) > options.max_edge:
+                # 12MP 照片上 BICUBIC 比 LANCZOS 快约三成
+                image.thumbnail((options.max_edge, options.max_edge), Image.BICUBIC)
+                resized = True
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=options.jpeg_quality, optimize=True)
+    except Exception as e:
+        logger.warning(f"图片预处理失败，使用原图：{e}")
+        return image_bytes
+    processed = buffer.getvalue()
+    if not resized and not options.crop_to_text and len(processed) > len(image_bytes) * (1 - _MIN_RECOMPRESS_SAVING):
+        return image_bytes
+    return processed
@@ -1,11 +1,14 @@
-import base64
-import json
 import re
 from collections import defaultdict, deque
-from typing import Dict, List, Optional, Tuple, Set
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple, Set, Union
 
-import requests
-from fuzzywuzzy import fuzz, process
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from fuzzy_scoring import score_matrix
+from ocr_engines import get_default_engine
+from text_normalization import fuzzy_keys, normalize_components
 
 _NOISE_PARENTHESES_KEYWORDS = (
     "不可",
@@ -19,6 +22,10 @@ _NOISE_PARENTHESES_KEYWORDS = (
 )
 
 
+_PARENTHESES_SEGMENT_PATTERN = re.compile(r"[（\(][^（）\(\)]*[）\)]")
+_UNCLOSED_PARENTHESES_TAIL_PATTERN = re.compile(r"[（\(][^（）\(\)]*$")
+
+
 def _remove_noise_parentheses(text: str) -> str:
     """去除括号中仅包含提示/限制信息的部分，保留性别信息"""
     if not text:
@@ -33,12 +40,11 @@ def _remove_noise_parentheses(text: str) -> str:
         segment = match.group(0)
         return "" if should_remove(segment) else segment
 
-    cleaned = re.sub(r"[（\(][^（）\(\)]*[）\)]", repl, text)
+    cleaned = _PARENTHESES_SEGMENT_PATTERN.sub(repl, text)
 
     # 处理缺少右括号的尾部片段，如“（紫单不可替...”
-    tail_pattern = re.compile(r"[（\(][^（）\(\)]*$")
     while True:
-        tail_match = tail_pattern.search(cleaned)
+        tail_match = _UNCLOSED_PARENTHESES_TAIL_PATTERN.search(cleaned)
         if not tail_match:
             break
         segment = tail_match.group(0)
@@ -49,29 +55,18 @@ def _remove_noise_parentheses(text: str) -> str:
 
     return cleaned.strip()
 
-# --- [函数 1] 组件化精确匹配的“净化器” (无变化) ---
+
+# _extract_gender_marital_info 可能返回的全部关键字
+_GENDER_MARITAL_KEYWORDS = ("女未婚", "女已婚", "男", "女", "通用")
+
+
+# --- [函数 1] 组件化精确匹配的“净化器” ---
 def normalize_for_precise_matching(text: str) -> str:
     """
     通过预定义的组件列表，强制将字符串拆分为正确的、独立的组件。
+    结果由 text_normalization 的有界缓存记忆，同一名称只拆分一次。
     """
-    if not text:
-        return ""
-    
-    processed_text = re.sub(r'[（()\-（）、_]', ' ', text)
-
-    components = [
-        '方案[一二三四五六七八九十]+',
-        '女未婚', '女已婚',
-        '心脑血管', '血糖', '肿瘤',
-        '男', '女',
-        '[A-Za-z0-9]+',
-        '[\u4e00-\u9fa5]'
-    ]
-    regex = re.compile('|'.join(components))
-    
-    found_components = regex.findall(processed_text)
-
-    return " ".join(filter(None, found_components)).lower()
+    return normalize_components(text)
 
 
 # --- [函数 2] “分类器”辅助函数 (无变化) ---
@@ -91,96 +86,136 @@ def _extract_gender_marital_info(normalized_component_string: str) -> str:
     return "通用"
 
 
-# --- [函数 3] 最终修复版的智能精确匹配函数 (核心修改) ---
-def find_best_match(ocr_title: str, scheme_names: List[str]) -> Optional[str]:
+def _split_keyword_and_core(text: str) -> Tuple[str, str]:
+    """
+    组件化后拆出性别/婚姻关键字与去掉关键字后的“核心”名称。
+    注意：需要将关键字中的空格也移除，以匹配组件化的字符串
+    """
+    componentized = normalize_for_precise_matching(text)
+    keyword = _extract_gender_marital_info(componentized)
+    core_name = componentized.replace(keyword.replace(" ", ""), "").strip()
+    return keyword, core_name
+
+
+def _is_category_match(ocr_keyword: str, excel_keyword: str) -> bool:
+    if ocr_keyword == "通用" or excel_keyword == "通用":
+        return True
+    return ocr_keyword in excel_keyword or excel_keyword in ocr_keyword
+
+
+class SchemeIndex:
+    """
+    Excel 方案名称索引：每份解析后的 Excel 构建一次。
+
+    预先计算每个方案的关键字与核心名称，并按 OCR 标题可能出现的关键字分桶，
+    桶内保持方案的原始顺序，匹配时只需取桶再做一次打分。
+    """
+
+    def __init__(self, scheme_names: List[str]):
+        self.scheme_names = list(scheme_names)
+        entries = [(name, *_split_keyword_and_core(name)) for name in self.scheme_names]
+        self._buckets: Dict[str, List[Tuple[str, str]]] = {
+            ocr_keyword: [
+                (name, core_name)
+                for name, excel_keyword, core_name in entries
+                if _is_category_match(ocr_keyword, excel_keyword)
+            ]
+            for ocr_keyword in _GENDER_MARITAL_KEYWORDS
+        }
+        # 批量匹配用：全部方案的核心名称，以及每个关键字对应的候选掩码（与分桶等价）
+        self.core_names = [core_name for _, _, core_name in entries]
+        self._masks: Dict[str, np.ndarray] = {
+            ocr_keyword: np.array(
+                [_is_category_match(ocr_keyword, excel_keyword) for _, excel_keyword, _ in entries], dtype=bool
+            )
+            for ocr_keyword in _GENDER_MARITAL_KEYWORDS
+        }
+
+    def __len__(self) -> int:
+        return len(self.scheme_names)
+
+    def candidates(self, ocr_keyword: str) -> List[Tuple[str, str]]:
+        """返回与 OCR 关键字同类的 (原始方案名, 核心名称) 列表"""
+        return self._buckets.get(ocr_keyword, [])
+
+    def candidate_mask(self, ocr_keyword: str) -> np.ndarray:
+        """与 candidates 对应的布尔掩码，按 scheme_names 顺序"""
+        return self._masks.get(ocr_keyword, np.zeros(len(self.scheme_names), dtype=bool))
+
+
+# --- [函数 3] 智能精确匹配函数 ---
+def find_best_match(ocr_title: str, scheme_names: Union[List[str], SchemeIndex]) -> Optional[str]:
     """
-    最终修复版：
-    1. 分类匹配：使用宽松的关键字规则筛选候选方案。
+    1. 分类匹配：使用宽松的关键字规则筛选候选方案（SchemeIndex 分桶）。
     2. 核心匹配：移除关键字后，对方案的核心名称进行精确比较。
+
+    scheme_names 可直接传入预构建的 SchemeIndex，避免每次重复组件化 Excel 方案名。
     """
     if not ocr_title or not scheme_names:
         return None
+    scheme_index = scheme_names if isinstance(scheme_names, SchemeIndex) else SchemeIndex(scheme_names)
     
     processed_ocr_title = _remove_noise_parentheses(ocr_title)
-    print(f"Log: Matching OCR title '{processed_ocr_title or ocr_title}' against {len(scheme_names)} Excel scheme(s).")
-    
-    componentized_ocr_title = normalize_for_precise_matching(processed_ocr_title)
-    ocr_keyword = _extract_gender_marital_info(componentized_ocr_title)
+    print(f"Log: Matching OCR title '{processed_ocr_title or ocr_title}' against {len(scheme_index)} Excel scheme(s).")
     
-    # 移除关键字，得到OCR标题的“核心”部分
-    # 注意：需要将关键字中的空格也移除，以匹配组件化的字符串
-    ocr_core_name = componentized_ocr_title.replace(ocr_keyword.replace(" ", ""), "").strip()
+    ocr_keyword, ocr_core_name = _split_keyword_and_core(processed_ocr_title)
     
-    candidate_schemes = []
-    for name in scheme_names:
-        componentized_excel_name = normalize_for_precise_matching(name)
-        excel_keyword = _extract_gender_marital_info(componentized_excel_name)
-        
-        # 步骤 1: 分类匹配
-        is_category_match = False
-        if ocr_keyword == "通用" or excel_keyword == "通用":
-            is_category_match = True
-        elif ocr_keyword in excel_keyword or excel_keyword in ocr_keyword:
-            is_category_match = True
-        
-        if is_category_match:
-            # 移除关键字，得到Excel标题的“核心”部分
-            excel_core_name = componentized_excel_name.replace(excel_keyword.replace(" ", ""), "").strip()
-            # 将原始名称和核心名称一起存入候选列表
-            candidate_schemes.append({'original': name, 'core': excel_core_name})
-
+    # 步骤 1: 分类匹配
+    candidate_schemes = scheme_index.candidates(ocr_keyword)
     if not candidate_schemes:
         print(f"Log: No candidates found for OCR title '{ocr_title}' with keyword '{ocr_keyword}'")
         return None
         
     # 步骤 2: 核心匹配
-    # 从候选列表中提取所有的“核心”名称用于比较
-    core_name_choices = [c['core'] for c in candidate_schemes]
-    
-    # 使用严格的 token_sort_ratio 对“核心”名称进行比较
-    best_match_core, score = process.extractOne(
-        ocr_core_name,
-        core_name_choices,
-        scorer=fuzz.token_sort_ratio 
-    )
+    # 使用严格的 token_sort_ratio 对“核心”名称进行比较，一次打分得到全部候选得分
+    scores = score_matrix([ocr_core_name], [core_name for _, core_name in candidate_schemes], "token_sort_ratio")[0]
+    best_idx = int(scores.argmax())
+    best_match_core, score = candidate_schemes[best_idx][1], int(scores[best_idx])
     
     if score >= 95:
-        # 找到了匹配的“核心”名称，现在需要反向查找它对应的原始Excel方案名
-        for candidate in candidate_schemes:
-            if candidate['core'] == best_match_core:
-                print(f"Log: Matched OCR title '{ocr_title}' -> '{candidate['original']}' (score={score}).")
-                return candidate['original']
+        matched_name = candidate_schemes[best_idx][0]
+        print(f"Log: Matched OCR title '{ocr_title}' -> '{matched_name}' (score={score}).")
+        return matched_name
         
     print(f"Log: No precise match found for '{ocr_title}'. Best core candidate '{best_match_core}' had score {score}.")
     return None
 
+def find_best_matches(ocr_titles: List[str], scheme_index: SchemeIndex) -> List[Optional[str]]:
+    """
+    批量版 find_best_match，结果逐一相同：相同标题只归一一次，全部标题的核心名称与全部方案
+    一次性打分，再按各自的关键字掩码取同类候选中的最高分。
+    """
+    unique_titles = list(dict.fromkeys(title for title in ocr_titles if title))
+    if not unique_titles or not len(scheme_index):
+        return [None] * len(ocr_titles)
+    split_titles = [_split_keyword_and_core(_remove_noise_parentheses(title)) for title in unique_titles]
+    scores = score_matrix([core for _, core in split_titles], scheme_index.core_names, "token_sort_ratio")
+    matched: Dict[str, Optional[str]] = {}
+    for row, (title, (keyword, _)) in enumerate(zip(unique_titles, split_titles)):
+        # 非候选记为 -1，argmax 返回候选中按方案顺序的首个最高分
+        masked = np.where(scheme_index.candidate_mask(keyword), scores[row], -1)
+        best_idx = int(masked.argmax())
+        matched[title] = scheme_index.scheme_names[best_idx] if masked[best_idx] >= 95 else None
+    print(
+        f"Log: Batch matched {sum(1 for name in matched.values() if name)}/{len(unique_titles)} unique OCR title(s) "
+        f"against {len(scheme_index)} Excel scheme(s)."
+    )
+    return [matched.get(title) if title else None for title in ocr_titles]
+
 # ===================================================================
 # 以下是您文件中原有的其他函数，保持不变
 # ===================================================================
 
-def get_baidu_ocr_access_token(api_key: str, secret_key: str) -> Optional[str]:
-    url = f"https://aip.baidubce.com/oauth/2.0/token?grant_type=client_credentials&client_id={api_key}&client_secret={secret_key}"
-    try:
-        response = requests.post(url)
-        response.raise_for_status()
-        return response.json().get("access_token")
-    except Exception as e:
-        print(f"Log: Error getting access token: {e}")
-        return None
+def get_ocr_access_token(api_key: str, secret_key: str) -> Optional[str]:
+    return get_default_engine().get_access_token(api_key, secret_key)
 
-def get_ocr_result_from_baidu(access_token: str, image_path: str) -> Optional[dict]:
-    url = "https://aip.baidubce.com/rest/2.0/ocr/v1/accurate_basic?access_token=" + access_token
-    try:
-        with open(image_path, 'rb') as f:
-            img = base64.b64encode(f.read()).decode()
-        headers = {'content-type': 'application/x-www-form-urlencoded'}
-        params = {"image": img, "language_type": "CHN_ENG"}
-        response = requests.post(url, data=params, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Log: Error during OCR request for {image_path}: {e}")
-        return None
+def get_ocr_result(access_token: str, image_path: str) -> Optional[dict]:
+    """使用 MEC_OCR_ENGINE 指定的默认引擎识别图片"""
+    return get_default_engine().recognize(access_token, image_path)
+
+# 旧名称，保留兼容
+get_baidu_ocr_access_token = get_ocr_access_token
+get_ocr_result_from_baidu = get_ocr_result
 
 def _is_single_scheme_format(words: List[str]) -> bool:
     """检测是否为单方案结构"""
@@ -206,13 +241,15 @@ def _is_price_line(text: str) -> bool:
     return bool(re.fullmatch(r"\d+(\.\d+)?", cleaned))
 
 
-def _parse_single_scheme(words: List[str]) -> List[Tuple[str, List[str]]]:
+def _parse_single_scheme(words: List[str], title_positions: Optional[List[int]] = None) -> List[Tuple[str, List[str]]]:
     """解析单方案结构"""
     title_idx = next((idx for idx, text in enumerate(words) if "方案" in text), None)
     if title_idx is None:
         print("Log: Single-scheme payload missing title.")
         return []
     title = words[title_idx].strip()
+    if title_positions is not None:
+        title_positions.append(title_idx)
     start_idx = next((idx for idx, text in enumerate(words) if "自定义选项" in text), None)
     if start_idx is None:
         print("Log: Single-scheme payload missing '自定义选项' marker.")
@@ -263,7 +300,7 @@ def _trim_to_scheme_keyword(text: str) -> str:
     return text[idx:] if idx != -1 else text
 
 
-def _parse_multi_scheme(words: List[str]) -> List[Tuple[str, List[str]]]:
+def _parse_multi_scheme(words: List[str], title_positions: Optional[List[int]] = None) -> List[Tuple[str, List[str]]]:
     """解析多方案结构"""
     schemes: List[Tuple[str, List[str]]] = []
     idx = 0
@@ -275,6 +312,7 @@ def _parse_multi_scheme(words: List[str]) -> List[Tuple[str, List[str]]]:
             continue
 
         title_parts = [text.strip()]
+        title_idx = idx
         idx += 1
 
         # 收集可能拆行的标题碎片，例如“检)”之类的不含顿号的短文本
@@ -325,13 +363,20 @@ def _parse_multi_scheme(words: List[str]) -> List[Tuple[str, List[str]]]:
             print(f"Log: No project segments detected for scheme '{title}'.")
 
         schemes.append((_trim_to_scheme_keyword(title), _normalize_segments(segments)))
+        if title_positions is not None:
+            title_positions.append(title_idx)
 
         while idx < total and "分组交费" in words[idx]:
             idx += 1
     return schemes
 
 
-def extract_data_from_ocr_json(ocr_result: dict) -> List[Tuple[str, List[str]]]:
+def extract_data_from_ocr_json(
+    ocr_result: dict, title_positions: Optional[List[int]] = None
+) -> List[Tuple[str, List[str]]]:
+    """
+    解析 OCR 结果为 [(方案标题, 项目列表)]；传入 title_positions 时按方案顺序追加各标题所在的 words_result 下标
+    """
     words_result = ocr_result.get("words_result", [])
     if not words_result:
         print("Log: OCR returned empty words_result.")
@@ -341,9 +386,9 @@ def extract_data_from_ocr_json(ocr_result: dict) -> List[Tuple[str, List[str]]]:
         print("Log: OCR words list empty after stripping.")
         return []
     if _is_single_scheme_format(words):
-        schemes = _parse_single_scheme(words)
+        schemes = _parse_single_scheme(words, title_positions)
     else:
-        schemes = _parse_multi_scheme(words)
+        schemes = _parse_multi_scheme(words, title_positions)
     print(f"Log: Extracted {len(schemes)} scheme(s) from OCR payload.")
     for idx, (title, items) in enumerate(schemes, 1):
         print(f"Log: Scheme {idx} title=\"{title}\" item_count={len(items)}")
@@ -397,24 +442,130 @@ def build_alias_map(alias_data: List[List[str]]) -> Dict[str, str]:
 
     return alias_map
 
-def generate_comparison_report(excel_master_list: List[str], ocr_projects: List[str], alias_map: Dict[str, str]) -> List[Dict]:
-    def get_standard_name(term: str) -> str:
-        return alias_map.get(term, term)
-    remaining_ocr_projects = ocr_projects[:]
+
+class CompiledAliases(Mapping):
+    """
+    编译后的别名规则：只读的 {词条: 标准名} 映射。
+
+    每个规则版本编译一次，可直接代替 build_alias_map 的结果传给比对函数，并在工作线程间只读共享。
+    """
+
+    def __init__(self, alias_map: Dict[str, str]):
+        self._map = dict(alias_map)
+
+    def __getitem__(self, term: str) -> str:
+        return self._map[term]
+
+    def __iter__(self):
+        return iter(self._map)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def get(self, term: str, default: Optional[str] = None) -> Optional[str]:
+        return self._map.get(term, default)
+
+
+def compile_aliases(alias_data: List[List[str]]) -> CompiledAliases:
+    return CompiledAliases(build_alias_map(alias_data))
+
+# fuzz.ratio 四舍五入取整：两串长度之和达到该值时，不相等的字符串也可能得到 100 分
+_RATIO_ROUNDING_LENGTH = 200
+
+
+# 模糊匹配判定为“匹配”的最低得分
+MATCH_SCORE_THRESHOLD = 85
+
+ASSIGNMENT_MODES = ("greedy", "optimal")
+DEFAULT_ASSIGNMENT_MODE = "greedy"
+
+
+def resolve_assignment_mode(mode: Optional[str], source: str = "") -> str:
+    """校验配置中的分配模式（忽略大小写与首尾空格）；未设置时为 greedy，未知取值回退为 greedy 并给出警告"""
+    normalized = (mode or "").strip().lower()
+    if normalized in ASSIGNMENT_MODES:
+        return normalized
+    if not normalized:
+        return DEFAULT_ASSIGNMENT_MODE
+    print(f"Log: Warning: unknown assignment mode {mode!r}{f' from {source}' if source else ''}, falling back to '{DEFAULT_ASSIGNMENT_MODE}'.")
+    return DEFAULT_ASSIGNMENT_MODE
+
+
+def _assign_greedy(excel_keys: List[str], ocr_keys: List[str], scores: Optional[np.ndarray] = None) -> Dict[int, int]:
+    """
+    按 Excel 顺序贪心分配：每个 Excel 项目取剩余 OCR 项目中得分最高（同分取靠前）的一项。
+
+    归一后完全相同的项目（精确/别名命中）直接通过哈希表定位；其余项目一次性计算得分矩阵后再逐行选取，
+    结果与逐项调用 process.extractOne 完全一致。scores 为调用方批量算好的完整得分矩阵。
+    """
+    remaining = np.ones(len(ocr_keys), dtype=bool)
+    remaining_count = len(ocr_keys)
+    max_ocr_key_len = max((len(key) for key in ocr_keys), default=0)
+
+    key_positions: Dict[str, deque] = defaultdict(deque)
+    for position, key in enumerate(ocr_keys):
+        key_positions[key].append(position)
+
+    def exact_hit(key: str) -> Optional[int]:
+        positions = key_positions.get(key)
+        while positions and not remaining[positions[0]]:
+            positions.popleft()
+        if not positions or len(key) + max_ocr_key_len >= _RATIO_ROUNDING_LENGTH:
+            return None
+        return positions[0]
+
+    # 初始即无法哈希命中的 Excel 项目，一次性批量打分
+    if scores is not None:
+        score_rows = dict(enumerate(scores))
+    else:
+        fuzzy_rows = [idx for idx, key in enumerate(excel_keys) if key not in key_positions]
+        score_rows = dict(zip(fuzzy_rows, score_matrix([excel_keys[idx] for idx in fuzzy_rows], ocr_keys, processed=True)))
+
+    assigned: Dict[int, int] = {}
+    for idx, excel_key in enumerate(excel_keys):
+        if not remaining_count:
+            break
+        best_position = exact_hit(excel_key)
+        if best_position is None:
+            row = score_rows.get(idx)
+            if row is None:
+                # 哈希候选已被前面的 Excel 项目占用，退回单行打分
+                row = score_matrix([excel_key], ocr_keys, processed=True)[0]
+            # 已分配的 OCR 项目记为 -1，argmax 返回首个最高分
+            masked = np.where(remaining, row, -1)
+            best_position = int(masked.argmax())
+            if masked[best_position] < MATCH_SCORE_THRESHOLD:
+                continue
+        assigned[idx] = best_position
+        remaining[best_position] = False
+        remaining_count -= 1
+    return assigned
+
+
+def _assign_optimal(excel_keys: List[str], ocr_keys: List[str], scores: Optional[np.ndarray] = None) -> Dict[int, int]:
+    """
+    全局最优分配：在得分 >= 阈值的边上求最大权二分匹配（匈牙利算法），
+    避免靠前的 Excel 项目抢走后面项目更匹配的 OCR 项目。
+    """
+    if not excel_keys or not ocr_keys:
+        return {}
+    if scores is None:
+        scores = score_matrix(excel_keys, ocr_keys, processed=True)
+    weights = np.where(scores >= MATCH_SCORE_THRESHOLD, scores, 0)
+    rows, cols = linear_sum_assignment(weights, maximize=True)
+    return {
+        int(row): int(col)
+        for row, col in zip(rows, cols)
+        if scores[row, col] >= MATCH_SCORE_THRESHOLD
+    }
+
+
+def _build_report(excel_master_list: List[str], ocr_projects: List[str], assigned: Dict[int, int]) -> List[Dict]:
     report = []
-    for excel_item in excel_master_list:
-        if not remaining_ocr_projects:
-            report.append({'excel_item': excel_item, 'ocr_item': '【缺失】', 'status': '缺失'})
-            continue
-        standard_excel_item = get_standard_name(excel_item)
-        normalized_ocr_choices = {ocr_item: get_standard_name(ocr_item) for ocr_item in remaining_ocr_projects}
-        best_match_normalized, score = process.extractOne(standard_excel_item, normalized_ocr_choices.values(), scorer=fuzz.ratio)
-        if score >= 85:
-            original_ocr_item = ""
-            for original, normalized in normalized_ocr_choices.items():
-                if normalized == best_match_normalized:
-                    original_ocr_item = original
-                    break
+    for idx, excel_item in enumerate(excel_master_list):
+        position = assigned.get(idx)
+        if position is not None:
+            original_ocr_item = ocr_projects[position]
             match_type = 'exact' if excel_item == original_ocr_item else 'alias'
             report.append({
                 'excel_item': excel_item,
@@ -422,17 +573,81 @@ def generate_comparison_report(excel_master_list: List[str], ocr_projects: List[
                 'status': '匹配',
                 'match_type': match_type
             })
-            remaining_ocr_projects.remove(original_ocr_item)
         else:
             report.append({
                 'excel_item': excel_item,
                 'ocr_item': '【缺失】',
                 'status': '缺失'
             })
-    for ocr_item in remaining_ocr_projects:
+    used_positions = set(assigned.values())
+    for position, ocr_item in enumerate(ocr_projects):
+        if position in used_positions:
+            continue
         report.append({
             'excel_item': '【多余】',
             'ocr_item': ocr_item,
             'status': '多余'
         })
     return report
+
+
+def generate_comparison_report(
+    excel_master_list: List[str],
+    ocr_projects: List[str],
+    alias_map: Dict[str, str],
+    assignment: str = "greedy",
+) -> List[Dict]:
+    """
+    生成 Excel 项目与 OCR 项目的比对报告，得分 >= 85 视为匹配。
+
+    assignment="greedy" 按 Excel 顺序贪心分配（默认）；"optimal" 求全局最大权匹配。
+    两种模式的报告结构与状态值相同：先按 Excel 顺序列出匹配/缺失，再按 OCR 顺序列出多余项目。
+    """
+    if assignment not in ASSIGNMENT_MODES:
+        raise ValueError(f"未知的分配模式: {assignment}")
+
+    def get_standard_name(term: str) -> str:
+        return alias_map.get(term, term)
+
+    # 与 process.extractOne 的默认处理器保持一致，每个名称只归一一次
+    excel_keys = fuzzy_keys([get_standard_name(item) for item in excel_master_list])
+    ocr_keys = fuzzy_keys([get_standard_name(item) for item in ocr_projects])
+    if assignment == "optimal":
+        assigned = _assign_optimal(excel_keys, ocr_keys)
+    else:
+        assigned = _assign_greedy(excel_keys, ocr_keys)
+    return _build_report(excel_master_list, ocr_projects, assigned)
+
+
+def generate_comparison_reports(
+    pairs: List[Tuple[List[str], List[str]]],
+    alias_map: Dict[str, str],
+    assignment: str = "greedy",
+) -> List[List[Dict]]:
+    """
+    批量版 generate_comparison_report，pairs 为 [(Excel 项目列表, OCR 项目列表)]，结果逐一相同。
+
+    整批中出现的每个项目名称只做一次别名替换与预处理；全部 Excel 项目与全部 OCR 项目只打一次分，
+    各方案从中切出自己的子矩阵完成分配。
+    """
+    if assignment not in ASSIGNMENT_MODES:
+        raise ValueError(f"未知的分配模式: {assignment}")
+    names = list(dict.fromkeys(item for excel_items, ocr_items in pairs for item in (*excel_items, *ocr_items)))
+    key_of = dict(zip(names, fuzzy_keys([alias_map.get(name, name) for name in names])))
+    excel_vocab = list(dict.fromkeys(key_of[item] for excel_items, _ in pairs for item in excel_items))
+    ocr_vocab = list(dict.fromkeys(key_of[item] for _, ocr_items in pairs for item in ocr_items))
+    scores = score_matrix(excel_vocab, ocr_vocab, processed=True)
+    excel_row = {key: row for row, key in enumerate(excel_vocab)}
+    ocr_col = {key: col for col, key in enumerate(ocr_vocab)}
+
+    reports = []
+    for excel_items, ocr_items in pairs:
+        excel_keys = [key_of[item] for item in excel_items]
+        ocr_keys = [key_of[item] for item in ocr_items]
+        sub_scores = scores[np.ix_([excel_row[key] for key in excel_keys], [ocr_col[key] for key in ocr_keys])]
+        if assignment == "optimal":
+            assigned = _assign_optimal(excel_keys, ocr_keys, sub_scores)
+        else:
+            assigned = _assign_greedy(excel_keys, ocr_keys, sub_scores)
+        reports.append(_build_report(excel_items, ocr_items, assigned))
+    return reports
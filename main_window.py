@@ -15,6 +15,7 @@ from settings_dialog import SettingsDialog
 from excel_parser import MedicalExamParser
 from workers import Worker
 import logic
+from ocr_engines import OcrEngineUnavailable, get_default_engine
 from styles import MODERN_STYLE, STATUS_COLORS, EDITABLE_TABLE_STYLE
 
 STATUS_ICON = {
@@ -240,7 +241,11 @@ class MainWindow(QMainWindow):
         if not self.excel_path or not self.image_paths: return
         api_key = self.settings.value("ocr/api_key", type=str)
         secret_key = self.settings.value("ocr/secret_key", type=str)
-        if not api_key or not secret_key:
+        try:
+            engine = get_default_engine()
+        except OcrEngineUnavailable as e:
+            QMessageBox.warning(self, "OCR引擎不可用", str(e)); return
+        if engine.requires_credentials and (not api_key or not secret_key):
             QMessageBox.warning(self, "缺少配置", "请在'设置'中配置百度OCR的API Key和Secret Key."); return
         base_rows = getattr(self, "base_scheme_row_count", self.results_table.rowCount())
         while self.results_table.rowCount() > base_rows:
@@ -424,8 +429,10 @@ class MainWindow(QMainWindow):
     def processing_thread(image_paths, settings, excel_data, scheme_to_row_map, progress_callback):
         alias_data = settings.value("rules/aliases", []); alias_map = logic.build_alias_map(alias_data)
         api_key = settings.value("ocr/api_key", type=str); secret_key = settings.value("ocr/secret_key", type=str)
-        full_scheme_names = list(scheme_to_row_map.keys())
-        access_token = logic.get_baidu_ocr_access_token(api_key, secret_key)
+        scheme_index = logic.SchemeIndex(list(scheme_to_row_map.keys()))
+        assignment = logic.resolve_assignment_mode(settings.value("matching/assignment", "greedy", type=str), "matching/assignment")
+        ocr_client = get_default_engine()
+        access_token = ocr_client.get_access_token(api_key, secret_key)
         if not access_token: raise Exception("获取百度OCR Access Token失败，请检查API密钥。")
         final_results = {}
         total_images = len(image_paths)
@@ -438,7 +445,7 @@ class MainWindow(QMainWindow):
                 "image_name": os.path.basename(img_path),
                 "image_path": img_path
             })
-            ocr_json = logic.get_ocr_result_from_baidu(access_token, img_path)
+            ocr_json = ocr_client.recognize(access_token, img_path)
             if not ocr_json:
                 progress_callback.emit({
                     "row": None,
@@ -474,7 +481,7 @@ class MainWindow(QMainWindow):
                 continue
             for ocr_title, ocr_items in schemes:
                 display_title = ocr_title if ocr_title else f"[{os.path.basename(img_path)}]"
-                matched_full_scheme = logic.find_best_match(ocr_title, full_scheme_names)
+                matched_full_scheme = logic.find_best_match(ocr_title, scheme_index)
                 if not matched_full_scheme:
                     progress_callback.emit({
                         "row": None,
@@ -492,7 +499,7 @@ class MainWindow(QMainWindow):
                 if len(parts) != 2: continue
                 matched_sheet, sub_category = parts[0], parts[1]
                 excel_items = excel_data.get(matched_sheet, {}).get(sub_category, [])
-                comparison = logic.generate_comparison_report(excel_items, ocr_items, alias_map)
+                comparison = logic.generate_comparison_report(excel_items, ocr_items, alias_map, assignment)
                 stats = {"matched": sum(1 for i in comparison if i['status'] == '匹配'), "missing": sum(1 for i in comparison if i['status'] == '缺失'), "extra": sum(1 for i in comparison if i['status'] == '多余')}
                 final_status = "matched_perfect" if stats['missing'] == 0 and stats['extra'] == 0 else "matched_imperfect"
                 progress_callback.emit({"row": row_to_update, "status": final_status, "stats": stats, "ocr_title": display_title})
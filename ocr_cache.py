@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR 结果磁盘缓存
+以图片内容的 SHA-256 + OCR 接口 + 识别语言为键，重复上传同一截图时直接复用识别结果
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(image_bytes: bytes, endpoint: str, language: str, variant: str = "") -> str:
+    """生成内容寻址的缓存键；variant 区分同一原图的不同预处理参数"""
+    return make_cache_key_for_digest(hashlib.sha256(image_bytes).hexdigest(), endpoint, language, variant)
+
+
+def make_cache_key_for_digest(image_digest: str, endpoint: str, language: str, variant: str = "") -> str:
+    """图片的 SHA-256 已在上传时计算好时，直接由摘要生成缓存键"""
+    parts = [endpoint, language, image_digest]
+    if variant:
+        parts.append(variant)
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class OcrResultCache:
+    """
+    基于目录的 LRU 缓存：每条结果一个 JSON 文件，总大小超过 max_bytes 时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> 文件大小，按最近使用时间从旧到新排列
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._scan()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _scan(self) -> None:
+        """启动时按文件修改时间重建 LRU 顺序"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path_for(key)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    payload = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"OCR 缓存条目损坏，已丢弃 {key}: {e}")
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: str, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"写入 OCR 缓存失败 {key}: {e}")
+                return
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _discard(self, key: str) -> None:
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            self._path_for(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
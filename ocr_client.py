@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+百度 OCR 客户端
+复用 HTTP 连接池，统一超时设置，并对 5xx / QPS 超限等临时错误做退避重试；
+Access Token 与识别结果均可缓存，避免重复的 OAuth 与计费 OCR 调用；
+上传前按 image_preprocess 缩放并重新压缩图片；拼接长图走带位置信息的 accurate 接口
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from image_preprocess import PreprocessOptions, preprocess_image_bytes
+from ocr_cache import OcrResultCache, make_cache_key, make_cache_key_for_digest
+from ocr_engines import OcrEngine, Throttle
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
+ACCURATE_BASIC_URL = "https://aip.baidubce.com/rest/2.0/ocr/v1/accurate_basic"
+# 高精度含位置版：每行额外返回 location {top, left, width, height}，用于把拼接图的文字映射回原图
+ACCURATE_URL = "https://aip.baidubce.com/rest/2.0/ocr/v1/accurate"
+LANGUAGE_TYPE = "CHN_ENG"
+# 每秒请求上限（百度 accurate_basic 免费额度为 2 QPS），0 表示不限速
+QPS_LIMIT = float(os.getenv("MEC_OCR_QPS_LIMIT", "2"))
+
+# 百度返回 HTTP 200 但 error_code 表示可重试的临时错误：
+# 2 服务暂不可用, 4 集群超限, 18 QPS 超限, 282000 服务内部错误
+RETRYABLE_ERROR_CODES = {2, 4, 18, 282000}
+# 110 Access Token 无效, 111 Access Token 过期
+TOKEN_INVALID_ERROR_CODES = {110, 111}
+
+# 设置后 Access Token 会持久化到该文件，重启后无需重新走 OAuth
+TOKEN_CACHE_PATH = os.getenv("MEC_OCR_TOKEN_CACHE")
+
+# OCR 结果缓存目录与容量上限（MB），容量设为 0 可关闭缓存
+RESULT_CACHE_DIR = os.getenv(
+    "MEC_OCR_RESULT_CACHE_DIR", str(Path.home() / ".cache" / "MedicalExamChecker" / "ocr_results")
+)
+RESULT_CACHE_MB = int(os.getenv("MEC_OCR_RESULT_CACHE_MB", "512"))
+
+
+class OcrRequestError(Exception):
+    """OCR 请求在重试耗尽后仍失败"""
+
+
+def _secret_digest(secret_key: str) -> str:
+    return hashlib.sha256(secret_key.encode("utf-8")).hexdigest()
+
+
+class AccessTokenCache:
+    """
+    按 api_key 缓存 Access Token，在过期前 refresh_margin 秒主动刷新。
+
+    同一 api_key 的并发刷新共享一次 OAuth 请求；指定 persist_path 时写入磁盘，
+    文件中只保存 secret_key 的摘要，用于检测密钥变更。
+    """
+
+    def __init__(self, persist_path: Optional[str] = None, refresh_margin: float = 3600.0):
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.refresh_margin = refresh_margin
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = {key: value for key, value in data.items() if isinstance(value, dict)}
+        except Exception as e:
+            logger.warning(f"读取 Access Token 缓存失败，忽略：{e}")
+
+    def _save(self) -> None:
+        if not self.persist_path:
+            return
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logger.warning(f"写入 Access Token 缓存失败：{e}")
+
+    def _lock_for(self, api_key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(api_key, threading.Lock())
+
+    def _valid_token(self, api_key: str, secret_key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(api_key)
+        if not entry or entry.get("secret_digest") != _secret_digest(secret_key):
+            return None
+        if entry.get("expires_at", 0) - self.refresh_margin <= time.time():
+            return None
+        return entry.get("access_token")
+
+    def get(
+        self,
+        api_key: str,
+        secret_key: str,
+        fetch: Callable[[str, str], Optional[Tuple[str, int]]],
+    ) -> Optional[str]:
+        """
+        返回有效 token；缺失或即将过期时调用 fetch(api_key, secret_key) -> (token, expires_in) 刷新。
+        """
+        token = self._valid_token(api_key, secret_key)
+        if token:
+            return token
+        with self._lock_for(api_key):
+            # 等锁期间可能已被其他线程刷新
+            token = self._valid_token(api_key, secret_key)
+            if token:
+                return token
+            fetched = fetch(api_key, secret_key)
+            if not fetched:
+                return None
+            token, expires_in = fetched
+            with self._lock:
+                self._entries[api_key] = {
+                    "access_token": token,
+                    "expires_at": time.time() + expires_in,
+                    "secret_digest": _secret_digest(secret_key),
+                }
+                self._save()
+            logger.info(f"Access Token 已刷新，有效期 {expires_in / 86400:.1f} 天")
+            return token
+
+    def invalidate_token(self, access_token: str) -> None:
+        """服务端判定 token 失效时丢弃对应缓存，下次调用重新获取"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.get("access_token") == access_token]
+            for key in stale:
+                self._entries.pop(key, None)
+            if stale:
+                self._save()
+
+
+class BaiduOcrClient(OcrEngine):
+    """
+    带连接池的百度 OCR 客户端，线程安全，可在多个并发任务间共享。
+    """
+
+    name = "baidu"
+    requires_credentials = True
+    supports_location = True
+    qps_limit = QPS_LIMIT
+
+    def __init__(
+        self,
+        pool_size: int = 8,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 8.0,
+        token_cache: Optional[AccessTokenCache] = None,
+        result_cache: Optional[OcrResultCache] = None,
+        preprocess: Optional[PreprocessOptions] = None,
+    ):
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.token_cache = token_cache or AccessTokenCache()
+        self.result_cache = result_cache
+        self.preprocess = preprocess
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+
+    def _post_json(self, url: str, throttle: Optional[Throttle] = None, **kwargs: Any) -> Dict[str, Any]:
+        """
+        发送 POST 请求并解析 JSON；连接错误、超时、5xx 与可重试的 error_code 按指数退避重试。
+        throttle 在每次发出请求前调用，重试同样占用配额。
+        """
+        last_error = ""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self._backoff(attempt - 1)
+                logger.warning("OCR 请求重试 %d/%d，%.1fs 后重试：%s", attempt, self.max_retries, delay, last_error)
+                time.sleep(delay)
+            if throttle is not None:
+                throttle()
+            try:
+                response = self.session.post(url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                last_error = str(exc)
+                continue
+            if response.status_code >= 500:
+                last_error = f"HTTP {response.status_code}"
+                continue
+            response.raise_for_status()
+            payload = response.json()
+            if payload.get("error_code") in RETRYABLE_ERROR_CODES:
+                last_error = f"error_code={payload.get('error_code')} {payload.get('error_msg', '')}".strip()
+                continue
+            return payload
+        raise OcrRequestError(last_error or "OCR 请求失败")
+
+    def _fetch_access_token(self, api_key: str, secret_key: str) -> Optional[Tuple[str, int]]:
+        params = {"grant_type": "client_credentials", "client_id": api_key, "client_secret": secret_key}
+        try:
+            payload = self._post_json(TOKEN_URL, params=params)
+        except Exception as e:
+            logger.error(f"Error getting access token: {e}")
+            return None
+        token = payload.get("access_token")
+        if not token:
+            logger.error(f"Error getting access token: {payload.get('error_description') or payload}")
+            return None
+        # 百度默认有效期 30 天
+        return token, int(payload.get("expires_in", 30 * 86400))
+
+    def get_access_token(self, api_key: str, secret_key: str) -> Optional[str]:
+        return self.token_cache.get(api_key, secret_key, self._fetch_access_token)
+
+    def recognize(
+        self, access_token: str, image_path: str, image_sha256: Optional[str] = None, throttle: Optional[Throttle] = None
+    ) -> Optional[dict]:
+        """
+        识别单张图片；image_sha256 为上传时已算好的内容摘要，提供时缓存命中无需再读取文件。
+        """
+        try:
+            image_bytes: Optional[bytes] = None
+            cache_key = None
+            variant = self.preprocess.fingerprint() if self.preprocess else ""
+            if self.result_cache is not None:
+                if image_sha256:
+                    cache_key = make_cache_key_for_digest(image_sha256, ACCURATE_BASIC_URL, LANGUAGE_TYPE, variant)
+                else:
+                    with open(image_path, "rb") as f:
+                        image_bytes = f.read()
+                    cache_key = make_cache_key(image_bytes, ACCURATE_BASIC_URL, LANGUAGE_TYPE, variant)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"OCR 缓存命中: {image_path}")
+                    return cached
+            if image_bytes is None:
+                with open(image_path, "rb") as f:
+                    image_bytes = f.read()
+            image_bytes = preprocess_image_bytes(image_bytes, self.preprocess)
+            payload = self._post_image(access_token, image_bytes, ACCURATE_BASIC_URL, throttle)
+            if cache_key and "error_code" not in payload and payload.get("words_result") is not None:
+                self.result_cache.put(cache_key, payload)
+            return payload
+        except Exception as e:
+            logger.error(f"Error during OCR request for {image_path}: {e}")
+            return None
+
+    def recognize_with_location(
+        self, access_token: str, image_bytes: bytes, label: str = "stitched", throttle: Optional[Throttle] = None
+    ) -> Optional[dict]:
+        """
+        识别内存中的图片（如拼接长图），words_result 每行带 location。
+        不做预处理：拼接时已按接口的尺寸与体积上限控制好图片。label 仅用于日志。
+        """
+        try:
+            cache_key = None
+            if self.result_cache is not None:
+                cache_key = make_cache_key(image_bytes, ACCURATE_URL, LANGUAGE_TYPE)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"OCR 缓存命中: {label}")
+                    return cached
+            payload = self._post_image(access_token, image_bytes, ACCURATE_URL, throttle)
+            if cache_key and "error_code" not in payload and payload.get("words_result") is not None:
+                self.result_cache.put(cache_key, payload)
+            return payload
+        except Exception as e:
+            logger.error(f"Error during OCR request for {label}: {e}")
+            return None
+
+    def _post_image(
+        self, access_token: str, image_bytes: bytes, url: str, throttle: Optional[Throttle] = None
+    ) -> Dict[str, Any]:
+        headers = {"content-type": "application/x-www-form-urlencoded"}
+        data = {"image": base64.b64encode(image_bytes).decode(), "language_type": LANGUAGE_TYPE}
+        payload = self._post_json(url, throttle, params={"access_token": access_token}, data=data, headers=headers)
+        if payload.get("error_code") in TOKEN_INVALID_ERROR_CODES:
+            self.token_cache.invalidate_token(access_token)
+        return payload
+
+
+_default_client: Optional[BaiduOcrClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> BaiduOcrClient:
+    """进程内共享的默认客户端，首次调用时创建"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            result_cache = None
+            if RESULT_CACHE_MB > 0:
+                try:
+                    result_cache = OcrResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MB * 1024 * 1024)
+                except OSError as e:
+                    logger.warning(f"OCR 结果缓存不可用：{e}")
+            _default_client = BaiduOcrClient(
+                token_cache=AccessTokenCache(TOKEN_CACHE_PATH),
+                result_cache=result_cache,
+                preprocess=PreprocessOptions.from_env(),
+            )
+        return _default_client
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR 引擎接口
+所有引擎返回统一的百度风格结构 {"words_result": [{"words": ..., "location": {...}}], "words_result_num": n}，
+解析与比对逻辑与具体引擎无关。内置三种引擎：
+- baidu：百度高精度 OCR（ocr_client.BaiduOcrClient，按量计费）
+- local：本机 CPU 识别，优先 PaddleOCR，其次 Tesseract（均为可选依赖），适合离线与大批量场景
+- replay：按图片 SHA-256 回放已录制的 JSON，用于测试与基准测试
+通过 MEC_OCR_ENGINE 选择默认引擎
+"""
+
+import abc
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow 为可选依赖
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+OCR_ENGINE = os.getenv("MEC_OCR_ENGINE", "baidu")
+# local 引擎的后端：paddle / tesseract，留空时按安装情况自动选择
+LOCAL_OCR_BACKEND = os.getenv("MEC_OCR_LOCAL_BACKEND") or None
+# Tesseract 语言包
+TESSERACT_LANG = os.getenv("MEC_OCR_TESSERACT_LANG", "chi_sim")
+# replay 引擎的语料目录，文件名为 <图片SHA-256>.json
+REPLAY_DIR = os.getenv("MEC_OCR_REPLAY_DIR", str(Path(__file__).resolve().parent / "benchmarks" / "ocr_corpus"))
+
+# 无需鉴权的引擎使用的占位 token，保持与百度客户端相同的调用方式
+LOCAL_ACCESS_TOKEN = "local"
+
+LOCAL_BACKENDS = ("paddle", "tesseract")
+# 每次向服务商发出请求前调用的节流函数，阻塞到配额允许为止
+Throttle = Callable[[], None]
+ENGINE_NAMES = ("baidu", "local", "replay")
+
+
+class OcrEngineUnavailable(RuntimeError):
+    """引擎不存在或依赖未安装"""
+
+
+def make_words_result(lines: List[Tuple[str, Optional[Dict[str, int]]]]) -> Dict[str, Any]:
+    """由 (文本, location) 列表构造统一结构；location 为 None 时省略该字段，空文本被丢弃"""
+    words_result = []
+    for text, location in lines:
+        text = (text or "").strip()
+        if not text:
+            continue
+        entry: Dict[str, Any] = {"words": text}
+        if location is not None:
+            entry["location"] = location
+        words_result.append(entry)
+    return {"words_result": words_result, "words_result_num": len(words_result)}
+
+
+def _box_location(points: Any) -> Dict[str, int]:
+    """多边形顶点 [[x, y], ...] 转为百度格式的外接矩形"""
+    xs = [float(point[0]) for point in points]
+    ys = [float(point[1]) for point in points]
+    left, top = int(min(xs)), int(min(ys))
+    return {"top": top, "left": left, "width": int(max(xs)) - left, "height": int(max(ys)) - top}
+
+
+class OcrEngine(abc.ABC):
+    """
+    OCR 引擎基类，子类须实现 recognize 与 recognize_with_location，缺少任一方法时在创建实例时即报错。
+    requires_credentials 表示是否需要 API Key / Secret Key；
+    supports_location 表示结果是否带 location（拼接识别依赖位置把文字映射回原图）；
+    qps_limit 为服务商的每秒请求上限，None 表示不限速（本地识别与回放）。
+    """
+
+    name = ""
+    requires_credentials = False
+    supports_location = False
+    qps_limit: Optional[float] = None
+
+    def get_access_token(self, api_key: str, secret_key: str) -> Optional[str]:
+        """无需鉴权的引擎返回占位 token"""
+        return LOCAL_ACCESS_TOKEN
+
+    @abc.abstractmethod
+    def recognize(
+        self,
+        access_token: str,
+        image_path: str,
+        image_sha256: Optional[str] = None,
+        throttle: Optional[Throttle] = None,
+    ) -> Optional[dict]:
+        """
+        识别单张图片，失败时返回 None。
+        throttle 由调用方传入（共享的配额节流器），有 qps_limit 的引擎须在每次实际发出请求前调用，包括重试；
+        缓存命中或不发请求的引擎不调用。
+        """
+
+    @abc.abstractmethod
+    def recognize_with_location(
+        self,
+        access_token: str,
+        image_bytes: bytes,
+        label: str = "stitched",
+        throttle: Optional[Throttle] = None,
+    ) -> Optional[dict]:
+        """识别内存中的图片，words_result 每行带 location；supports_location 为 False 的引擎返回 None。throttle 同 recognize"""
+
+    def close(self) -> None:
+        pass
+
+
+def _detect_local_backend() -> str:
+    for backend, module in (("paddle", "paddleocr"), ("tesseract", "pytesseract")):
+        try:
+            __import__(module)
+            return backend
+        except ImportError:
+            continue
+    raise OcrEngineUnavailable("本地 OCR 需要安装 paddleocr 或 pytesseract")
+
+
+class LocalOcrEngine(OcrEngine):
+    """
+    本机 CPU 识别。模型在首次识别时加载，推理不保证线程安全，同一引擎内的识别串行执行；
+    需要更高吞吐时按 CPU 核数部署多个进程。
+    """
+
+    name = "local"
+    supports_location = True
+
+    def __init__(self, backend: Optional[str] = None, tesseract_lang: str = TESSERACT_LANG):
+        backend = backend or _detect_local_backend()
+        if backend not in LOCAL_BACKENDS:
+            raise OcrEngineUnavailable(f"未知的本地 OCR 后端: {backend}")
+        if Image is None:
+            raise OcrEngineUnavailable("本地 OCR 需要安装 Pillow")
+        self.backend = backend
+        self.tesseract_lang = tesseract_lang
+        self._model: Any = None
+        self._lock = threading.Lock()
+
+    def _load_model(self) -> Any:
+        if self._model is None:
+            try:
+                if self.backend == "paddle":
+                    from paddleocr import PaddleOCR
+
+                    self._model = PaddleOCR(use_angle_cls=True, lang="ch", show_log=False)
+                else:
+                    import pytesseract
+
+                    self._model = pytesseract
+            except ImportError as e:
+                raise OcrEngineUnavailable(f"本地 OCR 后端 {self.backend} 未安装：{e}") from e
+        return self._model
+
+    def _run_paddle(self, image: "Image.Image") -> List[Tuple[str, Optional[Dict[str, int]]]]:
+        import numpy as np
+
+        # PaddleOCR 的 ndarray 输入按 OpenCV 约定为 BGR
+        pages = self._load_model().ocr(np.asarray(image)[:, :, ::-1], cls=True) or []
+        lines: List[Tuple[str, Optional[Dict[str, int]]]] = []
+        for page in pages:
+            for box, (text, _score) in page or []:
+                lines.append((text, _box_location(box)))
+        return lines
+
+    def _run_tesseract(self, image: "Image.Image") -> List[Tuple[str, Optional[Dict[str, int]]]]:
+        pytesseract = self._load_model()
+        data = pytesseract.image_to_data(image, lang=self.tesseract_lang, output_type=pytesseract.Output.DICT)
+        # Tesseract 按词输出，按 (block, par, line) 合并为行，与百度的行粒度一致
+        grouped: Dict[Tuple[int, int, int], List[int]] = {}
+        for idx, text in enumerate(data["text"]):
+            if text.strip() and float(data["conf"][idx]) >= 0:
+                grouped.setdefault((data["block_num"][idx], data["par_num"][idx], data["line_num"][idx]), []).append(idx)
+        lines: List[Tuple[str, Optional[Dict[str, int]]]] = []
+        for indexes in grouped.values():
+            text = ""
+            for idx in indexes:
+                word = data["text"][idx].strip()
+                # 中文词之间不加空格，英文与数字词之间保留空格
+                if text and text[-1].isascii() and word[0].isascii():
+                    text += " "
+                text += word
+            points = []
+            for idx in indexes:
+                left, top = data["left"][idx], data["top"][idx]
+                points.extend([(left, top), (left + data["width"][idx], top + data["height"][idx])])
+            lines.append((text, _box_location(points)))
+        return lines
+
+    def _recognize_image(self, image_bytes: bytes, label: str) -> Optional[dict]:
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as source:
+                image = ImageOps.exif_transpose(source).convert("RGB")
+            with self._lock:
+                lines = self._run_paddle(image) if self.backend == "paddle" else self._run_tesseract(image)
+        except OcrEngineUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"本地 OCR 识别失败 {label}: {e}")
+            return None
+        return make_words_result(lines)
+
+    def recognize(
+        self, access_token: str, image_path: str, image_sha256: Optional[str] = None, throttle: Optional[Throttle] = None
+    ) -> Optional[dict]:
+        try:
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+        except OSError as e:
+            logger.error(f"读取图片失败 {image_path}: {e}")
+            return None
+        return self._recognize_image(image_bytes, image_path)
+
+    def recognize_with_location(
+        self, access_token: str, image_bytes: bytes, label: str = "stitched", throttle: Optional[Throttle] = None
+    ) -> Optional[dict]:
+        return self._recognize_image(image_bytes, label)
+
+
+class ReplayOcrEngine(OcrEngine):
+    """
+    按图片内容的 SHA-256 从语料目录读取已录制的 OCR 结果，不发起任何网络请求；未录制的图片返回 None。
+    """
+
+    name = "replay"
+    supports_location = True
+
+    def __init__(self, corpus_dir: str = REPLAY_DIR):
+        self.corpus_dir = Path(corpus_dir)
+        self.misses = 0
+
+    def payload_path(self, image_sha256: str) -> Path:
+        return self.corpus_dir / f"{image_sha256}.json"
+
+    def _load(self, image_sha256: str, label: str) -> Optional[dict]:
+        path = self.payload_path(image_sha256)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            logger.warning(f"回放语料中没有该图片的 OCR 结果: {label} ({image_sha256[:12]})")
+        except (OSError, ValueError) as e:
+            logger.error(f"读取回放语料失败 {path}: {e}")
+        return None
+
+    def recognize(
+        self, access_token: str, image_path: str, image_sha256: Optional[str] = None, throttle: Optional[Throttle] = None
+    ) -> Optional[dict]:
+        if not image_sha256:
+            try:
+                with open(image_path, "rb") as f:
+                    image_sha256 = hashlib.sha256(f.read()).hexdigest()
+            except OSError as e:
+                logger.error(f"读取图片失败 {image_path}: {e}")
+                return None
+        return self._load(image_sha256, image_path)
+
+    def recognize_with_location(
+        self, access_token: str, image_bytes: bytes, label: str = "stitched", throttle: Optional[Throttle] = None
+    ) -> Optional[dict]:
+        return self._load(hashlib.sha256(image_bytes).hexdigest(), label)
+
+
+def create_engine(name: str) -> OcrEngine:
+    """按名称创建引擎；baidu 返回进程内共享的百度客户端"""
+    if name == "baidu":
+        # ocr_client 依赖本模块的 OcrEngine，延迟导入避免循环引用
+        from ocr_client import get_default_client
+
+        return get_default_client()
+    if name == "local":
+        return LocalOcrEngine(LOCAL_OCR_BACKEND)
+    if name == "replay":
+        return ReplayOcrEngine(REPLAY_DIR)
+    raise OcrEngineUnavailable(f"未知的 OCR 引擎: {name}，可选 {', '.join(ENGINE_NAMES)}")
+
+
+_default_engine: Optional[OcrEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine() -> OcrEngine:
+    """进程内共享的默认引擎（MEC_OCR_ENGINE），首次调用时创建"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = create_engine(OCR_ENGINE)
+            logger.info(f"OCR 引擎: {_default_engine.name}")
+        return _default_engine
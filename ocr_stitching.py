@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR 前拼接截图
+把同一批次中相邻的截图纵向拼成一张长图，只发起一次 OCR 请求；
+识别结果按每行文字的 location 映射回原图，再按原图分别解析方案，单图报告保持不变。
+未安装 Pillow 或拼接失败时由调用方退回逐张识别
+"""
+
+import io
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import logic
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow 为可选依赖
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# EXIF 方向为 5~8 时图片需旋转 90 度，宽高互换
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION = 0x0112
+# base64 编码后体积约为原始的 4/3，百度要求编码后不超过 10MB
+_BASE64_LIMIT = 10 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StitchOptions:
+    """
+    max_height / max_width 为拼接图的像素上限（百度 accurate 要求最长边不超过 8192），
+    max_bytes 为 JPEG 编码后的体积上限，gap 为相邻截图间的白色间隔。
+    """
+
+    max_height: int = 8192
+    max_width: int = 2048
+    max_bytes: int = _BASE64_LIMIT * 3 // 4 - 512 * 1024
+    gap: int = 32
+    jpeg_quality: int = 85
+
+    @classmethod
+    def from_env(cls) -> Optional["StitchOptions"]:
+        """MEC_OCR_STITCH=1 时开启拼接，默认关闭"""
+        if os.getenv("MEC_OCR_STITCH", "0") != "1":
+            return None
+        return cls(
+            max_height=int(os.getenv("MEC_OCR_STITCH_MAX_HEIGHT", "8192")),
+            max_width=int(os.getenv("MEC_OCR_STITCH_MAX_WIDTH", "2048")),
+        )
+
+
+@dataclass
+class StitchedImage:
+    data: bytes
+    # 每张原图在拼接图中的纵向区间 [top, bottom)
+    spans: List[Tuple[int, int]]
+
+
+def _oriented_size(path: str) -> Tuple[int, int]:
+    """只读取文件头，返回按 EXIF 方向旋正后的 (宽, 高)"""
+    with Image.open(path) as image:
+        width, height = image.size
+        if image.getexif().get(_EXIF_ORIENTATION) in _TRANSPOSED_ORIENTATIONS:
+            return height, width
+        return width, height
+
+
+def _scaled_height(size: Tuple[int, int], max_width: int) -> int:
+    width, height = size
+    return height if width <= max_width else max(1, round(height * max_width / width))
+
+
+def plan_stitch_groups(paths: Sequence[str], options: StitchOptions) -> List[List[int]]:
+    """
+    按顺序把相邻图片分组，每组拼接后的高度不超过 max_height；无法读取的图片单独成组。
+    """
+    if Image is None:
+        return [[idx] for idx in range(len(paths))]
+    groups: List[List[int]] = []
+    current: List[int] = []
+    height = 0
+    for idx, path in enumerate(paths):
+        try:
+            scaled = _scaled_height(_oriented_size(path), options.max_width)
+        except Exception as e:
+            logger.warning(f"读取图片尺寸失败，单独识别：{path} {e}")
+            scaled = None
+        if scaled is None or scaled > options.max_height:
+            if current:
+                groups.append(current)
+            groups.append([idx])
+            current, height = [], 0
+            continue
+        needed = scaled + (options.gap if current else 0)
+        if current and height + needed > options.max_height:
+            groups.append(current)
+            current, height, needed = [], 0, scaled
+        current.append(idx)
+        height += needed
+    if current:
+        groups.append(current)
+    return groups
+
+
+def stitch_images(paths: Sequence[str], options: StitchOptions) -> Optional[StitchedImage]:
+    """
+    纵向拼接图片：宽于 max_width 的图片等比缩小，较窄的图片靠左并以白色补齐。
+    编码后超过 max_bytes 或处理失败时返回 None。
+    """
+    if Image is None:
+        return None
+    try:
+        parts = []
+        for path in paths:
+            with Image.open(path) as source:
+                image = ImageOps.exif_transpose(source).convert("RGB")
+            if image.width > options.max_width:
+                image = image.resize((options.max_width, _scaled_height(image.size, options.max_width)), Image.BICUBIC)
+            parts.append(image)
+        width = max(part.width for part in parts)
+        height = sum(part.height for part in parts) + options.gap * (len(parts) - 1)
+        canvas = Image.new("RGB", (width, height), "white")
+        spans: List[Tuple[int, int]] = []
+        top = 0
+        for part in parts:
+            canvas.paste(part, (0, top))
+            spans.append((top, top + part.height))
+            top += part.height + options.gap
+        buffer = io.BytesIO()
+        canvas.save(buffer, format="JPEG", quality=options.jpeg_quality, optimize=True)
+    except Exception as e:
+        logger.warning(f"图片拼接失败：{e}")
+        return None
+    data = buffer.getvalue()
+    if len(data) > options.max_bytes:
+        logger.info(f"拼接图 {len(data) / 1024 / 1024:.1f}MB 超过体积上限，改为逐张识别")
+        return None
+    return StitchedImage(data=data, spans=spans)
+
+
+def split_words_by_source(payload: Dict[str, Any], spans: Sequence[Tuple[int, int]]) -> List[List[Dict[str, Any]]]:
+    """
+    按每行文字中心点的纵坐标把 words_result 分配回原图，保留原有顺序；
+    缺少 location 的行归入上一行所在的图片。
+    """
+    per_source: List[List[Dict[str, Any]]] = [[] for _ in spans]
+    source = 0
+    for entry in payload.get("words_result") or []:
+        location = entry.get("location")
+        if location:
+            center = location.get("top", 0) + location.get("height", 0) / 2
+            # 落在间隔中的行归入上方的图片
+            source = max((idx for idx, (top, _) in enumerate(spans) if top <= center), default=0)
+        per_source[source].append(entry)
+    return per_source
+
+
+def _continues_previous(words: List[Dict[str, Any]]) -> bool:
+    """
+    图片开头（首个方案标题之前）出现项目片段或“分组交费”时，说明上一张图片的方案延续到了本图
+    """
+    for entry in words:
+        text = entry.get("words", "")
+        if "方案" in text:
+            return False
+        if "、" in text or "分组交费" in text:
+            return True
+    return False
+
+
+def extract_stitched_schemes(
+    payload: Dict[str, Any], spans: Sequence[Tuple[int, int]]
+) -> List[Tuple[List[Tuple[str, List[str]]], Optional[int]]]:
+    """
+    将拼接图的 OCR 结果解析为每张原图的 (方案列表, 并入的图片下标)。
+
+    各图默认独立解析，与逐张识别结果一致；若某张图片开头是上一张图片方案的延续，
+    则把两张图片的文字合并解析，跨图的方案归属于标题所在的图片，延续部分没有自己标题的图片
+    记录其内容并入了哪张图片。
+    """
+    per_source = split_words_by_source(payload, spans)
+    results: List[Tuple[List[Tuple[str, List[str]]], Optional[int]]] = [([], None) for _ in spans]
+    runs: List[List[int]] = []
+    for idx, words in enumerate(per_source):
+        if runs and words and _continues_previous(words):
+            runs[-1].append(idx)
+        else:
+            runs.append([idx])
+
+    for run in runs:
+        if len(run) == 1:
+            words = per_source[run[0]]
+            schemes = logic.extract_data_from_ocr_json({"words_result": words}) if words else []
+            results[run[0]] = (schemes, None)
+            continue
+        combined: List[Dict[str, Any]] = []
+        owners: List[int] = []
+        for idx in run:
+            combined.extend(per_source[idx])
+            owners.extend([idx] * len(per_source[idx]))
+        title_positions: List[int] = []
+        schemes = logic.extract_data_from_ocr_json({"words_result": combined}, title_positions)
+        by_source: Dict[int, List[Tuple[str, List[str]]]] = {idx: [] for idx in run}
+        for scheme, position in zip(schemes, title_positions):
+            by_source[owners[position]].append(scheme)
+        title_owners = sorted(owners[position] for position in title_positions)
+        for idx in run:
+            merged_into = None
+            if not by_source[idx]:
+                merged_into = next((owner for owner in reversed(title_owners) if owner < idx), None)
+            results[idx] = (by_source[idx], merged_into)
+    return results
@@ -8,11 +8,184 @@
 
 import logging
 import re
+from collections import OrderedDict, defaultdict
 from typing import Dict, List, Optional, Tuple
-from fuzzywuzzy import fuzz, process
+
+import numpy as np
+
+from fuzzy_scoring import score_matrix
+from text_normalization import fuzzy_key, fuzzy_keys, normalize_matcher_text
 
 logger = logging.getLogger(__name__)
 
+# 模糊匹配前由 n-gram 索引预选的候选数；Excel 项目不超过该数量时全部参与打分
+FUZZY_CANDIDATE_LIMIT = 20
+# 每个匹配器缓存的候选索引数（按 Excel 项目列表区分）
+_INDEX_CACHE_SIZE = 8
+
+
+def _char_ngrams(key: str, n: int = 2) -> set:
+    """按空白切词，取单字及首尾加边界符后的字符 n-gram"""
+    grams = set()
+    for token in key.split():
+        grams.update(token)
+        padded = f"^{token}$"
+        grams.update(padded[start:start + n] for start in range(len(padded) - n + 1))
+    return grams
+
+
+class NgramIndex:
+    """
+    Excel 项目的字符 n-gram 倒排索引。
+
+    查询时按共有 gram 的 Dice 系数取前 K 个候选，只有这些候选进入四种模糊打分器，
+    单个 OCR 项目的打分成本不再随 Excel 项目数增长。gram 含单字，没有任何共有 gram 的项目
+    与查询没有相同字符，各打分器得分均为 0，不会被漏掉。
+    """
+
+    def __init__(self, items: List[str], n: int = 2):
+        self.items = list(dict.fromkeys(items))
+        self.n = n
+        self.normalized = [normalize_matcher_text(item) for item in self.items]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        gram_counts = []
+        for idx, text in enumerate(self.normalized):
+            grams = _char_ngrams(fuzzy_key(text), n)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(idx)
+        self._postings = {gram: np.array(ids, dtype=np.intp) for gram, ids in postings.items()}
+        self._gram_counts = np.array(gram_counts, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def top_k(self, normalized_text: str, k: int) -> List[int]:
+        """返回候选项目的下标（按 Dice 系数取前 k 个，结果按原顺序排列，保持同分取靠前的语义）"""
+        grams = _char_ngrams(fuzzy_key(normalized_text), self.n)
+        shared = np.zeros(len(self.items), dtype=np.float64)
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                shared[ids] += 1
+        candidates = np.flatnonzero(shared)
+        if len(candidates) > k:
+            dice = 2 * shared[candidates] / (len(grams) + self._gram_counts[candidates])
+            candidates = np.sort(candidates[np.lexsort((candidates, -dice))[:k]])
+        return candidates.tolist()
+
+
+# 语义特征关键词：检查部位、检查方式；性别按列出顺序取第一个出现的标记
+BODY_PARTS = [
+    '肝', '肾', '心', '肺', '胃', '肠', '脾', '胰',
+    '甲状腺', '乳腺', '前列腺', '子宫', '卵巢',
+    '头颅', '颈部', '胸部', '腹部', '盆腔',
+    '血', '尿', '便', '眼', '耳', '鼻', '喉'
+]
+EXAM_METHODS = [
+    'CT', 'MRI', 'B超', '彩超', '超声', 'X光', 'X线',
+    '心电图', '脑电图', '血常规', '尿常规', '生化',
+    '病理', '活检', '穿刺', '内镜', '胃镜', '肠镜'
+]
+GENDER_MARKERS = ('女已婚', '女未婚', '女', '男')
+_MARKER_PATTERN = re.compile(r'\(([A-Z0-9]+)\)')
+
+# 每个字节的置位数；numpy 1.x 没有 bitwise_count，按字节查表求 popcount
+_POPCOUNT8 = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+
+def _popcount(masks: np.ndarray) -> np.ndarray:
+    """uint64 数组逐元素的置位数，最后一维为多个字时按字累加"""
+    counts = _POPCOUNT8[masks.view(np.uint8)].reshape(*masks.shape, 8).sum(axis=-1)
+    return counts.sum(axis=-1) if masks.ndim > 1 else counts
+
+
+def _keyword_mask(text: str, keywords: List[str]) -> int:
+    mask = 0
+    for bit, keyword in enumerate(keywords):
+        if keyword in text:
+            mask |= 1 << bit
+    return mask
+
+
+def _gender_code(text: str) -> int:
+    """0 表示无性别标记，其余为 GENDER_MARKERS 中的序号 + 1"""
+    for code, marker in enumerate(GENDER_MARKERS, 1):
+        if marker in text:
+            return code
+    return 0
+
+
+class FeatureTable:
+    """
+    Excel 项目的语义特征表，每份 Excel 项目列表提取一次。
+
+    部位与检查方式编码为 uint64 位掩码，性别为整数编码，特殊标记按本表的标记词表编码为
+    若干个 uint64 字；相似度对全部项目一次性按位运算求交并集的置位数，
+    得分与 SmartMatcher._calculate_feature_similarity 逐项计算的结果相同。
+    """
+
+    def __init__(self, items: List[str]):
+        self.items = list(dict.fromkeys(items))
+        self.parts = np.array([_keyword_mask(item, BODY_PARTS) for item in self.items], dtype=np.uint64)
+        self.methods = np.array([_keyword_mask(item, EXAM_METHODS) for item in self.items], dtype=np.uint64)
+        self.gender = np.array([_gender_code(item) for item in self.items], dtype=np.int8)
+        item_markers = [set(_MARKER_PATTERN.findall(item)) for item in self.items]
+        self._marker_bits: Dict[str, int] = {}
+        for markers in item_markers:
+            for marker in sorted(markers):
+                self._marker_bits.setdefault(marker, len(self._marker_bits))
+        self._marker_words = max(1, (len(self._marker_bits) + 63) // 64)
+        self.markers = np.zeros((len(self.items), self._marker_words), dtype=np.uint64)
+        for row, markers in enumerate(item_markers):
+            self.markers[row] = self._marker_mask(markers)[0]
+        self._has_markers = self.markers.any(axis=1)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _marker_mask(self, markers: set) -> Tuple[np.ndarray, int]:
+        """标记集合编码为本表的多字掩码；返回 (掩码, 不在词表中的标记数)"""
+        words = np.zeros(self._marker_words, dtype=np.uint64)
+        unknown = 0
+        for marker in markers:
+            bit = self._marker_bits.get(marker)
+            if bit is None:
+                unknown += 1
+            else:
+                words[bit // 64] |= np.uint64(1 << (bit % 64))
+        return words, unknown
+
+    def similarity(self, text: str) -> np.ndarray:
+        """text 与每个 Excel 项目的特征相似度（0-100），按 部位、检查方式、性别、标记 的顺序累加"""
+        score = np.zeros(len(self.items), dtype=np.float64)
+        weight = np.zeros(len(self.items), dtype=np.int64)
+        for masks, query, part_weight in (
+            (self.parts, _keyword_mask(text, BODY_PARTS), 40),
+            (self.methods, _keyword_mask(text, EXAM_METHODS), 30),
+        ):
+            if not query:
+                continue
+            query = np.uint64(query)
+            active = masks != 0
+            union = _popcount(masks | query)
+            score += np.where(active, _popcount(masks & query) / union * part_weight, 0.0)
+            weight += active * part_weight
+
+        gender = _gender_code(text)
+        active = (self.gender != 0) | (gender != 0)
+        score += (active & (self.gender == gender)) * 20
+        weight += active * 20
+
+        query_markers, unknown = self._marker_mask(set(_MARKER_PATTERN.findall(text)))
+        active = self._has_markers | bool(query_markers.any() or unknown)
+        union = _popcount(self.markers | query_markers) + unknown
+        overlap = _popcount(self.markers & query_markers)
+        score += np.where(active, overlap / np.maximum(union, 1) * 10, 0.0)
+        weight += active * 10
+
+        return np.where(weight > 0, score / np.maximum(weight, 1) * 100, 0.0)
+
 
 class SmartMatcher:
     """
@@ -25,14 +198,19 @@ class SmartMatcher:
     4. 用户反馈学习
     """
     
-    def __init__(self, alias_map: Dict[str, str] = None):
+    def __init__(self, alias_map: Dict[str, str] = None, candidate_limit: int = FUZZY_CANDIDATE_LIMIT):
         """
         初始化匹配器
         
         Args:
             alias_map: 别名映射字典 {别名: 标准名}
+            candidate_limit: 模糊匹配时由 n-gram 索引预选的候选数
         """
         self.alias_map = alias_map or {}
+        self.candidate_limit = candidate_limit
+        # 按 Excel 项目列表缓存的 n-gram 索引与语义特征表
+        self._index_cache: "OrderedDict[Tuple[str, ...], NgramIndex]" = OrderedDict()
+        self._feature_cache: "OrderedDict[Tuple[str, ...], FeatureTable]" = OrderedDict()
         self.match_history: List[Tuple[str, str, str]] = []  # (ocr, excel, method)
         self.learned_rules: Dict[str, str] = {}  # 从用户反馈中学习的规则
         
@@ -107,35 +285,38 @@ class SmartMatcher:
         模糊匹配策略
         使用多种评分器组合，提高匹配准确率
         """
-        # 标准化处理
+        # 标准化处理；先由 n-gram 索引预选候选，只对候选运行打分器
         normalized_ocr = self._normalize_text(ocr_item)
-        normalized_items = {item: self._normalize_text(item) for item in excel_items}
+        index = self._candidate_index(excel_items)
+        if len(index) > self.candidate_limit:
+            positions = index.top_k(normalized_ocr, self.candidate_limit)
+            if not positions:
+                return None
+        else:
+            positions = range(len(index))
+        originals = [index.items[idx] for idx in positions]
+        choices = [index.normalized[idx] for idx in positions]
         
-        # 尝试多种评分策略
+        # 尝试多种评分策略，每种策略一次性得到全部候选的得分
         scorers = [
-            fuzz.ratio,           # 简单相似度
-            fuzz.partial_ratio,   # 部分匹配
-            fuzz.token_sort_ratio,  # 词序不敏感
-            fuzz.token_set_ratio,   # 词集匹配
+            'ratio',             # 简单相似度
+            'partial_ratio',     # 部分匹配
+            'token_sort_ratio',  # 词序不敏感
+            'token_set_ratio',   # 词集匹配
         ]
+        score_rows = np.vstack([
+            score_matrix(fuzzy_keys([normalized_ocr], scorer), fuzzy_keys(choices, scorer), scorer, processed=True)
+            for scorer in scorers
+        ])
         
         best_match = None
         best_score = 0
         
-        for scorer in scorers:
-            match, score = process.extractOne(
-                normalized_ocr,
-                list(normalized_items.values()),
-                scorer=scorer
-            )
-            
-            if score > best_score:
-                best_score = score
-                # 找回原始项目名
-                for original, normalized in normalized_items.items():
-                    if normalized == match:
-                        best_match = original
-                        break
+        for row in score_rows:
+            idx = int(row.argmax())
+            if row[idx] > best_score:
+                best_score = int(row[idx])
+                best_match = originals[idx]
         
         if best_score >= threshold:
             logger.debug(f"模糊匹配成功: {ocr_item} -> {best_match} (得分: {best_score})")
@@ -143,6 +324,26 @@ class SmartMatcher:
         
         return None
     
+    @staticmethod
+    def _cached_for_list(cache: OrderedDict, excel_items: List[str], factory):
+        """同一份 Excel 项目列表只构建一次（LRU，保留最近使用的若干份）"""
+        key = tuple(excel_items)
+        built = cache.get(key)
+        if built is None:
+            built = factory(excel_items)
+            cache[key] = built
+            while len(cache) > _INDEX_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return built
+    
+    def _candidate_index(self, excel_items: List[str]) -> NgramIndex:
+        return self._cached_for_list(self._index_cache, excel_items, NgramIndex)
+    
+    def _feature_table(self, excel_items: List[str]) -> FeatureTable:
+        return self._cached_for_list(self._feature_cache, excel_items, FeatureTable)
+    
     def _semantic_match(self, ocr_item: str, excel_items: List[str],
                        threshold: int) -> Optional[str]:
         """
@@ -152,47 +353,24 @@ class SmartMatcher:
         # 扩展缩写
         expanded_ocr = self._expand_abbreviations(ocr_item)
         
-        # 提取关键特征
-        ocr_features = self._extract_features(expanded_ocr)
-        
-        # 计算语义相似度
-        best_match = None
-        best_score = 0
-        
-        for item in excel_items:
-            item_features = self._extract_features(item)
-            score = self._calculate_feature_similarity(ocr_features, item_features)
-            
-            if score > best_score:
-                best_score = score
-                best_match = item
+        # Excel 侧特征按列表缓存，一次按位运算得到全部项目的语义相似度
+        table = self._feature_table(excel_items)
+        if not len(table):
+            return None
+        scores = table.similarity(expanded_ocr)
+        idx = int(scores.argmax())
+        best_score = float(scores[idx])
         
-        if best_score >= threshold:
+        if best_score > 0 and best_score >= threshold:
+            best_match = table.items[idx]
             logger.debug(f"语义匹配成功: {ocr_item} -> {best_match} (得分: {best_score})")
             return best_match
         
         return None
     
     def _normalize_text(self, text: str) -> str:
-        """文本标准化：统一格式，方便比较"""
-        if not text:
-            return ""
-        
-        # 统一括号
-        text = text.replace('（', '(').replace('）', ')')
-        text = text.replace('【', '[').replace('】', ']')
-        
-        # 移除空格
-        text = text.replace(' ', '').replace('　', '')
-        
-        # 统一数字格式
-        text = re.sub(r'[零〇]', '0', text)
-        text = re.sub(r'[一壹]', '1', text)
-        text = re.sub(r'[二贰]', '2', text)
-        text = re.sub(r'[三叁]', '3', text)
-        
-        # 转小写（仅英文部分）
-        return text.lower()
+        """文本标准化：统一格式，方便比较（统一括号与数字写法、移除空格、英文转小写，结果有缓存）"""
+        return normalize_matcher_text(text)
     
     def _expand_abbreviations(self, text: str) -> str:
         """扩展医学缩写为全称"""
@@ -212,51 +390,12 @@ class SmartMatcher:
         - 性别标记（如：男、女、女已婚）
         - 特殊标记（如：H、A、新）
         """
-        features = {
-            'parts': [],      # 身体部位
-            'methods': [],    # 检查方式
-            'gender': None,   # 性别
-            'markers': [],    # 特殊标记
+        return {
+            'parts': [part for part in BODY_PARTS if part in text],                          # 身体部位
+            'methods': [method for method in EXAM_METHODS if method in text],                # 检查方式
+            'gender': next((marker for marker in GENDER_MARKERS if marker in text), None),  # 性别
+            'markers': _MARKER_PATTERN.findall(text),                                        # 特殊标记
         }
-        
-        # 检查部位关键词
-        body_parts = [
-            '肝', '肾', '心', '肺', '胃', '肠', '脾', '胰',
-            '甲状腺', '乳腺', '前列腺', '子宫', '卵巢',
-            '头颅', '颈部', '胸部', '腹部', '盆腔',
-            '血', '尿', '便', '眼', '耳', '鼻', '喉'
-        ]
-        
-        for part in body_parts:
-            if part in text:
-                features['parts'].append(part)
-        
-        # 检查方式关键词
-        methods = [
-            'CT', 'MRI', 'B超', '彩超', '超声', 'X光', 'X线',
-            '心电图', '脑电图', '血常规', '尿常规', '生化',
-            '病理', '活检', '穿刺', '内镜', '胃镜', '肠镜'
-        ]
-        
-        for method in methods:
-            if method in text:
-                features['methods'].append(method)
-        
-        # 性别标记
-        if '女已婚' in text:
-            features['gender'] = '女已婚'
-        elif '女未婚' in text:
-            features['gender'] = '女未婚'
-        elif '女' in text:
-            features['gender'] = '女'
-        elif '男' in text:
-            features['gender'] = '男'
-        
-        # 特殊标记
-        markers = re.findall(r'\(([A-Z0-9]+)\)', text)
-        features['markers'].extend(markers)
-        
-        return features
     
     def _calculate_feature_similarity(self, features1: Dict, features2: Dict) -> float:
         """计算特征相似度（0-100）"""
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Web 比对服务验证"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+import logic
+from ocr_engines import OcrEngine
+from web_backend.services import comparison_service
+from web_backend.services.comparison_service import (
+    ExcelParseCache,
+    ExcelParsePool,
+    ExcelParseTimeout,
+    OCRImage,
+    UploadTooLarge,
+    parse_excel_file,
+    parse_excel_file_async,
+    parse_excel_file_cached,
+    persist_upload_stream,
+    process_images_with_ocr,
+)
+
+EXCEL_DATA = {"方案一": {"男": ["血常规", "尿常规"]}}
+
+
+def _fake_ocr_payload() -> dict:
+    return {
+        "words_result": [
+            {"words": "分组名称："},
+            {"words": "方案一男"},
+            {"words": "分组价格："},
+            {"words": "￥200.00"},
+            {"words": "血常规、尿常规"},
+            {"words": "分组交费方式：统一结账"},
+        ]
+    }
+
+
+class _FakeOcrClient(OcrEngine):
+    requires_credentials = True
+
+    def get_access_token(self, api_key, secret_key):
+        return "token"
+
+    def recognize(self, access_token, image_path, image_sha256=None, throttle=None):
+        if throttle is not None:
+            throttle()
+        time.sleep(random.uniform(0, 0.02))
+        return _fake_ocr_payload()
+
+    def recognize_with_location(self, access_token, image_bytes, label="stitched", throttle=None):
+        return None
+
+
+def _run_with_fake_ocr(images, **kwargs):
+    return process_images_with_ocr(images, "key", "secret", EXCEL_DATA, {}, ocr_client=_FakeOcrClient(), **kwargs)
+
+
+def test_concurrent_ocr_keeps_image_order():
+    """并发 OCR 时进度回调按图片顺序回传增量，最终报告保持图片顺序"""
+    images = [OCRImage(path=f"img{idx}", name=f"img{idx}.jpg") for idx in range(12)]
+    received = []
+    deltas = []
+
+    def on_progress(delta):
+        deltas.append(len(delta))
+        received.extend(delta)
+        assert [item["index"] for item in received] == list(range(1, len(received) + 1)), "Progress must extend an ordered prefix."
+
+    report = _run_with_fake_ocr(images, progress_callback=on_progress, max_workers=4, qps_limit=0)
+    assert [item["image_name"] for item in report] == [image.name for image in images], "Report order mismatch."
+    assert all(item["schemes"][0]["status"] == "matched_perfect" for item in report), "Every image should match."
+    assert received == report, "Concatenated progress deltas should equal the final report."
+    assert all(deltas), "Progress callbacks should only carry newly finished images."
+
+
+def test_rate_limiter_spaces_requests():
+    """QPS 限制下相邻请求的发起间隔不小于 1/qps"""
+    limiter = comparison_service._RateLimiter(50)
+    stamps = []
+    for _ in range(5):
+        limiter.acquire()
+        stamps.append(time.monotonic())
+    gaps = [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+    assert min(gaps) >= 0.015, f"Requests were not throttled: {gaps}"
+
+
+def test_concurrent_jobs_share_rate_limit():
+    """两个任务同时运行且使用同一账号时共用节流器，合计请求的发起间隔仍不小于 1/qps"""
+    from web_backend.services.job_manager import JobManager
+
+    stamps = []
+    stamps_lock = threading.Lock()
+
+    class _MeteredClient(_FakeOcrClient):
+        name = "metered-test"
+        qps_limit = 20
+
+        def recognize(self, access_token, image_path, image_sha256=None, throttle=None):
+            throttle()
+            with stamps_lock:
+                stamps.append(time.monotonic())
+            return _fake_ocr_payload()
+
+    manager = JobManager(max_workers=2)
+    images = [OCRImage(path=f"img{idx}", name=f"img{idx}.jpg") for idx in range(6)]
+
+    def runner(job):
+        return process_images_with_ocr(images, "key", "secret", EXCEL_DATA, {}, max_workers=3, ocr_client=_MeteredClient())
+
+    jobs = [manager.submit(user, len(images), runner) for user in ("alice", "bob")]
+    for job in jobs:
+        job.future.result(timeout=10)
+    manager.shutdown()
+    stamps.sort()
+    gaps = [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+    assert len(stamps) == 12 and min(gaps) >= 0.04, f"Jobs exceeded the shared QPS limit: {gaps}"
+    other = comparison_service.get_rate_limiter(_MeteredClient(), "other-key", 20)
+    assert other is not comparison_service.get_rate_limiter(_MeteredClient(), "key", 20), "Accounts are throttled separately."
+
+
+def test_excel_parse_cache_reuses_result():
+    """同一工作簿与规则重复上传时复用解析结果；规则变化或超出容量时重新解析"""
+    workbooks = sorted(glob.glob(str(Path(__file__).parent / "test" / "*" / "*.xlsx")))[:3]
+    cache = ExcelParseCache(max_entries=2)
+    renames = [["血常规", "血常规,SELF"]]
+    first = parse_excel_file_cached(Path(workbooks[0]), renames, [], cache=cache)
+    with mock.patch.object(comparison_service, "parse_excel_file", side_effect=AssertionError("should not parse")):
+        again = parse_excel_file_cached(Path(workbooks[0]), renames, [], cache=cache)
+    assert again is first, "Cached parse result should be returned as-is."
+    changed = parse_excel_file_cached(Path(workbooks[0]), [], [], cache=cache)
+    assert changed is not first, "Different rename rules must not share a cache entry."
+    parse_excel_file_cached(Path(workbooks[1]), [], [], cache=cache)
+    assert cache.stats() == {"hits": 1, "misses": 3, "entries": 2}, cache.stats()
+    assert parse_excel_file_cached(Path(workbooks[0]), renames, [], cache=cache) is not first, "LRU entry should be evicted."
+
+
+def test_excel_parse_pool_times_out_and_recycles():
+    """进程池解析结果与直接解析一致；超时后回收进程池，之后仍可正常解析"""
+    workbook = Path(sorted(glob.glob(str(Path(__file__).parent / "test" / "*" / "*.xlsx")))[0])
+    expected = parse_excel_file(workbook, [], [])
+    pool = ExcelParsePool(max_workers=1, timeout=0.001)
+    try:
+        try:
+            asyncio.run(pool.parse(workbook, [], []))
+        except ExcelParseTimeout:
+            pass
+        else:
+            raise AssertionError("Parsing should exceed a 1ms timeout.")
+        assert pool._executor is None, "Timed out pool should be recycled."
+        pool.timeout = 60
+        result = asyncio.run(parse_excel_file_async(workbook, [], [], cache=ExcelParseCache(), pool=pool))
+        assert result.excel_data == expected.excel_data, "Pool parse should match an in-process parse."
+        assert result.scheme_index.candidates("男") == expected.scheme_index.candidates("男")
+    finally:
+        pool.shutdown()
+
+
+class _ChunkedUpload:
+    """模拟 UploadFile：记录每次 read 的块大小"""
+
+    def __init__(self, filename, data):
+        self.filename = filename
+        self._data = data
+        self._offset = 0
+        self.reads = []
+
+    async def read(self, size=-1):
+        self.reads.append(size)
+        chunk = self._data[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+def test_streaming_upload_hashes_and_enforces_limit():
+    """上传按块写入磁盘并同时计算摘要；超过限制时清理已写入的部分"""
+    data = os.urandom(10_000)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        upload = _ChunkedUpload("photo.jpg", data)
+        image = asyncio.run(persist_upload_stream(Path(tmp_dir), upload, max_bytes=20_000, chunk_size=4096))
+        assert image.sha256 == hashlib.sha256(data).hexdigest() and image.size == len(data)
+        assert Path(image.path).read_bytes() == data and image.path.endswith(".jpg")
+        assert set(upload.reads) == {4096}, "Upload should be read in fixed-size chunks."
+        assert asyncio.run(persist_upload_stream(Path(tmp_dir), _ChunkedUpload("empty.jpg", b""), 20_000)) is None
+        try:
+            asyncio.run(persist_upload_stream(Path(tmp_dir), _ChunkedUpload("big.jpg", data), max_bytes=5_000, chunk_size=4096))
+        except UploadTooLarge as exc:
+            assert exc.limit_bytes == 5_000
+        else:
+            raise AssertionError("Oversized upload should be rejected.")
+        assert sorted(os.listdir(tmp_dir)) == [Path(image.path).name], "Rejected and empty uploads must not leave files behind."
+
+
+def _post_status(app, path, content_length):
+    """直接以 ASGI 调用应用，返回 (状态码, 是否读取了请求体)"""
+    received = []
+    sent = []
+
+    async def receive():
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-length", str(content_length).encode())], "server": ("test", 80), "client": ("test", 1),
+    }
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], bool(received)
+
+
+def test_oversized_upload_rejected_by_content_length():
+    """声明的 Content-Length 超过批量上限时直接返回 413，不读取请求体"""
+    from web_backend.app import MULTIPART_OVERHEAD_BYTES, app
+
+    limit = comparison_service.MAX_BATCH_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    for path in ("/api/ocr/jobs", "/api/ocr/process"):
+        assert _post_status(app, path, limit + 1) == (413, False), path
+    status_code, _ = _post_status(app, "/api/ocr/jobs", limit)
+    assert status_code == 401, "Uploads within the limit should reach authentication."
+
+
+def _corpus_batches():
+    """回放语料按图片集给出 (Excel 解析结果, 每张图片解析出的方案)"""
+    root = Path(__file__).resolve().parent
+    corpus = root / "benchmarks" / "ocr_corpus"
+    rules = json.loads((root / "default_rules.json").read_text(encoding="utf-8"))
+    for image_set in json.loads((corpus / "manifest.json").read_text(encoding="utf-8"))["sets"]:
+        parsed = parse_excel_file(root / image_set["workbook"], rules["renames"], rules["gender_renames"])
+        payloads = [
+            logic.extract_data_from_ocr_json(json.loads((corpus / f"{image['sha256']}.json").read_text(encoding="utf-8")))
+            for image in image_set["images"]
+        ]
+        yield parsed, payloads, logic.build_alias_map(rules["aliases"])
+
+
+def test_batch_evaluation_matches_per_scheme():
+    """整批比对与逐个方案调用 find_best_match / generate_comparison_report 的结果完全相同"""
+    for parsed, payloads, alias_map in _corpus_batches():
+        lookup = comparison_service._build_scheme_lookup(parsed.excel_data)
+        # 加入未识别与空标题的方案，以及跨图片重复的标题
+        payloads = payloads + [[("方案九十九男", ["血常规"]), ("", ["尿常规"])], payloads[0]]
+        for assignment in logic.ASSIGNMENT_MODES:
+            batch = comparison_service.evaluate_ocr_batch(payloads, lookup, alias_map, parsed.scheme_index, assignment)
+            for schemes, results in zip(payloads, batch):
+                assert len(results) == len(schemes)
+                for (title, items), result in zip(schemes, results):
+                    expected = logic.find_best_match(title, parsed.scheme_index) if title else None
+                    assert result["matched_scheme"] == expected, (title, result["matched_scheme"], expected)
+                    if expected:
+                        assert result["comparison"] == logic.generate_comparison_report(
+                            lookup[expected], items, alias_map, assignment
+                        ), (title, assignment)
+
+
+def test_compiled_aliases_follow_rule_versions():
+    """编译后的别名规则按用户缓存，只有该用户的规则更新后才重新编译"""
+    from web_backend.config_manager import ConfigManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ConfigManager(Path(tmp) / "settings.json")
+        cache = comparison_service.CompiledAliasCache()
+        loads = []
+
+        def compiled_for(username):
+            def load():
+                loads.append(username)
+                return manager.get_rules_with_version(username)
+
+            return cache.get_or_compile(username, manager.rules_version(username), load)
+
+        first = compiled_for("admin")
+        assert compiled_for("admin") is first and loads == ["admin"], "Unchanged rules should reuse the compiled aliases."
+        other = compiled_for("renyanan")
+        rules = manager.get_rules_for_user("admin")
+        rules["aliases"].append(["颈部血管彩超", "颈动脉彩超"])
+        manager.update_rules_for_user("admin", rules)
+        updated = compiled_for("admin")
+        assert updated is not first and updated.get("颈部血管彩超") == "颈动脉彩超" and "颈部血管彩超" not in first
+        assert compiled_for("renyanan") is other, "Other users keep their compiled aliases."
+        assert loads == ["admin", "renyanan", "admin"] and cache.stats()["entries"] == 2, (loads, cache.stats())
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_concurrent_ocr_keeps_image_order()
+    print("PASS: concurrent OCR keeps image order.")
+    test_rate_limiter_spaces_requests()
+    print("PASS: rate limiter spaces requests.")
+    test_concurrent_jobs_share_rate_limit()
+    print("PASS: concurrent jobs share the rate limit.")
+    test_excel_parse_cache_reuses_result()
+    print("PASS: parsed Excel cache reuses results.")
+    test_excel_parse_pool_times_out_and_recycles()
+    print("PASS: Excel parse pool times out and recycles.")
+    test_streaming_upload_hashes_and_enforces_limit()
+    print("PASS: streaming upload hashes and enforces limits.")
+    test_oversized_upload_rejected_by_content_length()
+    print("PASS: oversized uploads are rejected by Content-Length.")
+    test_batch_evaluation_matches_per_scheme()
+    print("PASS: batch evaluation matches per-scheme comparison.")
+    test_compiled_aliases_follow_rule_versions()
+    print("PASS: compiled aliases follow rule versions.")
+
+
+if __name__ == "__main__":
+    run_all()
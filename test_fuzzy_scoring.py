@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""批量打分后端与 fuzzywuzzy 一致性验证"""
+
+import random
+
+from fuzzywuzzy import fuzz, process
+
+from fuzzy_scoring import SCORERS, score_matrix
+
+QUERIES = ["血常规", "乳腺彩超", "甲状腺功能三项(A)", "C14呼气试验", "", "（）", "方案一 女未婚"]
+CHOICES = ["血常规", "乳腺彩色超声", "甲状腺功能三项", "碳十四呼气检查 C14", "尿常规", "方案一", "ct 方案三", ""]
+FUZZ_SCORERS = {name: getattr(fuzz, name) for name in SCORERS}
+
+
+def _assert_matches_extract_one(queries, choices):
+    for scorer_name, scorer in FUZZ_SCORERS.items():
+        matrix = score_matrix(queries, choices, scorer_name)
+        assert matrix.shape == (len(queries), len(choices)), "Matrix shape mismatch."
+        for row_idx, query in enumerate(queries):
+            expected = [score for _, score in process.extractWithoutOrder(query, choices, scorer=scorer)]
+            assert matrix[row_idx].tolist() == expected, f"{scorer_name} scores differ for '{query}'."
+
+
+def test_matrix_matches_extract_one_scores():
+    """四种打分器的矩阵得分与 process.extractOne 逐项打分完全一致，包括空串"""
+    _assert_matches_extract_one(QUERIES, CHOICES)
+    # 两个空串：extractOne 下 partial_ratio / token_set_ratio 均为 100，rapidfuzz 的实现给 0
+    for scorer_name in ("partial_ratio", "token_set_ratio"):
+        assert process.extractOne("", [""], scorer=FUZZ_SCORERS[scorer_name])[1] == 100
+        assert score_matrix([""], [""], scorer_name).tolist() == [[100]], scorer_name
+
+
+def test_random_strings_match_extract_one_scores():
+    """随机短串（含空串、空格与常见检查项目用字）逐项得分一致"""
+    rng = random.Random(7)
+    alphabet = "血尿常规彩超肝功能甲状腺方案一二男女 ()AaBC14-"
+
+    def sample():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+
+    for _ in range(10):
+        _assert_matches_extract_one([sample() for _ in range(10)], [sample() for _ in range(30)])
+
+
+def test_empty_inputs_yield_empty_matrix():
+    """空查询或空候选返回对应形状的空矩阵"""
+    assert score_matrix([], CHOICES).shape == (0, len(CHOICES))
+    assert score_matrix(QUERIES, []).shape == (len(QUERIES), 0)
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_matrix_matches_extract_one_scores()
+    print("PASS: score matrix matches extractOne scores.")
+    test_random_strings_match_extract_one_scores()
+    print("PASS: random strings match extractOne scores.")
+    test_empty_inputs_yield_empty_matrix()
+    print("PASS: empty inputs yield empty matrices.")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""OCR 图片预处理验证"""
+
+import base64
+import io
+import os
+import tempfile
+from unittest import mock
+
+from PIL import Image, ImageDraw
+
+from image_preprocess import PreprocessOptions, detect_text_bbox, preprocess_image_bytes
+from ocr_client import BaiduOcrClient
+from test_ocr_client import _FakeResponse, _ScriptedSession
+
+
+def _jpeg_bytes(image: Image.Image, quality: int = 95, **save_kwargs) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, **save_kwargs)
+    return buffer.getvalue()
+
+
+def _document(width: int, height: int) -> Image.Image:
+    """白底上居中一块“文字”区域"""
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for top in range(height // 4, height * 3 // 4, 20):
+        draw.rectangle([width // 4, top, width * 3 // 4, top + 8], fill="black")
+    return image
+
+
+def test_downscale_and_exif_orientation():
+    """超过最长边的图片按比例缩小；EXIF 方向在重新编码前被应用"""
+    original = _jpeg_bytes(_document(3000, 4000))
+    processed = preprocess_image_bytes(original, PreprocessOptions(max_edge=2000, jpeg_quality=80))
+    assert Image.open(io.BytesIO(processed)).size == (1500, 2000), "Longest edge should be scaled to max_edge."
+    assert len(processed) < len(original), "Downscaled payload should be smaller."
+
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 顺时针旋转 90 度
+    rotated = _jpeg_bytes(_document(400, 300), exif=exif.tobytes())
+    processed = preprocess_image_bytes(rotated, PreprocessOptions(max_edge=0))
+    assert Image.open(io.BytesIO(processed)).size == (300, 400), "EXIF orientation must be applied before re-encoding."
+
+
+def test_small_images_and_disabled_options_are_untouched():
+    """无需缩放且重新压缩不变小时保留原图；关闭预处理或数据无法解析时原样返回"""
+    small = _jpeg_bytes(Image.effect_noise((600, 400), 64).convert("RGB"), quality=30)
+    assert preprocess_image_bytes(small, PreprocessOptions(jpeg_quality=95)) == small
+    assert preprocess_image_bytes(small, None) == small
+    assert preprocess_image_bytes(b"not-an-image", PreprocessOptions()) == b"not-an-image"
+    with mock.patch.dict(os.environ, {"MEC_OCR_PREPROCESS": ""}):
+        assert PreprocessOptions.from_env() is None, "Lossy preprocessing must be opt-in."
+    with mock.patch.dict(os.environ, {"MEC_OCR_PREPROCESS": "1", "MEC_OCR_MAX_EDGE": "1600"}):
+        assert PreprocessOptions.from_env() == PreprocessOptions(max_edge=1600)
+
+
+def test_crop_to_text_region():
+    """裁剪到文字区域时保留文字块及少量边距"""
+    image = _document(1000, 1000)
+    left, top, right, bottom = detect_text_bbox(image)
+    assert 200 <= left <= 250 and 200 <= top <= 250, (left, top)
+    assert 750 <= right <= 800 and 750 <= bottom <= 800, (right, bottom)
+    processed = preprocess_image_bytes(_jpeg_bytes(image), PreprocessOptions(max_edge=0, crop_to_text=True))
+    width, height = Image.open(io.BytesIO(processed)).size
+    assert width < 700 and height < 700, "Blank margins should be cropped away."
+    assert detect_text_bbox(Image.new("RGB", (100, 100), "white")) is None
+
+
+def test_client_uploads_preprocessed_image():
+    """客户端上传的是预处理后的图片"""
+    client = BaiduOcrClient(max_retries=0, preprocess=PreprocessOptions(max_edge=1000))
+    client.session = _ScriptedSession([_FakeResponse(200, {"words_result": []})])
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as handle:
+        handle.write(_jpeg_bytes(_document(2000, 3000)))
+    try:
+        client.recognize("token", handle.name)
+    finally:
+        os.unlink(handle.name)
+    uploaded = base64.b64decode(client.session.calls[0][1]["data"]["image"])
+    assert Image.open(io.BytesIO(uploaded)).size == (667, 1000), "OCR payload should be downscaled."
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_downscale_and_exif_orientation()
+    print("PASS: images are downscaled and EXIF-rotated.")
+    test_small_images_and_disabled_options_are_untouched()
+    print("PASS: small images and disabled options are untouched.")
+    test_crop_to_text_region()
+    print("PASS: images are cropped to the text region.")
+    test_client_uploads_preprocessed_image()
+    print("PASS: client uploads the preprocessed image.")
+
+
+if __name__ == "__main__":
+    run_all()
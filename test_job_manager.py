@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""后台 OCR 任务验证"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+from unittest import mock
+
+from fastapi import HTTPException
+
+from web_backend.services.comparison_service import OCRImage, process_images_with_ocr
+from web_backend.services.job_manager import (
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    FINISHED_STATUSES,
+    JobManager,
+    OcrJob,
+    stream_job_events,
+)
+
+from test_comparison_service import EXCEL_DATA, _FakeOcrClient
+
+
+def _wait(job, timeout=5.0):
+    job.future.result(timeout=timeout)
+    return job
+
+
+def test_job_runs_in_background_and_reports_results():
+    """提交立即返回，后台完成后可按任务查询结果，其他用户不可见"""
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    cleaned = []
+
+    def runner(job):
+        job.append_results([{"index": 1}])
+        release.wait(5)
+        return [{"index": 1}, {"index": 2}]
+
+    job = manager.submit("alice", 2, runner, cleanup=lambda: cleaned.append(True))
+    assert not job.finished, "Submit should return before the job finishes."
+    while not job.seq:
+        time.sleep(0.005)
+    first_page = job.results
+    assert manager.get("bob", job.job_id) is None, "Jobs must not be visible to other users."
+    release.set()
+    _wait(job)
+    assert job.status == JOB_COMPLETED and job.to_public_dict()["completed"] == 2
+    assert job.results is first_page, "Results should be appended in place."
+    assert job.results_since(1) == ([{"index": 2}], 2), "since should return only newer results with the current seq."
+    assert job.results_since(5) == ([], 2)
+    assert cleaned == [True], "Cleanup should run once the job ends."
+    assert [item.job_id for item in manager.list_jobs("alice")] == [job.job_id]
+    manager.shutdown()
+
+
+def test_job_failure_and_retention():
+    """任务异常记录为 failed；已结束任务超过保留期后被清理"""
+    manager = JobManager(max_workers=1, retention_seconds=0.05)
+
+    def runner(job):
+        raise RuntimeError("获取百度OCR Access Token失败")
+
+    job = _wait(manager.submit("alice", 1, runner))
+    assert job.status == JOB_FAILED and "Access Token" in job.error
+    assert manager.remove("alice", job.job_id), "Finished jobs can be removed explicitly."
+    job = _wait(manager.submit("alice", 1, lambda job: []))
+    time.sleep(0.1)
+    assert manager.get("alice", job.job_id) is None, "Expired jobs should be purged."
+    manager.shutdown()
+
+
+def test_cancel_stops_remaining_images():
+    """取消后不再发起新的 OCR 请求，结果保留已完成的前缀"""
+    manager = JobManager(max_workers=1)
+    images = [OCRImage(path=f"img{idx}", name=f"img{idx}.jpg") for idx in range(20)]
+
+    class _SlowClient(_FakeOcrClient):
+        def recognize(self, access_token, image_path, image_sha256=None, throttle=None):
+            time.sleep(0.02)
+            return super().recognize(access_token, image_path, image_sha256, throttle)
+
+    def runner(job):
+        return process_images_with_ocr(
+            images, "key", "secret", EXCEL_DATA, {},
+            progress_callback=job.append_results, max_workers=2, qps_limit=0,
+            ocr_client=_SlowClient(), cancel_event=job.cancel_event,
+        )
+
+    job = manager.submit("alice", len(images), runner)
+    while not job.results:
+        time.sleep(0.005)
+    manager.cancel("alice", job.job_id)
+    _wait(job)
+    assert job.status == JOB_CANCELLED, job.status
+    assert 0 < len(job.results) < len(images), "Cancellation should stop before every image is processed."
+    assert [item["index"] for item in job.results] == list(range(1, len(job.results) + 1)), "Results must stay an ordered prefix."
+    manager.shutdown()
+
+
+def test_shutdown_cancels_queued_jobs_and_cleans_up():
+    """关闭时排队中的任务标记为已取消并执行 cleanup，不会遗留临时文件"""
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+    cleaned = []
+
+    def runner(job):
+        started.set()
+        job.cancel_event.wait(5)
+        return []
+
+    running = manager.submit("alice", 1, runner, cleanup=lambda: cleaned.append("running"))
+    queued = manager.submit("alice", 1, runner, cleanup=lambda: cleaned.append("queued"))
+    started.wait(5)
+    manager.shutdown()
+    assert queued.future.cancelled(), "The queued job should never start."
+    assert queued.status == JOB_CANCELLED and queued.finished_at, queued.status
+    _wait(running)
+    assert running.status == JOB_CANCELLED, running.status
+    assert sorted(cleaned) == ["queued", "running"], cleaned
+    assert not manager._cleanups
+
+
+def test_finished_jobs_always_report_finish_time():
+    """并发读取任务快照时，凡是结束状态都带有 finished_at"""
+    manager = JobManager(max_workers=4)
+    jobs = [manager.submit("alice", 1, lambda job: [{"index": 1}]) for _ in range(200)]
+    snapshots = []
+    while not all(job.future.done() for job in jobs):
+        snapshots.extend(job.to_public_dict() for job in jobs)
+    snapshots.extend(job.to_public_dict() for job in jobs)
+    finished = [item for item in snapshots if item["status"] in FINISHED_STATUSES]
+    assert finished and all(item["finished_at"] for item in finished), "Finished jobs must carry finished_at."
+    manager.shutdown()
+
+
+def test_legacy_endpoint_reports_jobs_cancelled_by_shutdown():
+    """/api/ocr/process 等待的任务在关闭时被取消，返回 503 而不是抛出 CancelledError"""
+    from web_backend import app as web_app
+
+    job = OcrJob(job_id="queued", username="alice", total=1)
+    job.future = Future()
+    job.future.cancel()
+
+    async def submit(files, username):
+        return job
+
+    with mock.patch.object(web_app, "_submit_ocr_job", submit):
+        try:
+            asyncio.run(web_app.process_ocr_images([], "alice"))
+        except HTTPException as exc:
+            assert exc.status_code == 503, exc.status_code
+        else:
+            raise AssertionError("A job cancelled before it ran should be reported as 503.")
+
+
+def _parse_sse(chunks):
+    events = []
+    for chunk in chunks:
+        if chunk.startswith(":"):
+            continue
+        lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_event_stream_pushes_per_image_deltas():
+    """SSE 按图片逐条推送结果增量，任务结束后发送 end 并关闭；after 参数跳过已收到的结果"""
+    manager = JobManager(max_workers=1)
+    step = threading.Semaphore(0)
+
+    def runner(job):
+        for idx in range(1, 4):
+            step.acquire(timeout=5)
+            job.append_results([{"index": idx}])
+        return job.results
+
+    job = manager.submit("alice", 3, runner)
+
+    async def consume(after=0):
+        chunks = []
+        async for chunk in stream_job_events(job, after=after, heartbeat_seconds=0.05):
+            chunks.append(chunk)
+            if chunk.startswith("event: status"):
+                step.release()
+        return chunks
+
+    events = _parse_sse(asyncio.run(consume()))
+    results = [data["index"] for name, data in events if name == "result"]
+    assert results == [1, 2, 3], f"Each image should be pushed exactly once: {results}"
+    assert events[-1][0] == "end" and events[-1][1]["status"] == JOB_COMPLETED
+    resumed = _parse_sse(asyncio.run(consume(after=2)))
+    assert [data["index"] for name, data in resumed if name == "result"] == [3], "after should skip delivered results."
+    manager.shutdown()
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_job_runs_in_background_and_reports_results()
+    print("PASS: OCR jobs run in the background.")
+    test_job_failure_and_retention()
+    print("PASS: failed jobs are recorded and expired jobs purged.")
+    test_cancel_stops_remaining_images()
+    print("PASS: cancelling a job stops remaining images.")
+    test_shutdown_cancels_queued_jobs_and_cleans_up()
+    print("PASS: shutdown cancels queued jobs and cleans up.")
+    test_finished_jobs_always_report_finish_time()
+    print("PASS: finished jobs always report their finish time.")
+    test_legacy_endpoint_reports_jobs_cancelled_by_shutdown()
+    print("PASS: legacy endpoint reports jobs cancelled by shutdown.")
+    test_event_stream_pushes_per_image_deltas()
+    print("PASS: event stream pushes per-image deltas.")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""OCR 客户端重试与缓存验证"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from ocr_cache import OcrResultCache
+from ocr_client import AccessTokenCache, BaiduOcrClient
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self._payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._payload
+
+
+class _ScriptedSession:
+    """按顺序返回预设响应，并记录调用参数"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def post(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        return self.responses.pop(0)
+
+
+def _client_with(responses, max_retries=3) -> BaiduOcrClient:
+    client = BaiduOcrClient(max_retries=max_retries, backoff_factor=0)
+    client.session = _ScriptedSession(responses)
+    return client
+
+
+def test_retries_qps_limit_and_server_errors():
+    """QPS 超限与 5xx 响应会被重试，最终返回成功结果"""
+    client = _client_with([
+        _FakeResponse(200, {"error_code": 18, "error_msg": "Open api qps request limit reached"}),
+        _FakeResponse(503, {}),
+        _FakeResponse(200, {"words_result": [{"words": "方案一男"}]}),
+    ])
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as handle:
+        handle.write(b"fake-image")
+    try:
+        result = client.recognize("token", handle.name)
+    finally:
+        os.unlink(handle.name)
+    assert result == {"words_result": [{"words": "方案一男"}]}, "Client should return the first successful payload."
+    assert len(client.session.calls) == 3, "Client should retry until success."
+    assert all(call[1]["timeout"] == client.timeout for call in client.session.calls), "Every request needs a timeout."
+
+
+def test_gives_up_after_max_retries():
+    """重试耗尽后返回 None，非临时错误不重试"""
+    client = _client_with([_FakeResponse(500, {})] * 3, max_retries=2)
+    assert client.get_access_token("key", "secret") is None, "Exhausted retries should yield None."
+    assert len(client.session.calls) == 3, "Client should stop after max_retries."
+
+    client = _client_with([_FakeResponse(200, {"error_code": 110, "error_msg": "Access token invalid"})])
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as handle:
+        handle.write(b"fake-image")
+    try:
+        result = client.recognize("token", handle.name)
+    finally:
+        os.unlink(handle.name)
+    assert result["error_code"] == 110, "Non-retryable errors should be returned to the caller."
+    assert len(client.session.calls) == 1, "Non-retryable errors must not be retried."
+
+
+def test_every_attempt_is_throttled():
+    """每次实际发出的请求（含重试）前都调用节流函数，缓存命中不调用"""
+    client = _client_with([
+        _FakeResponse(200, {"error_code": 18, "error_msg": "Open api qps request limit reached"}),
+        _FakeResponse(503, {}),
+        _FakeResponse(200, {"words_result": [{"words": "方案一男"}]}),
+    ])
+    throttled = []
+
+    def throttle():
+        throttled.append(len(client.session.calls))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client.result_cache = OcrResultCache(os.path.join(tmp_dir, "ocr"))
+        path = os.path.join(tmp_dir, "a.png")
+        with open(path, "wb") as f:
+            f.write(b"fake-image")
+        assert client.recognize("token", path, throttle=throttle) == {"words_result": [{"words": "方案一男"}]}
+        assert throttled == [0, 1, 2], "Each retry should wait for the shared rate limiter."
+        client.recognize("token", path, throttle=throttle)
+        assert len(throttled) == 3, "Cache hits must not consume QPS quota."
+
+
+def test_token_cache_shares_single_refresh():
+    """并发获取 token 时只发起一次刷新，且结果可持久化后复用"""
+    fetch_calls = []
+
+    def fetch(api_key, secret_key):
+        fetch_calls.append(api_key)
+        time.sleep(0.05)
+        return f"token-{len(fetch_calls)}", 30 * 86400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, "token.json")
+        cache = AccessTokenCache(cache_path)
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(cache.get("key", "secret", fetch))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert fetch_calls == ["key"], "Concurrent callers should share a single refresh."
+        assert set(tokens) == {"token-1"}, "Every caller should receive the refreshed token."
+
+        restored = AccessTokenCache(cache_path)
+        assert restored.get("key", "secret", fetch) == "token-1", "Persisted token should survive a restart."
+        assert restored.get("key", "other-secret", fetch) == "token-2", "Changed secret must force a refresh."
+        assert len(fetch_calls) == 2, "Only the secret change should trigger another refresh."
+
+
+def test_token_cache_refreshes_before_expiry():
+    """临近过期（进入 refresh_margin）时主动刷新，服务端判定失效时丢弃"""
+    cache = AccessTokenCache(refresh_margin=60)
+    issued = iter([("short", 30), ("long", 3600), ("fresh", 3600)])
+    fetch = lambda api_key, secret_key: next(issued)
+    assert cache.get("key", "secret", fetch) == "short"
+    assert cache.get("key", "secret", fetch) == "long", "Token inside refresh margin should be replaced."
+    assert cache.get("key", "secret", fetch) == "long", "Valid token should be served from cache."
+    cache.invalidate_token("long")
+    assert cache.get("key", "secret", fetch) == "fresh", "Invalidated token should be refetched."
+
+
+def test_result_cache_hits_and_lru_eviction():
+    """相同图片内容命中缓存不再请求；超出容量时淘汰最久未使用的条目"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = OcrResultCache(os.path.join(tmp_dir, "ocr"), max_bytes=10_000)
+        client = _client_with([_FakeResponse(200, {"words_result": [{"words": "血常规"}]})])
+        client.result_cache = cache
+        first_path = os.path.join(tmp_dir, "a.png")
+        second_path = os.path.join(tmp_dir, "b.png")
+        for path in (first_path, second_path):
+            with open(path, "wb") as f:
+                f.write(b"same-image-bytes")
+        assert client.recognize("token", first_path) == {"words_result": [{"words": "血常规"}]}
+        assert client.recognize("token", second_path) == {"words_result": [{"words": "血常规"}]}
+        assert len(client.session.calls) == 1, "Identical image content should be served from cache."
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+        digest = hashlib.sha256(b"same-image-bytes").hexdigest()
+        missing_path = os.path.join(tmp_dir, "already-removed.png")
+        assert client.recognize("token", missing_path, image_sha256=digest) == {"words_result": [{"words": "血常规"}]}, \
+            "A precomputed digest should hit the cache without reading the file."
+
+        small = OcrResultCache(os.path.join(tmp_dir, "small"), max_bytes=150)
+        payload = {"words_result": [{"words": "x" * 30}]}
+        for key in ("k1", "k2", "k3"):
+            small.put(key, payload)
+            if key == "k2":
+                assert small.get("k1") is not None, "k1 should still be cached."
+        assert small.get("k2") is None, "Least recently used entry should be evicted first."
+        assert small.get("k1") is not None and small.get("k3") is not None
+        assert small.stats()["bytes"] <= 150, "Cache must stay within its size budget."
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_retries_qps_limit_and_server_errors()
+    print("PASS: transient OCR errors are retried.")
+    test_gives_up_after_max_retries()
+    print("PASS: retries stop when exhausted or not retryable.")
+    test_every_attempt_is_throttled()
+    print("PASS: every OCR attempt is throttled.")
+    test_token_cache_shares_single_refresh()
+    print("PASS: token cache shares a single refresh.")
+    test_token_cache_refreshes_before_expiry()
+    print("PASS: token cache refreshes before expiry.")
+    test_result_cache_hits_and_lru_eviction()
+    print("PASS: OCR result cache hits and evicts by LRU.")
+
+
+if __name__ == "__main__":
+    run_all()
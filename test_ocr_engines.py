@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""OCR 引擎接口验证"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from ocr_client import BaiduOcrClient, QPS_LIMIT
+from ocr_engines import LocalOcrEngine, OcrEngine, OcrEngineUnavailable, ReplayOcrEngine, create_engine, make_words_result
+from web_backend.services.comparison_service import OCRImage, process_images_with_ocr
+
+from test_comparison_service import EXCEL_DATA, _fake_ocr_payload
+
+
+def test_replay_engine_serves_recorded_payloads():
+    """按图片摘要回放录制结果，未录制的图片返回 None；无需密钥即可跑完整比对流程"""
+    with tempfile.TemporaryDirectory() as corpus, tempfile.TemporaryDirectory() as images_dir:
+        recorded = Path(images_dir) / "recorded.jpg"
+        missing = Path(images_dir) / "missing.jpg"
+        recorded.write_bytes(b"recorded-image")
+        missing.write_bytes(b"missing-image")
+        digest = hashlib.sha256(b"recorded-image").hexdigest()
+        (Path(corpus) / f"{digest}.json").write_text(json.dumps(_fake_ocr_payload(), ensure_ascii=False), encoding="utf-8")
+
+        engine = ReplayOcrEngine(corpus)
+        assert not engine.requires_credentials
+        assert engine.recognize("local", str(recorded)) == _fake_ocr_payload()
+        assert engine.recognize("local", "/nonexistent", image_sha256=digest) == _fake_ocr_payload(), (
+            "A known digest should not touch the file."
+        )
+        report = process_images_with_ocr(
+            [OCRImage(path=str(recorded), name="recorded.jpg"), OCRImage(path=str(missing), name="missing.jpg")],
+            "", "", EXCEL_DATA, {}, qps_limit=0, ocr_client=engine,
+        )
+    assert report[0]["schemes"][0]["status"] == "matched_perfect", report[0]
+    assert report[1]["errors"] == ["OCR无响应"] and engine.misses == 1
+
+
+class _FakeTesseract:
+    class Output:
+        DICT = "dict"
+
+    @staticmethod
+    def image_to_data(image, lang, output_type):
+        # 两行：中文词直接拼接，英文与数字词之间保留空格；conf 为 -1 的是版面块，不是文字
+        return {
+            "text": ["", "方案一", "男", "CT", "128", "血常规"],
+            "conf": ["-1", "96", "95", "90", "91", "93"],
+            "block_num": [1, 1, 1, 1, 1, 1],
+            "par_num": [1, 1, 1, 1, 1, 1],
+            "line_num": [0, 1, 1, 2, 2, 2],
+            "left": [0, 10, 80, 10, 50, 100],
+            "top": [0, 10, 12, 40, 41, 40],
+            "width": [300, 60, 20, 30, 40, 60],
+            "height": [100, 20, 18, 20, 20, 22],
+        }
+
+
+def test_local_engine_groups_words_into_lines():
+    """本地引擎输出与百度一致的行粒度结构，并带 location"""
+    engine = LocalOcrEngine("tesseract")
+    engine._model = _FakeTesseract
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as handle:
+        Image.new("RGB", (200, 100), "white").save(handle, format="PNG")
+    try:
+        payload = engine.recognize("local", handle.name)
+    finally:
+        os.unlink(handle.name)
+    assert payload == {
+        "words_result": [
+            {"words": "方案一男", "location": {"top": 10, "left": 10, "width": 90, "height": 20}},
+            {"words": "CT 128血常规", "location": {"top": 40, "left": 10, "width": 150, "height": 22}},
+        ],
+        "words_result_num": 2,
+    }, payload
+    assert make_words_result([(" ", None), ("血常规", None)])["words_result"] == [{"words": "血常规"}]
+
+
+def test_corpus_covers_sample_images():
+    """回放语料覆盖 test/ 下的全部样例图片，且摘要与图片内容一致"""
+    corpus = Path(__file__).resolve().parent / "benchmarks" / "ocr_corpus"
+    manifest = json.loads((corpus / "manifest.json").read_text(encoding="utf-8"))
+    engine = ReplayOcrEngine(str(corpus))
+    entries = [image for image_set in manifest["sets"] for image in image_set["images"]]
+    assert {set_entry["name"] for set_entry in manifest["sets"]} == {"1", "2", "3", "4"}
+    for image in entries:
+        path = Path(__file__).resolve().parent / image["path"]
+        assert hashlib.sha256(path.read_bytes()).hexdigest() == image["sha256"], f"Stale corpus entry: {image['path']}"
+        assert engine.recognize("local", str(path))["words_result"], image["path"]
+
+
+def test_only_metered_engines_are_throttled():
+    """百度按配额限速；回放与本地识别不限速，整批回放不会被节流等待拖慢"""
+    assert BaiduOcrClient.qps_limit == QPS_LIMIT
+    assert ReplayOcrEngine.qps_limit is None and LocalOcrEngine.qps_limit is None
+    with tempfile.TemporaryDirectory() as corpus, tempfile.TemporaryDirectory() as images_dir:
+        images = []
+        for idx in range(8):
+            path = Path(images_dir) / f"{idx}.jpg"
+            path.write_bytes(f"image-{idx}".encode())
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            (Path(corpus) / f"{digest}.json").write_text(json.dumps(_fake_ocr_payload(), ensure_ascii=False), encoding="utf-8")
+            images.append(OCRImage(path=str(path), name=path.name))
+        start = time.monotonic()
+        report = process_images_with_ocr(images, "", "", EXCEL_DATA, {}, ocr_client=ReplayOcrEngine(corpus))
+        elapsed = time.monotonic() - start
+    assert all(item["schemes"][0]["status"] == "matched_perfect" for item in report)
+    assert elapsed < 1.0, f"Replay should not wait for the Baidu QPS limit ({elapsed:.2f}s)."
+
+
+def test_unknown_engines_are_rejected():
+    for factory in (lambda: create_engine("cloud"), lambda: LocalOcrEngine("easyocr")):
+        try:
+            factory()
+        except OcrEngineUnavailable:
+            continue
+        raise AssertionError("Unknown engines should raise OcrEngineUnavailable.")
+
+
+def test_incomplete_engines_fail_on_creation():
+    """未实现 recognize_with_location 的引擎在创建时即报错，而不是在拼接识别时才失败"""
+
+    class _PathOnlyEngine(OcrEngine):
+        def recognize(self, access_token, image_path, image_sha256=None, throttle=None):
+            return _fake_ocr_payload()
+
+    try:
+        _PathOnlyEngine()
+    except TypeError as e:
+        assert "recognize_with_location" in str(e)
+    else:
+        raise AssertionError("An engine missing recognize_with_location should not be instantiable.")
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_replay_engine_serves_recorded_payloads()
+    print("PASS: replay engine serves recorded payloads.")
+    test_local_engine_groups_words_into_lines()
+    print("PASS: local engine groups words into lines.")
+    test_corpus_covers_sample_images()
+    print("PASS: replay corpus covers the sample images.")
+    test_only_metered_engines_are_throttled()
+    print("PASS: only metered engines are throttled.")
+    test_unknown_engines_are_rejected()
+    print("PASS: unknown engines are rejected.")
+    test_incomplete_engines_fail_on_creation()
+    print("PASS: incomplete engines fail on creation.")
+
+
+if __name__ == "__main__":
+    run_all()
@@ -192,6 +192,69 @@ def test_find_best_match_handles_unclosed_noise_parentheses():
     ), "Mixed CT markers with trailing noise should match."
 
 
+def test_scheme_index_buckets_by_keyword():
+    """SchemeIndex 按性别/婚姻关键字分桶，且与直接传入方案列表的结果一致"""
+    scheme_names = ["方案一 - 男", "方案一 - 女未婚", "方案一 - 女已婚", "方案二 - 男"]
+    index = logic.SchemeIndex(scheme_names)
+    assert [name for name, _ in index.candidates("男")] == ["方案一 - 男", "方案二 - 男"], "Male bucket mismatch."
+    assert [name for name, _ in index.candidates("女")] == ["方案一 - 女未婚", "方案一 - 女已婚"], "Female bucket mismatch."
+    assert len(index.candidates("通用")) == len(scheme_names), "Generic titles may match every scheme."
+    for title in ("方案二男（紫单见名单不可替检）", "方案一女已婚", "方案一（女未婚）"):
+        assert logic.find_best_match(title, index) == logic.find_best_match(title, scheme_names), f"Index result differs for {title}."
+
+
+def test_comparison_report_greedy_assignment():
+    """比对报告：精确/别名命中优先，其余按 Excel 顺序贪心模糊匹配，剩余 OCR 项目记为多余"""
+    alias_map = logic.build_alias_map([["静脉采血", "采血"], ["乳腺彩超", "乳腺彩色超声"]])
+    excel_items = ["血常规", "采血", "乳腺彩色超声", "甲状腺功能三项", "尿常规"]
+    ocr_items = ["乳腺彩超", "尿常规", "静脉采血", "甲状腺功能三项(A)", "血常规", "颈动脉彩超"]
+    report = logic.generate_comparison_report(excel_items, ocr_items, alias_map)
+    assert [(row["excel_item"], row["ocr_item"], row["status"]) for row in report] == [
+        ("血常规", "血常规", "匹配"),
+        ("采血", "静脉采血", "匹配"),
+        ("乳腺彩色超声", "乳腺彩超", "匹配"),
+        ("甲状腺功能三项", "甲状腺功能三项(A)", "匹配"),
+        ("尿常规", "尿常规", "匹配"),
+        ("【多余】", "颈动脉彩超", "多余"),
+    ], "Comparison rows mismatch."
+    assert [row.get("match_type") for row in report[:3]] == ["exact", "alias", "alias"], "Match types mismatch."
+
+    duplicated = logic.generate_comparison_report(["血常规", "血常规"], ["血常规"], {})
+    assert [row["status"] for row in duplicated] == ["匹配", "缺失"], "Each OCR item may only be used once."
+
+
+def test_comparison_report_optimal_assignment():
+    """全局最优模式下，靠前的 Excel 项目不会抢走后面项目唯一可匹配的 OCR 项目"""
+    excel_items = ["肝功能十三项", "肝功十三项"]
+    ocr_items = ["肝功十三项", "肝功能十三项检查"]
+    greedy = logic.generate_comparison_report(excel_items, ocr_items, {})
+    optimal = logic.generate_comparison_report(excel_items, ocr_items, {}, assignment="optimal")
+    assert [row["status"] for row in greedy] == ["匹配", "缺失", "多余"], "Greedy mode should keep its old behaviour."
+    assert [(row["excel_item"], row["ocr_item"]) for row in optimal] == [
+        ("肝功能十三项", "肝功能十三项检查"),
+        ("肝功十三项", "肝功十三项"),
+    ], "Optimal mode should match both items."
+    assert optimal[1]["match_type"] == "exact", "Match type should be preserved in optimal mode."
+
+
+def test_unknown_assignment_mode_falls_back_to_greedy():
+    """配置中的分配模式忽略大小写，未知取值回退为 greedy"""
+    assert logic.resolve_assignment_mode(" Optimal ") == "optimal"
+    assert logic.resolve_assignment_mode("hungarian", "matching/assignment") == "greedy"
+    assert logic.resolve_assignment_mode(None) == logic.resolve_assignment_mode("") == "greedy"
+
+
+def test_compiled_aliases_match_alias_map():
+    """编译后的别名规则与 build_alias_map 的映射一致，且为只读映射"""
+    alias_data = [["静脉采血", "采血"], ["乳腺彩超", "乳腺彩色超声"], ["彩超", "彩色超声"], ["肝功", "肝功能"]]
+    compiled = logic.compile_aliases(alias_data)
+    assert dict(compiled) == logic.build_alias_map(alias_data), "Compiled mapping should match build_alias_map."
+    assert compiled.get("静脉采血") == "采血" and compiled.get("血常规") is None
+    assert not hasattr(compiled, "__setitem__"), "Compiled aliases are shared across threads and must stay read-only."
+    report = logic.generate_comparison_report(["采血"], ["静脉采血"], compiled)
+    assert report[0]["status"] == "匹配", "Compiled aliases should work wherever an alias map is accepted."
+
+
 def run_all():
     """运行全部测试用例"""
     test_single_scheme_parsing()
@@ -212,6 +275,16 @@ def run_all():
     print("PASS: best-match preserves category parentheses.")
     test_find_best_match_handles_unclosed_noise_parentheses()
     print("PASS: best-match handles unclosed noise parentheses.")
+    test_scheme_index_buckets_by_keyword()
+    print("PASS: scheme index buckets schemes by keyword.")
+    test_comparison_report_greedy_assignment()
+    print("PASS: comparison report assigns items greedily.")
+    test_comparison_report_optimal_assignment()
+    print("PASS: optimal assignment avoids greedy mismatches.")
+    test_unknown_assignment_mode_falls_back_to_greedy()
+    print("PASS: unknown assignment modes fall back to greedy.")
+    test_compiled_aliases_match_alias_map()
+    print("PASS: compiled aliases match the alias map.")
 
 
 if __name__ == "__main__":
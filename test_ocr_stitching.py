@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""截图拼接识别验证"""
+
+import io
+import os
+import tempfile
+
+from PIL import Image
+
+from ocr_stitching import StitchOptions, extract_stitched_schemes, plan_stitch_groups, split_words_by_source, stitch_images
+from web_backend.services.comparison_service import OCRImage, process_images_with_ocr
+
+from test_comparison_service import EXCEL_DATA, _FakeOcrClient
+
+
+def _save_images(sizes):
+    paths = []
+    for width, height in sizes:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as handle:
+            Image.new("RGB", (width, height), "gray").save(handle, format="JPEG")
+        paths.append(handle.name)
+    return paths
+
+
+def _line(text, top, height=20):
+    return {"words": text, "location": {"top": top, "left": 10, "width": 200, "height": height}}
+
+
+def _page(spans, lines_per_source):
+    """按原图区间生成带 location 的 OCR 结果，每张原图内的文字自上而下排列"""
+    words = []
+    for (top, _), lines in zip(spans, lines_per_source):
+        words.extend(_line(text, top + 10 + 30 * offset) for offset, text in enumerate(lines))
+    return {"words_result": words}
+
+
+def test_plan_and_stitch_respect_limits():
+    """分组不超过最大高度；宽图等比缩小，窄图补白，区间记录每张原图的位置"""
+    paths = _save_images([(600, 400), (1200, 600), (600, 500), (600, 900)])
+    try:
+        options = StitchOptions(max_height=1220, max_width=600, gap=10)
+        # 第二张缩放到 600x300
+        assert plan_stitch_groups(paths, options) == [[0, 1, 2], [3]]
+        stitched = stitch_images(paths[:3], options)
+        assert stitched.spans == [(0, 400), (410, 710), (720, 1220)], stitched.spans
+        assert Image.open(io.BytesIO(stitched.data)).size == (600, 1220)
+        assert stitch_images(paths[:3], StitchOptions(max_bytes=100)) is None, "Oversized payloads should fall back."
+    finally:
+        for path in paths:
+            os.unlink(path)
+
+
+def test_words_map_back_to_source_images():
+    """按文字中心点拆回原图；独立的单方案截图各自解析，跨图延续的方案归属标题所在图片"""
+    spans = [(0, 400), (410, 800), (810, 1200)]
+    payload = {"words_result": [_line("a", 5), _line("b", 395, 20), _line("c", 420), {"words": "d"}, _line("e", 900)]}
+    assert [[entry["words"] for entry in words] for words in split_words_by_source(payload, spans)] == [
+        ["a", "b"], ["c", "d"], ["e"],
+    ], "Lines inside the gap belong to the image above; lines without location follow the previous line."
+
+    singles = _page(spans, [
+        ["订单编码", "方案一女未婚", "自定义选项", "血常规", "分组信息"],
+        ["订单编码", "方案二男", "自定义选项", "尿常规", "分组信息"],
+        ["订单编码", "自定义选项"],
+    ])
+    parsed = extract_stitched_schemes(singles, spans)
+    assert parsed[0] == ([("方案一女未婚", ["血常规"])], None)
+    assert parsed[1] == ([("方案二男", ["尿常规"])], None), "Single-scheme screenshots must not be merged."
+    assert parsed[2] == ([], None)
+
+    spanning = _page(spans, [
+        ["分组名称：", "方案一男", "分组价格：", "￥200.00", "血常规、尿"],
+        ["常规、肝功", "分组交费方式：统一结账", "分组名称：", "方案二女", "分组价格：", "￥300.00", "血常规、"],
+        ["乳腺彩超", "分组交费方式：统一结账"],
+    ])
+    parsed = extract_stitched_schemes(spanning, spans)
+    assert parsed[0] == ([("方案一男", ["血常规", "尿常规", "肝功"])], None), parsed[0]
+    assert parsed[1] == ([("方案二女", ["血常规", "乳腺彩超"])], None), parsed[1]
+    assert parsed[2] == ([], 1), "A continuation-only image should point at the image holding the title."
+
+
+def test_stitched_batch_keeps_per_image_report():
+    """拼接模式下一次请求识别整组图片，报告仍逐图给出且顺序不变"""
+    paths = _save_images([(300, 200)] * 3)
+    calls = []
+
+    class _LocationClient(_FakeOcrClient):
+        supports_location = True
+
+        def recognize_with_location(self, access_token, image_bytes, label="stitched", throttle=None):
+            calls.append(label)
+            spans = [(0, 200), (232, 432), (464, 664)]
+            return _page(spans, [
+                ["分组名称：", "方案一男", "分组价格：", "￥200.00", "血常规、"],
+                ["尿常规", "分组交费方式：统一结账"],
+                ["无关截图"],
+            ])
+
+    images = [OCRImage(path=path, name=f"img{idx}.jpg") for idx, path in enumerate(paths)]
+    received = []
+    try:
+        report = process_images_with_ocr(
+            images, "key", "secret", EXCEL_DATA, {}, progress_callback=received.extend,
+            qps_limit=0, ocr_client=_LocationClient(), stitch=StitchOptions(),
+        )
+    finally:
+        for path in paths:
+            os.unlink(path)
+    assert len(calls) == 1, "The whole batch should be recognized with a single request."
+    assert [item["image_name"] for item in report] == ["img0.jpg", "img1.jpg", "img2.jpg"]
+    assert report[0]["schemes"][0]["status"] == "matched_perfect", report[0]
+    assert report[1]["merged_into"] == "img0.jpg" and not report[1]["errors"]
+    assert report[2]["errors"] == ["未识别到方案或项目"]
+    assert received == report
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_plan_and_stitch_respect_limits()
+    print("PASS: stitch groups respect size limits.")
+    test_words_map_back_to_source_images()
+    print("PASS: words map back to their source images.")
+    test_stitched_batch_keeps_per_image_report()
+    print("PASS: stitched batches keep the per-image report.")
+
+
+if __name__ == "__main__":
+    run_all()
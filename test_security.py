@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""事件流票据验证"""
+
+from datetime import datetime, timedelta
+
+from web_backend.security import StreamTicketManager
+
+
+def test_stream_ticket_is_single_use_and_job_scoped():
+    """票据只对签发时的任务有效，兑换一次后作废"""
+    manager = StreamTicketManager(ttl_seconds=60)
+    ticket = manager.issue("admin", "job-1")
+    assert manager.redeem(ticket, "job-1") == "admin"
+    assert manager.redeem(ticket, "job-1") is None, "A ticket should not be redeemable twice."
+
+    other = manager.issue("admin", "job-1")
+    assert manager.redeem(other, "job-2") is None, "A ticket should only open its own job."
+    assert manager.redeem(other, "job-1") is None, "A ticket presented for another job is consumed."
+    assert manager.redeem("", "job-1") is None
+    assert manager.redeem("admin-session-token", "job-1") is None
+
+
+def test_stream_ticket_expires():
+    """过期票据不可兑换，并在签发新票据时被清理"""
+    manager = StreamTicketManager(ttl_seconds=60)
+    ticket = manager.issue("admin", "job-1")
+    manager._tickets[ticket].expires_at = datetime.utcnow() - timedelta(seconds=1)
+    assert manager.redeem(ticket, "job-1") is None
+
+    stale = manager.issue("admin", "job-1")
+    manager._tickets[stale].expires_at = datetime.utcnow() - timedelta(seconds=1)
+    fresh = manager.issue("admin", "job-1")
+    assert list(manager._tickets) == [fresh]
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_stream_ticket_is_single_use_and_job_scoped()
+    print("PASS: stream tickets are single-use and job-scoped.")
+    test_stream_ticket_expires()
+    print("PASS: expired stream tickets are rejected and purged.")
+
+
+if __name__ == "__main__":
+    run_all()
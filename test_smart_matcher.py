@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SmartMatcher 候选预选与语义特征验证"""
+
+from smart_matcher import FeatureTable, NgramIndex, SmartMatcher
+
+from test_comparison_service import _corpus_batches
+
+
+def _corpus_items():
+    """回放语料中每本工作簿的全部 Excel 项目与全部 OCR 项目"""
+    for parsed, payloads, _ in _corpus_batches():
+        excel_items = [item for categories in parsed.excel_data.values() for items in categories.values() for item in items]
+        ocr_items = [item for schemes in payloads for _, items in schemes for item in items]
+        yield list(dict.fromkeys(excel_items)), list(dict.fromkeys(ocr_items))
+
+
+def test_candidate_index_keeps_fuzzy_results():
+    """n-gram 预选后只对前 K 个候选打分，结果与对全部 Excel 项目打分一致"""
+    pruned = SmartMatcher(candidate_limit=5)
+    full = SmartMatcher(candidate_limit=10 ** 9)
+    for excel_items, ocr_items in _corpus_items():
+        assert len(excel_items) > 5
+        for item in ocr_items:
+            for threshold in (60, 85):
+                assert pruned._fuzzy_match(item, excel_items, threshold) == full._fuzzy_match(item, excel_items, threshold), item
+
+
+def test_top_k_ranks_shared_ngrams():
+    """候选按共有 gram 排序并保持原顺序；单字也能检索，没有共同字符的项目不入选"""
+    index = NgramIndex(["尿常规", "血常规", "血", "肝功能", "血常规", "乳腺彩色超声"])
+    assert index.items == ["尿常规", "血常规", "血", "肝功能", "乳腺彩色超声"], "Duplicates keep the first position."
+    assert index.top_k("血常规", 2) == [0, 1]
+    assert index.top_k("血", 1) == [2]
+    assert index.top_k("心电图", 3) == []
+    assert SmartMatcher(candidate_limit=2)._fuzzy_match("心电图", index.items, 50) is None
+
+
+def test_feature_table_matches_set_similarity():
+    """位掩码特征表的得分与逐项提取特征、按集合计算的原实现完全相同"""
+    matcher = SmartMatcher()
+    extra = ["女已婚妇科检查(A)(H)", "男(C13)", "(H)", "心电图", "甲状腺彩超(A)", "X线胸片"]
+    for excel_items, ocr_items in _corpus_items():
+        table = FeatureTable(excel_items + extra)
+        for item in ocr_items + extra + ["(Z)", ""]:
+            query = matcher._extract_features(item)
+            expected = [matcher._calculate_feature_similarity(query, matcher._extract_features(name)) for name in table.items]
+            assert table.similarity(item).tolist() == expected, item
+    assert matcher._semantic_match("甲状腺B超(A)", ["肝功能", "甲状腺彩超(A)", "甲状腺彩超"], 60) == "甲状腺彩超(A)"
+    assert matcher._semantic_match("血常规", [], 60) is None
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_candidate_index_keeps_fuzzy_results()
+    print("PASS: candidate index keeps fuzzy results.")
+    test_top_k_ranks_shared_ngrams()
+    print("PASS: top-k candidates rank shared n-grams.")
+    test_feature_table_matches_set_similarity()
+    print("PASS: feature table matches set-based similarity.")
+
+
+if __name__ == "__main__":
+    run_all()
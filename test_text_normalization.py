@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""名称归一化缓存验证"""
+
+import re
+
+from fuzzy_scoring import preprocess
+from smart_matcher import SmartMatcher
+from text_normalization import (
+    clear_normalization_cache,
+    fuzzy_key,
+    normalization_cache_stats,
+    normalize_components,
+    normalize_matcher_text,
+)
+
+NAMES = ["血常规", "甲状腺彩超", "方案一（女已婚）", "肝功能十三项 (A)", "【一般检查】", "碳十四呼气试验 C14", "", "零〇壹贰叁"]
+
+
+def _reference_matcher_text(text):
+    """改造前 SmartMatcher._normalize_text 的逐步替换实现"""
+    if not text:
+        return ""
+    text = text.replace('（', '(').replace('）', ')').replace('【', '[').replace('】', ']')
+    text = text.replace(' ', '').replace('　', '')
+    for pattern, digit in ((r'[零〇]', '0'), (r'[一壹]', '1'), (r'[二贰]', '2'), (r'[三叁]', '3')):
+        text = re.sub(pattern, digit, text)
+    return text.lower()
+
+
+def test_cached_forms_match_original_normalizers():
+    """缓存层的结果与原有的逐次正则实现一致"""
+    assert normalize_components("方案一（女已婚）-A") == "方案一 女已婚 a"
+    for name in NAMES:
+        assert normalize_matcher_text(name) == _reference_matcher_text(name), name
+        assert SmartMatcher()._normalize_text(name) == _reference_matcher_text(name), name
+        for scorer in ("ratio", "token_sort_ratio", "token_set_ratio"):
+            assert fuzzy_key(name, scorer) == preprocess([name], scorer)[0], (name, scorer)
+
+
+def test_repeated_names_hit_the_cache():
+    """重复名称命中缓存，统计中可见命中率，结果为驻留字符串"""
+    clear_normalization_cache()
+    first = normalize_components("".join(["方案二", "男"]))
+    for _ in range(3):
+        again = normalize_components("方案二男")
+    stats = normalization_cache_stats()
+    assert stats["by_kind"]["components"] == {"hits": 3, "misses": 1, "entries": 1}, stats
+    assert stats["hit_rate"] == 0.75 and stats["entries"] == 1, stats
+    assert again is first, "Normalized keys should be interned."
+    assert fuzzy_key("血常规", "ratio") is fuzzy_key("血常规", "partial_ratio")
+    assert "fuzzy:full_process" in normalization_cache_stats()["by_kind"]
+
+
+def run_all():
+    """运行全部测试用例"""
+    test_cached_forms_match_original_normalizers()
+    print("PASS: cached normalizers match the original implementations.")
+    test_repeated_names_hit_the_cache()
+    print("PASS: repeated names hit the normalization cache.")
+
+
+if __name__ == "__main__":
+    run_all()
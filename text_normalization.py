@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+项目名称归一化层
+精确匹配的组件化（logic.normalize_for_precise_matching）、SmartMatcher 的文本标准化与模糊打分的预处理
+都经过这里。每种归一化方式各有一个有界 LRU（字符串 -> 归一化结果），同一名称在进程内只做一次正则替换；
+结果经 sys.intern 驻留，重复出现的键共享同一个字符串对象。
+
+缓存大小由 MEC_NORMALIZE_CACHE_SIZE 控制（每种方式的条目上限，0 表示不缓存），
+命中率通过 normalization_cache_stats() 查看。
+"""
+
+import os
+import re
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence
+
+from fuzzy_scoring import SCORERS
+
+NORMALIZE_CACHE_SIZE = int(os.getenv("MEC_NORMALIZE_CACHE_SIZE", "8192"))
+
+_COMPONENT_SEPARATOR_PATTERN = re.compile(r'[（()\-（）、_]')
+_COMPONENT_PATTERN = re.compile('|'.join([
+    '方案[一二三四五六七八九十]+',
+    '女未婚', '女已婚',
+    '心脑血管', '血糖', '肿瘤',
+    '男', '女',
+    '[A-Za-z0-9]+',
+    '[\u4e00-\u9fa5]'
+]))
+
+# SmartMatcher 的标准化：统一括号、移除空格、统一数字，逐字符替换，一次 translate 完成
+_MATCHER_TRANSLATION = str.maketrans({
+    '（': '(', '）': ')', '【': '[', '】': ']',
+    ' ': None, '　': None,
+    '零': '0', '〇': '0',
+    '一': '1', '壹': '1',
+    '二': '2', '贰': '2',
+    '三': '3', '叁': '3',
+})
+
+
+def _components(text: str) -> str:
+    """按预定义组件拆分，组件之间以单个空格分隔"""
+    processed_text = _COMPONENT_SEPARATOR_PATTERN.sub(' ', text)
+    return " ".join(filter(None, _COMPONENT_PATTERN.findall(processed_text))).lower()
+
+
+def _matcher_text(text: str) -> str:
+    return text.translate(_MATCHER_TRANSLATION).lower()
+
+
+# 名称 -> 带缓存的归一化函数；打分器共用预处理函数时共用同一个缓存
+_CACHES: Dict[str, Callable[[str], str]] = {}
+
+
+def _register(kind: str, func: Callable[[str], str]) -> Callable[[str], str]:
+    cached = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(lambda text: sys.intern(func(text)))
+    _CACHES[kind] = cached
+    return cached
+
+
+_cached_components = _register("components", _components)
+_cached_matcher_text = _register("matcher", _matcher_text)
+
+
+def _register_fuzzy_processors() -> Dict[str, Callable[[str], str]]:
+    processors = {}
+    for scorer, (processor, _) in SCORERS.items():
+        kind = f"fuzzy:{processor.__name__.lstrip('_')}"
+        processors[scorer] = _CACHES.get(kind) or _register(kind, processor)
+    return processors
+
+
+_fuzzy_processors = _register_fuzzy_processors()
+
+
+def normalize_components(text: str) -> str:
+    """组件化精确匹配的归一化，如 '方案一（女已婚）' -> '方案一 女已婚'"""
+    if not text:
+        return ""
+    return _cached_components(text)
+
+
+def normalize_matcher_text(text: str) -> str:
+    """SmartMatcher 的文本标准化：统一括号与数字写法，去空格，英文转小写"""
+    if not text:
+        return ""
+    return _cached_matcher_text(text)
+
+
+def fuzzy_key(text: str, scorer: str = "ratio") -> str:
+    """与 fuzzy_scoring.preprocess 相同的预处理结果，可直接传给 score_matrix(processed=True)"""
+    return _fuzzy_processors[scorer](text)
+
+
+def fuzzy_keys(texts: Sequence[str], scorer: str = "ratio") -> List[str]:
+    processor = _fuzzy_processors[scorer]
+    return [processor(text) for text in texts]
+
+
+def normalization_cache_stats() -> Dict[str, object]:
+    """各归一化缓存的命中/未命中/条目数及汇总命中率"""
+    by_kind = {}
+    hits = misses = entries = 0
+    for kind, cached in _CACHES.items():
+        info = cached.cache_info()
+        by_kind[kind] = {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+        hits += info.hits
+        misses += info.misses
+        entries += info.currsize
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "entries": entries,
+        "max_entries": NORMALIZE_CACHE_SIZE * len(_CACHES),
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "by_kind": by_kind,
+    }
+
+
+def clear_normalization_cache() -> None:
+    for cached in _CACHES.values():
+        cached.cache_clear()
@@ -3,10 +3,12 @@ FastAPI 应用入口
 """
 from __future__ import annotations
 
+import asyncio
 import shutil
 import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 
 from fastapi import (
     Depends,
@@ -14,14 +16,16 @@ from fastapi import (
     File,
     HTTPException,
     Query,
+    Request,
     UploadFile,
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.staticfiles import StaticFiles
 
-import logic
+from ocr_engines import OcrEngineUnavailable, get_default_engine
 from .config_manager import config_manager
 from .schemas import (
     AccountUpdateRequest,
@@ -30,22 +34,70 @@ from .schemas import (
     LoginRequest,
     LoginResponse,
     OCRProcessResponse,
+    OcrJobListResponse,
+    OcrJobResponse,
+    OcrJobResultsResponse,
     OcrSettingsPayload,
     OcrSettingsResponse,
     ResultsResponse,
     RulesPayload,
     SchemeDetailResponse,
+    StreamTicketResponse,
 )
-from .security import TokenManager, verify_password
+from .security import StreamTicketManager, TokenManager, verify_password
 from .session_manager import session_manager
 from .services.comparison_service import (
+    MAX_BATCH_UPLOAD_BYTES,
+    MAX_EXCEL_UPLOAD_BYTES,
+    MAX_IMAGE_UPLOAD_BYTES,
+    ExcelParseTimeout,
+    OCRImage,
+    UploadTooLarge,
     cleanup_images,
-    parse_excel_file,
-    persist_upload,
+    compiled_alias_cache,
+    excel_parse_pool,
+    parse_excel_file_async,
+    persist_upload_stream,
     process_images_with_ocr,
 )
-
-app = FastAPI(title="Medical Exam Checker Web", version="0.1.0")
+from .services.job_manager import JOB_FAILED, OcrJob, job_manager, stream_job_events
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    yield
+    job_manager.shutdown()
+    excel_parse_pool.shutdown()
+
+
+app = FastAPI(title="Medical Exam Checker Web", version="0.1.0", lifespan=_lifespan)
+
+# multipart 边界与各部分头部的余量，Content-Length 超过“上限 + 余量”的上传直接拒绝
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+# 上传接口 -> (请求体上限, 超限提示)
+_UPLOAD_BODY_LIMITS = {
+    "/api/ocr/jobs": (MAX_BATCH_UPLOAD_BYTES, "本次上传图片总大小"),
+    "/api/ocr/process": (MAX_BATCH_UPLOAD_BYTES, "本次上传图片总大小"),
+    "/api/excel/upload": (MAX_EXCEL_UPLOAD_BYTES, "Excel 文件大小"),
+}
+
+
+# 先于 CORS 注册，CORS 仍在最外层，413 响应同样带跨域头
+@app.middleware("http")
+async def _reject_oversized_uploads(request: Request, call_next):
+    """
+    按声明的 Content-Length 提前拒绝超限上传，不读取请求体。
+    FastAPI 在进入接口前就会解析完整个 multipart 请求体，接口内的按块限额只能在收完之后生效；
+    未声明长度（分块传输）的请求仍由 persist_upload_stream 的限额兜底。
+    """
+    limit = _UPLOAD_BODY_LIMITS.get(request.url.path) if request.method == "POST" else None
+    content_length = request.headers.get("content-length", "")
+    if limit and content_length.isdigit() and int(content_length) > limit[0] + MULTIPART_OVERHEAD_BYTES:
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": f"{limit[1]}超过限制（{limit[0] / (1024 * 1024):.0f} MB）"},
+        )
+    return await call_next(request)
 
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +108,7 @@ app.add_middleware(
 )
 
 token_manager = TokenManager(ttl_minutes=240)
+stream_ticket_manager = StreamTicketManager(ttl_seconds=60)
 bearer_auth = HTTPBearer(auto_error=False)
 
 
@@ -166,23 +219,36 @@ async def upload_excel(
     file: UploadFile = File(...),
     username: str = Depends(get_current_username),
 ) -> ExcelUploadResponse:
-    contents = await file.read()
-    if not contents:
+    if not file.filename:
+        file.filename = "excel.xlsx"
+    try:
+        saved = await persist_upload_stream(Path(tempfile.gettempdir()), file, MAX_EXCEL_UPLOAD_BYTES)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc)) from exc
+    if saved is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Excel 文件内容为空")
-    suffix = Path(file.filename or "excel.xlsx").suffix or ".xlsx"
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    temp_file.write(contents)
-    temp_file.flush()
-    temp_file.close()
     try:
         rules = config_manager.get_rules_for_user(username)
-        result = parse_excel_file(Path(temp_file.name), rules.get("renames", []), rules.get("gender_renames", []))
-        session_manager.update_excel_payload(username, result.excel_data, result.sheet_order, file.filename or "方案.xlsx")
+        result = await parse_excel_file_async(
+            Path(saved.path),
+            rules.get("renames", []),
+            rules.get("gender_renames", []),
+            content_digest=saved.sha256,
+        )
+        session_manager.update_excel_payload(
+            username,
+            result.excel_data,
+            result.sheet_order,
+            file.filename or "方案.xlsx",
+            scheme_index=result.scheme_index,
+        )
         return ExcelUploadResponse(sheet_order=result.sheet_order, scheme_catalog=result.scheme_catalog)
+    except ExcelParseTimeout as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     finally:
-        Path(temp_file.name).unlink(missing_ok=True)
+        Path(saved.path).unlink(missing_ok=True)
 
 
 @app.get("/api/excel/status", response_model=ExcelStatusResponse)
@@ -213,62 +279,202 @@ def excel_scheme_detail(
     return SchemeDetailResponse(scheme=name, items=items)
 
 
-@app.post("/api/ocr/process", response_model=OCRProcessResponse)
-async def process_ocr_images(
-    files: List[UploadFile] = File(...),
-    username: str = Depends(get_current_username),
-) -> OCRProcessResponse:
+async def _persist_ocr_uploads(files: List[UploadFile]) -> Tuple[Path, List[OCRImage]]:
+    """逐个文件按块落盘，单张图片与整批总大小分别受限"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="ocr_uploads_"))
+    persisted: List[OCRImage] = []
+    batch_bytes = 0
+    try:
+        for upload in files:
+            if not upload.filename:
+                upload.filename = "ocr.png"
+            remaining = MAX_BATCH_UPLOAD_BYTES - batch_bytes
+            try:
+                image = await persist_upload_stream(temp_dir, upload, min(MAX_IMAGE_UPLOAD_BYTES, remaining))
+            except UploadTooLarge as exc:
+                detail = str(exc)
+                if remaining < MAX_IMAGE_UPLOAD_BYTES:
+                    detail = f"本次上传图片总大小超过限制（{MAX_BATCH_UPLOAD_BYTES / (1024 * 1024):.0f} MB）"
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail) from exc
+            if image is None:
+                continue
+            batch_bytes += image.size
+            persisted.append(image)
+    except BaseException:
+        cleanup_images(persisted)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    if not persisted:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="所有上传文件为空")
+    return temp_dir, persisted
+
+
+async def _submit_ocr_job(files: List[UploadFile], username: str) -> OcrJob:
+    """校验前置条件、落盘上传图片并提交后台任务"""
     state = session_manager.get_excel_payload(username)
     if not state.excel_data:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先上传并解析Excel方案")
     if not files:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请提供至少一张图片")
     ocr_cfg = config_manager.get_ocr_for_user(username)
-    alias_map = logic.build_alias_map(config_manager.get_rules_for_user(username).get("aliases", []))
-    temp_dir = Path(tempfile.mkdtemp(prefix="ocr_uploads_"))
-    persisted = []
     try:
-        for upload in files:
-            data = await upload.read()
-            if not data:
-                continue
-            persisted.append(persist_upload(temp_dir, upload.filename or "ocr.png", data))
-        if not persisted:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="所有上传文件为空")
-
-        session_manager.update_results(username, [])
-
-        def publish_progress(partial: List[dict]) -> None:
-            session_manager.update_results(username, partial)
+        engine = get_default_engine()
+    except OcrEngineUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    if engine.requires_credentials and (not ocr_cfg.get("api_key") or not ocr_cfg.get("secret_key")):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="缺少百度OCR API密钥")
+    alias_map = compiled_alias_cache.get_or_compile(
+        username, config_manager.rules_version(username), lambda: config_manager.get_rules_with_version(username)
+    )
+    temp_dir, persisted = await _persist_ocr_uploads(files)
+    excel_data, scheme_index = state.excel_data, state.scheme_index
 
-        report = process_images_with_ocr(
+    def run(job: OcrJob) -> List[dict]:
+        return process_images_with_ocr(
             persisted,
             ocr_cfg.get("api_key", ""),
             ocr_cfg.get("secret_key", ""),
-            state.excel_data,
+            excel_data,
             alias_map,
-            progress_callback=publish_progress,
+            progress_callback=job.append_results,
+            scheme_index=scheme_index,
+            cancel_event=job.cancel_event,
         )
-        session_manager.update_results(username, report)
-        return OCRProcessResponse(report=report)
-    except ValueError as exc:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
-    except RuntimeError as exc:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
-    finally:
+
+    def cleanup() -> None:
         cleanup_images(persisted)
         shutil.rmtree(temp_dir, ignore_errors=True)
 
+    job = job_manager.submit(username, len(persisted), run, cleanup)
+    session_manager.set_latest_job(username, job.job_id)
+    return job
+
+
+def _get_job_or_404(username: str, job_id: str) -> OcrJob:
+    job = job_manager.get(username, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未找到对应的OCR任务")
+    return job
+
+
+@app.post("/api/ocr/jobs", response_model=OcrJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_ocr_job(
+    files: List[UploadFile] = File(...),
+    username: str = Depends(get_current_username),
+) -> OcrJobResponse:
+    job = await _submit_ocr_job(files, username)
+    return OcrJobResponse(**job.to_public_dict())
+
+
+@app.get("/api/ocr/jobs", response_model=OcrJobListResponse)
+def list_ocr_jobs(username: str = Depends(get_current_username)) -> OcrJobListResponse:
+    return OcrJobListResponse(jobs=[OcrJobResponse(**job.to_public_dict()) for job in job_manager.list_jobs(username)])
+
+
+@app.get("/api/ocr/jobs/{job_id}", response_model=OcrJobResponse)
+def get_ocr_job(job_id: str, username: str = Depends(get_current_username)) -> OcrJobResponse:
+    return OcrJobResponse(**_get_job_or_404(username, job_id).to_public_dict())
+
+
+@app.get("/api/ocr/jobs/{job_id}/results", response_model=OcrJobResultsResponse)
+def get_ocr_job_results(
+    job_id: str,
+    since: int = Query(0, ge=0, description="只返回序号 since 之后完成的图片"),
+    username: str = Depends(get_current_username),
+) -> OcrJobResultsResponse:
+    job = _get_job_or_404(username, job_id)
+    results, seq = job.results_since(since)
+    return OcrJobResultsResponse(
+        **{**job.to_public_dict(), "completed": seq}, results=results, since=min(since, seq), seq=seq
+    )
+
+
+@app.post("/api/ocr/jobs/{job_id}/stream-ticket", response_model=StreamTicketResponse)
+def issue_stream_ticket(job_id: str, username: str = Depends(get_current_username)) -> StreamTicketResponse:
+    # EventSource 无法设置请求头，先用会话 Token 换取仅对该任务有效、一次性的短时票据
+    _get_job_or_404(username, job_id)
+    ticket = stream_ticket_manager.issue(username, job_id)
+    return StreamTicketResponse(ticket=ticket, expires_in=int(stream_ticket_manager.ttl.total_seconds()))
+
+
+@app.get("/api/ocr/jobs/{job_id}/events")
+async def stream_ocr_job(
+    job_id: str,
+    ticket: str = Query(..., description="通过 POST /api/ocr/jobs/{job_id}/stream-ticket 获取的一次性票据"),
+    after: int = Query(0, ge=0, description="客户端已收到的图片数，重连时只补发之后的结果"),
+) -> StreamingResponse:
+    username = stream_ticket_manager.redeem(ticket, job_id)
+    if not username:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="事件流票据无效或已过期")
+    job = _get_job_or_404(username, job_id)
+    return StreamingResponse(
+        stream_job_events(job, after),
+        media_type="text/event-stream",
+        # 关闭反向代理缓冲，保证事件即时送达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/ocr/jobs/{job_id}/cancel", response_model=OcrJobResponse)
+def cancel_ocr_job(job_id: str, username: str = Depends(get_current_username)) -> OcrJobResponse:
+    job = job_manager.cancel(username, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未找到对应的OCR任务")
+    return OcrJobResponse(**job.to_public_dict())
+
+
+@app.delete("/api/ocr/jobs/{job_id}")
+def delete_ocr_job(job_id: str, username: str = Depends(get_current_username)) -> dict:
+    job = _get_job_or_404(username, job_id)
+    if not job_manager.remove(username, job_id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="任务仍在运行，请先取消")
+    if session_manager.get_excel_payload(username).latest_job_id == job.job_id:
+        session_manager.set_latest_job(username, None)
+    return {"message": "ok"}
+
+
+@app.post("/api/ocr/process", response_model=OCRProcessResponse)
+async def process_ocr_images(
+    files: List[UploadFile] = File(...),
+    username: str = Depends(get_current_username),
+) -> OCRProcessResponse:
+    """兼容旧接口：提交后台任务并等待其结束，等待期间不占用事件循环"""
+    job = await _submit_ocr_job(files, username)
+    try:
+        # shield：客户端断开只结束本次等待，不取消后台任务
+        report = await asyncio.shield(asyncio.wrap_future(job.future))
+    except asyncio.CancelledError:
+        if not job.future.cancelled():
+            raise
+        # 服务关闭时排队中的任务被取消，从未执行
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="服务正在关闭，OCR 任务未执行")
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=job.error or "OCR 处理失败")
+    return OCRProcessResponse(report=report)
+
 
 @app.get("/api/results", response_model=ResultsResponse)
-def latest_results(username: str = Depends(get_current_username)) -> ResultsResponse:
+def latest_results(
+    since: int = Query(0, ge=0, description="只返回序号 since 之后完成的图片"),
+    job_id: Optional[str] = Query(None, description="客户端持有结果所属的任务，与最新任务不一致时返回全量"),
+    username: str = Depends(get_current_username),
+) -> ResultsResponse:
     state = session_manager.get_excel_payload(username)
-    return ResultsResponse(results=state.latest_results)
+    job = job_manager.get(username, state.latest_job_id) if state.latest_job_id else None
+    if job is None:
+        return ResultsResponse(results=[])
+    if job_id is not None and job_id != job.job_id:
+        since = 0
+    results, seq = job.results_since(since)
+    return ResultsResponse(
+        results=results, job_id=job.job_id, status=job.status, total=job.total, since=min(since, seq), seq=seq
+    )
 
 
 @app.post("/api/results/clear")
 def clear_results(username: str = Depends(get_current_username)) -> dict:
-    session_manager.update_results(username, [])
+    session_manager.set_latest_job(username, None)
     return {"message": "ok"}
 
 
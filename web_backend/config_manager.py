@@ -8,7 +8,7 @@ import os
 from copy import deepcopy
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from .security import hash_password
 
@@ -80,6 +80,9 @@ class ConfigManager:
     def __init__(self, path: Path = CONFIG_PATH):
         self.path = path
         self._lock = Lock()
+        # 规则版本号：用户规则每次变更都取一个新的全局递增值，进程内按 (用户名, 版本) 缓存编译后的规则
+        self._rules_generation = 0
+        self._rules_versions: Dict[str, int] = {}
         self._config = self._load()
 
     def _load(self) -> Dict[str, Any]:
@@ -118,6 +121,10 @@ class ConfigManager:
     def _save(self) -> None:
         self._write(self._config)
 
+    def _bump_rules_version(self, username: str) -> None:
+        self._rules_generation += 1
+        self._rules_versions[username] = self._rules_generation
+
     def get_snapshot(self) -> Dict[str, Any]:
         with self._lock:
             return deepcopy(self._config)
@@ -138,6 +145,7 @@ class ConfigManager:
         rules = user.get("rules")
         if not rules or not any(rules.get(key) for key in ("aliases", "renames", "gender_renames")):
             user["rules"] = deepcopy(DEFAULT_RULES)
+            self._bump_rules_version(user["username"])
             updated = True
         ocr = user.get("ocr")
         if not ocr or not ocr.get("api_key") or not ocr.get("secret_key"):
@@ -188,11 +196,16 @@ class ConfigManager:
                 }
             )
             self._config["users"] = users
+            self._bump_rules_version(new_username)
             self._save()
             return {"username": new_username}
 
     # ----- OCR & 规则按用户持久化 -----
     def get_rules_for_user(self, username: str) -> Dict[str, List[List[str]]]:
+        return self.get_rules_with_version(username)[0]
+
+    def get_rules_with_version(self, username: str) -> Tuple[Dict[str, List[List[str]]], int]:
+        """返回规则副本及其版本号，二者在同一把锁内读取"""
         with self._lock:
             user = self._get_user(username)
             if not user:
@@ -201,8 +214,14 @@ class ConfigManager:
             if self._sync_rules_with_defaults(user["rules"]):
                 changed = True
             if changed:
+                self._bump_rules_version(username)
                 self._save()
-            return deepcopy(user.get("rules", DEFAULT_RULES))
+            return deepcopy(user.get("rules", DEFAULT_RULES)), self._rules_versions.get(username, 0)
+
+    def rules_version(self, username: str) -> int:
+        """用户规则的当前版本号，无需复制规则即可判断缓存是否有效"""
+        with self._lock:
+            return self._rules_versions.get(username, 0)
 
     def update_rules_for_user(self, username: str, rules: Dict[str, List[List[str]]]) -> Dict[str, List[List[str]]]:
         with self._lock:
@@ -212,6 +231,7 @@ class ConfigManager:
             for key in ("aliases", "renames", "gender_renames"):
                 rules.setdefault(key, [])
             user["rules"] = rules
+            self._bump_rules_version(username)
             self._save()
             return deepcopy(user["rules"])
 
@@ -73,8 +73,41 @@ class OCRProcessResponse(BaseModel):
     report: List[Dict[str, Any]]
 
 
+class OcrJobResponse(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+
+class StreamTicketResponse(BaseModel):
+    # 一次性票据，作为 /api/ocr/jobs/{job_id}/events 的 ticket 查询参数
+    ticket: str
+    expires_in: int
+
+
+class OcrJobListResponse(BaseModel):
+    jobs: List[OcrJobResponse]
+
+
+class OcrJobResultsResponse(OcrJobResponse):
+    # results 为序号 since 之后完成的图片，seq 为当前序号（已完成图片数），下次请求传入 since=seq
+    results: List[Dict[str, Any]]
+    since: int = 0
+    seq: int = 0
+
+
 class ResultsResponse(BaseModel):
     results: List[Dict[str, Any]]
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+    total: int = 0
+    since: int = 0
+    seq: int = 0
 
 
 class SchemeDetailResponse(BaseModel):
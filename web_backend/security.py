@@ -77,3 +77,41 @@ class TokenManager:
         with self._lock:
             self._tokens.pop(token, None)
 
+
+@dataclass
+class StreamTicket:
+    username: str
+    job_id: str
+    expires_at: datetime
+
+
+class StreamTicketManager:
+    """
+    任务事件流的一次性票据。EventSource 无法设置请求头，只能把凭据放在 URL 中，
+    这里用短时效、绑定单个任务、用后即废的票据代替长期有效的会话 Token，避免后者出现在访问日志与浏览历史中。
+    """
+
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._tickets: Dict[str, StreamTicket] = {}
+        self._lock = Lock()
+
+    def issue(self, username: str, job_id: str) -> str:
+        ticket = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        with self._lock:
+            # 顺带清理过期未用的票据
+            for key in [key for key, record in self._tickets.items() if record.expires_at < now]:
+                del self._tickets[key]
+            self._tickets[ticket] = StreamTicket(username=username, job_id=job_id, expires_at=now + self.ttl)
+        return ticket
+
+    def redeem(self, ticket: str, job_id: str) -> Optional[str]:
+        """校验并作废票据，返回签发时的用户名；票据不存在、已过期或不属于该任务时返回 None"""
+        if not ticket:
+            return None
+        with self._lock:
+            record = self._tickets.pop(ticket, None)
+        if not record or record.job_id != job_id or record.expires_at < datetime.utcnow():
+            return None
+        return record.username
@@ -3,19 +3,51 @@
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import tempfile
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import logic
 from excel_parser import MedicalExamParser
+from ocr_engines import OcrEngine, get_default_engine
+from ocr_stitching import StitchOptions, extract_stitched_schemes, plan_stitch_groups, stitch_images
+from text_normalization import normalization_cache_stats
 
 logger = logging.getLogger(__name__)
 
+# 并发 OCR 的线程数；每秒请求上限由引擎的 qps_limit 给出（百度见 MEC_OCR_QPS_LIMIT）
+OCR_MAX_WORKERS = int(os.getenv("MEC_OCR_MAX_WORKERS", "4"))
+# 相邻截图拼接后一次识别（MEC_OCR_STITCH=1 开启），None 表示逐张识别
+OCR_STITCH_OPTIONS = StitchOptions.from_env()
+
+# 项目分配模式：greedy 按 Excel 顺序贪心，optimal 为全局最优匹配；无效取值在启动时回退为 greedy
+COMPARISON_ASSIGNMENT = logic.resolve_assignment_mode(os.getenv("MEC_COMPARISON_ASSIGNMENT"), "MEC_COMPARISON_ASSIGNMENT")
+
+# 已解析 Excel 的缓存条数，0 表示关闭缓存
+EXCEL_CACHE_SIZE = int(os.getenv("MEC_EXCEL_CACHE_SIZE", "32"))
+
+# 上传限制（MB）：单张 OCR 图片、单次 OCR 批量总大小、Excel 文件；上传按块写入磁盘并同时计算摘要
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_IMAGE_UPLOAD_BYTES = int(float(os.getenv("MEC_MAX_IMAGE_UPLOAD_MB", "20")) * 1024 * 1024)
+MAX_BATCH_UPLOAD_BYTES = int(float(os.getenv("MEC_MAX_BATCH_UPLOAD_MB", "200")) * 1024 * 1024)
+MAX_EXCEL_UPLOAD_BYTES = int(float(os.getenv("MEC_MAX_EXCEL_UPLOAD_MB", "20")) * 1024 * 1024)
+
+# Excel 解析进程池大小（0 表示退化为在线程中解析）与单次解析超时（秒）
+EXCEL_PARSE_WORKERS = int(os.getenv("MEC_EXCEL_PARSE_WORKERS", "2"))
+EXCEL_PARSE_TIMEOUT = float(os.getenv("MEC_EXCEL_PARSE_TIMEOUT", "60"))
+
 
 @dataclass
 class ExcelParseResult:
@@ -23,12 +55,25 @@ class ExcelParseResult:
     sheet_order: List[str]
     scheme_names: List[str]
     scheme_catalog: List[Dict[str, Any]]
+    scheme_index: logic.SchemeIndex
 
 
 @dataclass
 class OCRImage:
     path: str
     name: str
+    # 上传落盘时顺带计算的内容摘要与字节数，供 OCR 结果缓存直接使用
+    sha256: Optional[str] = None
+    size: int = 0
+
+
+class UploadTooLarge(ValueError):
+    """上传内容超过大小限制"""
+
+    def __init__(self, filename: str, limit_bytes: int):
+        super().__init__(f"{filename} 超过大小限制（{limit_bytes / (1024 * 1024):.0f} MB）")
+        self.filename = filename
+        self.limit_bytes = limit_bytes
 
 
 def _normalize_excel_projects(categorized: Dict[str, Dict[str, List[Dict]]]) -> Dict[str, Dict[str, List[str]]]:
@@ -79,9 +124,240 @@ def parse_excel_file(excel_file: Path, rename_rules: List[List[str]], gender_rul
         sheet_order=parser.sheet_names_in_order,
         scheme_names=scheme_names,
         scheme_catalog=scheme_catalog,
+        scheme_index=logic.SchemeIndex(list(_build_scheme_lookup(excel_data).keys())),
     )
 
 
+def excel_cache_key(content_digest: str, rename_rules: List[List[str]], gender_rules: List[List[str]]) -> str:
+    """以工作簿内容摘要 + 重命名规则指纹作为缓存键，规则变更后自然失效"""
+    rules_blob = json.dumps([rename_rules or [], gender_rules or []], ensure_ascii=False, sort_keys=True)
+    rules_digest = hashlib.sha256(rules_blob.encode("utf-8")).hexdigest()
+    return f"{content_digest}:{rules_digest}"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExcelParseCache:
+    """
+    进程内 LRU 缓存，保存 ExcelParseResult；同一工作簿在规则不变时重复上传无需再次解析。
+
+    缓存的结果会被多个会话共享，调用方只读不改。
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, ExcelParseResult]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[ExcelParseResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: ExcelParseResult) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+excel_parse_cache = ExcelParseCache(EXCEL_CACHE_SIZE)
+
+
+class CompiledAliasCache:
+    """
+    每个用户一份编译后的别名规则（logic.CompiledAliases），以配置中的规则版本号判断是否有效；
+    规则变更后版本号改变，下一次请求重新编译。编译结果只读，多个 OCR 任务与工作线程共享同一份。
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, logic.CompiledAliases]] = {}
+
+    def get(self, username: str, version: int) -> Optional[logic.CompiledAliases]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, username: str, version: int, compiled: logic.CompiledAliases) -> None:
+        with self._lock:
+            self._entries[username] = (version, compiled)
+
+    def get_or_compile(
+        self,
+        username: str,
+        version: int,
+        load_rules: Callable[[], Tuple[Dict[str, List[List[str]]], int]],
+    ) -> logic.CompiledAliases:
+        """
+        命中时直接返回；未命中时调用 load_rules() 取 (规则, 版本号) 编译并缓存。
+        以 load_rules 返回的版本号入缓存，读取版本与读取规则之间发生的变更不会被记到旧版本下。
+        """
+        compiled = self.get(username, version)
+        if compiled is not None:
+            return compiled
+        rules, loaded_version = load_rules()
+        compiled = logic.compile_aliases(rules.get("aliases", []))
+        self.put(username, loaded_version, compiled)
+        logger.info("别名规则已编译 user=%s version=%d terms=%d", username, loaded_version, len(compiled))
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+compiled_alias_cache = CompiledAliasCache()
+
+
+class ExcelParseTimeout(Exception):
+    """Excel 解析超过时限，对应的工作进程已被回收"""
+
+
+class ExcelParsePool:
+    """
+    在独立进程中执行 parse_excel_file，避免 pandas 与状态机阻塞事件循环并绕开 GIL。
+
+    单次解析超时或工作进程崩溃时整体回收进程池，下一次调用会重新创建；
+    max_workers 为 0 时改在默认线程池中解析（无法强制中断，仅用于无法使用多进程的环境）。
+    """
+
+    def __init__(self, max_workers: int = 2, timeout: float = 60.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 服务进程中存在 OCR 等线程，fork 可能死锁，统一使用 spawn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        # shutdown 不会中断正在运行的任务，需要直接终止卡住的工作进程
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    async def parse(
+        self, excel_file: Path, rename_rules: List[List[str]], gender_rules: List[List[str]]
+    ) -> ExcelParseResult:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor() if self.max_workers > 0 else None
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(executor, parse_excel_file, excel_file, rename_rules, gender_rules), self.timeout
+            )
+        except asyncio.TimeoutError as exc:
+            logger.error("Excel 解析超时 (%.0fs)：%s", self.timeout, excel_file.name)
+            if executor is not None:
+                self._recycle(executor)
+            raise ExcelParseTimeout(f"Excel 解析超时（超过 {self.timeout:.0f} 秒）") from exc
+        except BrokenProcessPool:
+            logger.error("Excel 解析进程异常退出，回收解析进程池：%s", excel_file.name)
+            self._recycle(executor)
+            raise
+        logger.info("Excel 解析完成 %s 耗时=%.2fs", excel_file.name, time.perf_counter() - start)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+excel_parse_pool = ExcelParsePool(EXCEL_PARSE_WORKERS, EXCEL_PARSE_TIMEOUT)
+
+
+def parse_excel_file_cached(
+    excel_file: Path,
+    rename_rules: List[List[str]],
+    gender_rules: List[List[str]],
+    content_digest: Optional[str] = None,
+    cache: Optional[ExcelParseCache] = None,
+) -> ExcelParseResult:
+    """
+    带缓存的 parse_excel_file；content_digest 为文件内容的 SHA-256，调用方已计算时可直接传入。
+    """
+    cache = cache or excel_parse_cache
+    key = excel_cache_key(content_digest or file_sha256(excel_file), rename_rules, gender_rules)
+    result = cache.get(key)
+    if result is not None:
+        logger.info("Excel 解析缓存命中 %s %s", excel_file.name, cache.stats())
+        return result
+    result = parse_excel_file(excel_file, rename_rules, gender_rules)
+    cache.put(key, result)
+    return result
+
+
+async def parse_excel_file_async(
+    excel_file: Path,
+    rename_rules: List[List[str]],
+    gender_rules: List[List[str]],
+    content_digest: Optional[str] = None,
+    cache: Optional[ExcelParseCache] = None,
+    pool: Optional[ExcelParsePool] = None,
+) -> ExcelParseResult:
+    """
+    parse_excel_file_cached 的异步版本：缓存在当前进程内查询，未命中时交给解析进程池。
+    """
+    cache = cache or excel_parse_cache
+    pool = pool or excel_parse_pool
+    key = excel_cache_key(content_digest or file_sha256(excel_file), rename_rules, gender_rules)
+    result = cache.get(key)
+    if result is not None:
+        logger.info("Excel 解析缓存命中 %s %s", excel_file.name, cache.stats())
+        return result
+    result = await pool.parse(excel_file, rename_rules, gender_rules)
+    cache.put(key, result)
+    return result
+
+
 def _build_scheme_lookup(excel_data: Dict[str, Dict[str, List[str]]]) -> Dict[str, List[str]]:
     lookup: Dict[str, List[str]] = {}
     for sheet, categories in excel_data.items():
@@ -98,20 +374,35 @@ def _build_stats(comparison: List[Dict[str, Any]]) -> Dict[str, int]:
     }
 
 
-def evaluate_ocr_payload(
-    ocr_payload: List[Tuple[str, List[str]]],
+def evaluate_ocr_batch(
+    payloads: List[List[Tuple[str, List[str]]]],
     scheme_lookup: Dict[str, List[str]],
     alias_map: Dict[str, str],
-) -> List[Dict[str, Any]]:
-    scheme_names = list(scheme_lookup.keys())
-    results: List[Dict[str, Any]] = []
-    for ocr_title, ocr_items in ocr_payload:
+    scheme_index: Optional[logic.SchemeIndex] = None,
+    assignment: Optional[str] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    批量比对：payloads 为每张图片解析出的 [(OCR 标题, OCR 项目)]，返回与之对应的每张图片的比对结果。
+
+    整批的标题与项目各只归一一次，标题与全部方案、项目与全部 Excel 项目各打一次分，
+    结果与逐个方案调用 find_best_match / generate_comparison_report 完全相同。
+    """
+    scheme_index = scheme_index or logic.SchemeIndex(list(scheme_lookup.keys()))
+    assignment = assignment or COMPARISON_ASSIGNMENT
+    flat = [(position, title, items) for position, payload in enumerate(payloads) for title, items in payload]
+    matches = logic.find_best_matches([title for _, title, _ in flat], scheme_index)
+    matched_positions = [idx for idx, matched in enumerate(matches) if matched]
+    comparisons = logic.generate_comparison_reports(
+        [(scheme_lookup.get(matches[idx], []), flat[idx][2]) for idx in matched_positions], alias_map, assignment
+    )
+    comparison_of = dict(zip(matched_positions, comparisons))
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in payloads]
+    for idx, ((position, ocr_title, ocr_items), matched) in enumerate(zip(flat, matches)):
         display_title = ocr_title or "未识别标题"
-        logger.info("Comparing OCR title '%s' (items=%d)", display_title, len(ocr_items))
-        matched = logic.find_best_match(ocr_title, scheme_names) if ocr_title else None
         if not matched:
             logger.warning("No match for OCR title '%s'.", display_title)
-            results.append(
+            results[position].append(
                 {
                     "ocr_title": display_title,
                     "matched_scheme": None,
@@ -122,12 +413,13 @@ def evaluate_ocr_payload(
                 }
             )
             continue
-        excel_items = scheme_lookup.get(matched, [])
-        logger.info("Matched OCR title '%s' -> '%s' (%d 项)", display_title, matched, len(excel_items))
-        comparison = logic.generate_comparison_report(excel_items, ocr_items, alias_map)
+        logger.info(
+            "Matched OCR title '%s' -> '%s' (%d 项)", display_title, matched, len(scheme_lookup.get(matched, []))
+        )
+        comparison = comparison_of[idx]
         stats = _build_stats(comparison)
         status = "matched_perfect" if stats["missing"] == 0 and stats["extra"] == 0 else "matched_imperfect"
-        results.append(
+        results[position].append(
             {
                 "ocr_title": display_title,
                 "matched_scheme": matched,
@@ -139,6 +431,174 @@ def evaluate_ocr_payload(
     return results
 
 
+def evaluate_ocr_payload(
+    ocr_payload: List[Tuple[str, List[str]]],
+    scheme_lookup: Dict[str, List[str]],
+    alias_map: Dict[str, str],
+    scheme_index: Optional[logic.SchemeIndex] = None,
+    assignment: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """单张图片的比对，即只含一张图片的 evaluate_ocr_batch"""
+    return evaluate_ocr_batch([ocr_payload], scheme_lookup, alias_map, scheme_index, assignment)[0]
+
+
+class _RateLimiter:
+    """
+    简单的节流器：保证相邻两次 OCR 请求的发起间隔不小于 1/qps 秒。通过 get_rate_limiter 按账号共享。
+    """
+
+    def __init__(self, qps: float):
+        self.interval = 1.0 / qps if qps and qps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# (引擎名, 账号, qps) -> 节流器。配额按服务商账号计算，同一账号的所有任务共用一个节流器
+_rate_limiters: Dict[Tuple[str, str, float], _RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(engine: OcrEngine, api_key: str, qps: Optional[float]) -> _RateLimiter:
+    """
+    进程内共享的节流器：并发执行的多个 OCR 任务使用同一引擎与 API Key 时共用一个，
+    合计请求速率不超过配额。无需鉴权的引擎只按引擎名区分。
+    """
+    key = (engine.name, api_key if engine.requires_credentials else "", float(qps or 0))
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = _RateLimiter(key[2])
+        return limiter
+
+
+def _process_single_image(
+    image: OCRImage,
+    idx: int,
+    total: int,
+    access_token: str,
+    scheme_lookup: Dict[str, List[str]],
+    scheme_index: logic.SchemeIndex,
+    alias_map: Dict[str, str],
+    limiter: _RateLimiter,
+    client: OcrEngine,
+    cancel_event: Optional[threading.Event] = None,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, float]]:
+    """返回 (单图结果, 各阶段耗时)；任务已取消时单图结果为 None"""
+    if cancel_event is not None and cancel_event.is_set():
+        return None, {}
+    item_result: Dict[str, Any] = {
+        "image_name": image.name,
+        "index": idx,
+        "total": total,
+        "schemes": [],
+        "errors": [],
+    }
+    stage_spent: Dict[str, float] = {}
+    try:
+        start = time.perf_counter()
+        # 节流交给引擎在每次实际发出请求前执行，重试也计入配额，缓存命中不占用配额
+        ocr_json = client.recognize(access_token, image.path, image_sha256=image.sha256, throttle=limiter.acquire)
+        stage_spent["ocr_request"] = time.perf_counter() - start
+        if not ocr_json:
+            item_result["errors"].append("OCR无响应")
+        else:
+            start = time.perf_counter()
+            schemes = logic.extract_data_from_ocr_json(ocr_json)
+            stage_spent["json_parse"] = time.perf_counter() - start
+            if not schemes:
+                item_result["errors"].append("未识别到方案或项目")
+            else:
+                start = time.perf_counter()
+                comparisons = evaluate_ocr_payload(schemes, scheme_lookup, alias_map, scheme_index)
+                stage_spent["comparison"] = time.perf_counter() - start
+                item_result["schemes"] = comparisons
+    except Exception as exc:  # noqa: BLE001
+        item_result["errors"].append(str(exc))
+        return item_result, {}
+    if stage_spent:
+        dominant = max(stage_spent.items(), key=lambda item: item[1])
+        detail = ", ".join(f"{k}={v:.2f}s" for k, v in stage_spent.items())
+        logger.info("OCR耗时 image=%s [%s] | 最慢阶段=%s %.2fs", image.name, detail, dominant[0], dominant[1])
+    return item_result, stage_spent
+
+
+def _process_stitched_group(
+    group: List[Tuple[int, OCRImage]],
+    total: int,
+    access_token: str,
+    scheme_lookup: Dict[str, List[str]],
+    scheme_index: logic.SchemeIndex,
+    alias_map: Dict[str, str],
+    limiter: _RateLimiter,
+    client: OcrEngine,
+    stitch: StitchOptions,
+    cancel_event: Optional[threading.Event] = None,
+) -> List[Tuple[int, Tuple[Optional[Dict[str, Any]], Dict[str, float]]]]:
+    """
+    将一组相邻图片拼接后识别一次，再按图片拆分结果；返回 [(图片序号, (单图结果, 各阶段耗时))]。
+    拼接失败时退回逐张识别；整组耗时按图片数均摊，保证批次累计耗时不重复计算。
+    """
+    def one_by_one() -> List[Tuple[int, Tuple[Optional[Dict[str, Any]], Dict[str, float]]]]:
+        return [
+            (idx, _process_single_image(
+                image, idx, total, access_token, scheme_lookup, scheme_index, alias_map, limiter, client, cancel_event
+            ))
+            for idx, image in group
+        ]
+
+    if len(group) == 1 or (cancel_event is not None and cancel_event.is_set()):
+        return one_by_one()
+    stitched = stitch_images([image.path for _, image in group], stitch)
+    if stitched is None:
+        return one_by_one()
+    item_results = [
+        {"image_name": image.name, "index": idx, "total": total, "schemes": [], "errors": []} for idx, image in group
+    ]
+    stage_spent: Dict[str, float] = {}
+    label = f"{group[0][1].name} 等 {len(group)} 张拼接图"
+    try:
+        start = time.perf_counter()
+        ocr_json = client.recognize_with_location(access_token, stitched.data, label, throttle=limiter.acquire)
+        stage_spent["ocr_request"] = time.perf_counter() - start
+        if not ocr_json:
+            for item_result in item_results:
+                item_result["errors"].append("OCR无响应")
+        else:
+            start = time.perf_counter()
+            parsed = extract_stitched_schemes(ocr_json, stitched.spans)
+            stage_spent["json_parse"] = time.perf_counter() - start
+            start = time.perf_counter()
+            evaluated = evaluate_ocr_batch([schemes for schemes, _ in parsed], scheme_lookup, alias_map, scheme_index)
+            for item_result, (schemes, merged_into), comparisons in zip(item_results, parsed, evaluated):
+                if schemes:
+                    item_result["schemes"] = comparisons
+                elif merged_into is not None:
+                    # 本图只有上一张图片方案的延续部分，比对结果记在标题所在的图片中
+                    item_result["merged_into"] = group[merged_into][1].name
+                else:
+                    item_result["errors"].append("未识别到方案或项目")
+            stage_spent["comparison"] = time.perf_counter() - start
+    except Exception as exc:  # noqa: BLE001
+        for item_result in item_results:
+            item_result["errors"].append(str(exc))
+        return [(idx, (item_result, {})) for (idx, _), item_result in zip(group, item_results)]
+    detail = ", ".join(f"{k}={v:.2f}s" for k, v in stage_spent.items())
+    logger.info("OCR耗时 image=%s [%s]", label, detail)
+    shared = {key: value / len(group) for key, value in stage_spent.items()}
+    return [(idx, (item_result, dict(shared))) for (idx, _), item_result in zip(group, item_results)]
+
+
 def process_images_with_ocr(
     images: List[OCRImage],
     api_key: str,
@@ -146,69 +606,140 @@ def process_images_with_ocr(
     excel_data: Dict[str, Dict[str, List[str]]],
     alias_map: Dict[str, str],
     progress_callback: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    max_workers: Optional[int] = None,
+    qps_limit: Optional[float] = None,
+    ocr_client: Optional[OcrEngine] = None,
+    scheme_index: Optional[logic.SchemeIndex] = None,
+    cancel_event: Optional[threading.Event] = None,
+    stitch: Optional[StitchOptions] = None,
 ) -> List[Dict[str, Any]]:
-    if not api_key or not secret_key:
+    """
+    对图片批量执行 OCR 与比对。
+
+    max_workers > 1 时并发发起 OCR 请求，qps_limit 限制每秒请求数以满足服务商配额，默认取引擎的
+    qps_limit（本地识别与回放不限速）；
+    无论完成顺序如何，progress_callback 始终按图片顺序回传新完成的图片（只含增量，
+    依次拼接即为已完成的连续前缀），调用方可就地追加而无需每次复制整个列表。
+    ocr_client 默认使用 MEC_OCR_ENGINE 指定的进程内共享引擎，无需鉴权的引擎不校验密钥；
+    scheme_index 为上传 Excel 时预构建的方案索引。
+    cancel_event 置位后不再发起新的 OCR 请求，返回已完成的连续前缀。
+    stitch 默认取 MEC_OCR_STITCH* 配置，开启时相邻图片拼接后一次识别，报告仍按图片逐条给出。
+    """
+    client = ocr_client or get_default_engine()
+    if client.requires_credentials and (not api_key or not secret_key):
         raise ValueError("缺少百度OCR API密钥")
     if not excel_data:
         raise ValueError("请先上传并解析Excel方案后再执行OCR比对")
     scheme_lookup = _build_scheme_lookup(excel_data)
-    access_token = logic.get_baidu_ocr_access_token(api_key, secret_key)
+    scheme_index = scheme_index or logic.SchemeIndex(list(scheme_lookup.keys()))
+    access_token = client.get_access_token(api_key, secret_key)
     if not access_token:
         raise RuntimeError("获取百度OCR Access Token失败，请检查密钥配置")
 
+    stitch = stitch or OCR_STITCH_OPTIONS
+    if stitch and not client.supports_location:
+        logger.warning("OCR引擎 %s 不返回文字位置，拼接识别已关闭", client.name)
+        stitch = None
+    indexed = list(enumerate(images, start=1))
+    if stitch and len(images) > 1:
+        groups = [[indexed[pos] for pos in group] for group in plan_stitch_groups([image.path for image in images], stitch)]
+        logger.info("OCR拼接识别 images=%d requests=%d", len(images), len(groups))
+    else:
+        groups = [[item] for item in indexed]
+    workers = max(1, min(max_workers or OCR_MAX_WORKERS, len(groups) or 1))
+    limiter = get_rate_limiter(client, api_key, client.qps_limit if qps_limit is None else qps_limit)
+    total = len(images)
     report: List[Dict[str, Any]] = []
     stage_totals = {"ocr_request": 0.0, "json_parse": 0.0, "comparison": 0.0}
-    for idx, image in enumerate(images, start=1):
-        item_result: Dict[str, Any] = {
-            "image_name": image.name,
-            "index": idx,
-            "total": len(images),
-            "schemes": [],
-            "errors": [],
-        }
-        stage_spent: Dict[str, float] = {}
-        try:
-            start = time.perf_counter()
-            ocr_json = logic.get_ocr_result_from_baidu(access_token, image.path)
-            stage_spent["ocr_request"] = time.perf_counter() - start
-            if not ocr_json:
-                item_result["errors"].append("OCR无响应")
-            else:
-                start = time.perf_counter()
-                schemes = logic.extract_data_from_ocr_json(ocr_json)
-                stage_spent["json_parse"] = time.perf_counter() - start
-                if not schemes:
-                    item_result["errors"].append("未识别到方案或项目")
-                else:
-                    start = time.perf_counter()
-                    comparisons = evaluate_ocr_payload(schemes, scheme_lookup, alias_map)
-                    stage_spent["comparison"] = time.perf_counter() - start
-                    item_result["schemes"] = comparisons
-        except Exception as exc:  # noqa: BLE001
-            item_result["errors"].append(str(exc))
-        else:
+    pending: Dict[int, Tuple[Dict[str, Any], Dict[str, float]]] = {}
+    batch_start = time.perf_counter()
+
+    def flush_in_order() -> None:
+        flushed_from = len(report)
+        while len(report) + 1 in pending and pending[len(report) + 1][0] is not None:
+            item_result, stage_spent = pending.pop(len(report) + 1)
             for key, value in stage_spent.items():
                 stage_totals[key] = stage_totals.get(key, 0.0) + value
-            if stage_spent:
-                dominant = max(stage_spent.items(), key=lambda item: item[1])
-                detail = ", ".join(f"{k}={v:.2f}s" for k, v in stage_spent.items())
-                logger.info("OCR耗时 image=%s [%s] | 最慢阶段=%s %.2fs", image.name, detail, dominant[0], dominant[1])
-        report.append(item_result)
-        if progress_callback:
-            progress_callback([*report])
+            report.append(item_result)
+        if len(report) > flushed_from and progress_callback:
+            progress_callback(report[flushed_from:])
+
+    def process_group(group: List[Tuple[int, OCRImage]]) -> List[Tuple[int, Tuple[Optional[Dict[str, Any]], Dict[str, float]]]]:
+        if stitch and len(group) > 1:
+            return _process_stitched_group(
+                group, total, access_token, scheme_lookup, scheme_index, alias_map, limiter, client, stitch, cancel_event
+            )
+        idx, image = group[0]
+        return [(idx, _process_single_image(
+            image, idx, total, access_token, scheme_lookup, scheme_index, alias_map, limiter, client, cancel_event
+        ))]
+
+    if workers == 1:
+        for group in groups:
+            pending.update(process_group(group))
+            flush_in_order()
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as executor:
+            futures = [executor.submit(process_group, group) for group in groups]
+            for future in as_completed(futures):
+                pending.update(future.result())
+                flush_in_order()
     if any(stage_totals.values()):
         slowest = max(stage_totals.items(), key=lambda item: item[1])
         total_detail = ", ".join(f"{k}={v:.2f}s" for k, v in stage_totals.items())
         logger.info("OCR总耗时统计 [%s] | 累计最慢阶段=%s %.2fs", total_detail, slowest[0], slowest[1])
+    if cancel_event is not None and cancel_event.is_set():
+        logger.info("OCR批次已取消 completed=%d/%d", len(report), total)
+    logger.info(
+        "OCR批次完成 images=%d groups=%d workers=%d 实际耗时=%.2fs",
+        total, len(groups), workers, time.perf_counter() - batch_start,
+    )
+    result_cache = getattr(client, "result_cache", None)
+    if result_cache is not None:
+        logger.info("OCR结果缓存 %s", result_cache.stats())
+    stats = normalization_cache_stats()
+    logger.info(
+        "名称归一化缓存 hits=%d misses=%d entries=%d hit_rate=%.2f",
+        stats["hits"], stats["misses"], stats["entries"], stats["hit_rate"],
+    )
     return report
 
 
-def persist_upload(temp_dir: Path, filename: str, content: bytes) -> OCRImage:
+async def persist_upload_stream(
+    temp_dir: Path,
+    upload: Any,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Optional[OCRImage]:
+    """
+    将上传文件（需提供 filename 与异步 read(size)，如 FastAPI 的 UploadFile）按块写入 temp_dir，
+    同一遍读取中计算 SHA-256，内存中最多只保留一个块。
+
+    超过 max_bytes 时删除已写入的部分并抛出 UploadTooLarge；文件为空时返回 None。
+    """
+    filename = upload.filename or "upload.bin"
     suffix = Path(filename).suffix or ".bin"
     handle = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=temp_dir)
-    with handle:
-        handle.write(content)
-    return OCRImage(path=handle.name, name=filename or Path(handle.name).name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with handle:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(filename, max_bytes)
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        Path(handle.name).unlink(missing_ok=True)
+        raise
+    if not size:
+        Path(handle.name).unlink(missing_ok=True)
+        return None
+    return OCRImage(path=handle.name, name=filename, sha256=digest.hexdigest(), size=size)
 
 
 def cleanup_images(images: List[OCRImage]) -> None:
@@ -0,0 +1,313 @@
+"""
+后台 OCR 任务：提交后立即返回任务 ID，由后台线程执行批量识别与比对，
+前端按任务 ID 查询状态、逐图结果或取消任务，也可订阅任务变化以推送进度。
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 同时执行的任务数（每个任务内部仍按 MEC_OCR_MAX_WORKERS 并发请求 OCR）与已结束任务的保留时长（秒）
+JOB_MAX_WORKERS = int(os.getenv("MEC_OCR_JOB_WORKERS", "2"))
+JOB_RETENTION_SECONDS = float(os.getenv("MEC_OCR_JOB_RETENTION", "3600"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATUSES = frozenset([JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED])
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+@dataclass
+class OcrJob:
+    job_id: str
+    username: str
+    total: int
+    status: str = JOB_QUEUED
+    created_at: str = field(default_factory=_utc_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    # 按图片顺序就地追加的结果；序号 seq 即已完成图片数，单调递增
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    future: Optional[Future] = None
+    # 结束时刻（monotonic），用于计算保留期
+    finished_monotonic: Optional[float] = None
+    # 订阅者：(事件循环, 队列)，任务在后台线程中变化时通过 call_soon_threadsafe 唤醒
+    _subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = field(default_factory=list, repr=False)
+    _subscribers_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _results_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    # 状态与起止时间一起变更、一起读取，读到结束状态时 finished_at 一定已设置
+    _state_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def seq(self) -> int:
+        return len(self.results)
+
+    def mark_running(self) -> None:
+        with self._state_lock:
+            self.started_at = _utc_now()
+            self.status = JOB_RUNNING
+
+    def mark_finished(self, status: str) -> None:
+        with self._state_lock:
+            self.finished_at = _utc_now()
+            self.finished_monotonic = time.monotonic()
+            self.status = status
+
+    def append_results(self, items: List[Dict[str, Any]]) -> None:
+        """progress_callback：按图片顺序追加新完成的图片"""
+        if not items:
+            return
+        with self._results_lock:
+            self.results.extend(items)
+        self.notify()
+
+    def finalize_results(self, report: List[Dict[str, Any]]) -> None:
+        """任务结束时补齐未经 progress_callback 回传的结果，已有结果保持不变"""
+        with self._results_lock:
+            missing = report[len(self.results):]
+        self.append_results(missing)
+
+    def results_since(self, since: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """返回 (序号 since 之后完成的结果, 当前序号)"""
+        with self._results_lock:
+            return self.results[max(0, since):], len(self.results)
+
+    def subscribe(self) -> asyncio.Queue:
+        """在事件循环中调用，返回的队列在任务变化时收到一个 None 作为唤醒信号"""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._subscribers_lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._subscribers_lock:
+            self._subscribers = [item for item in self._subscribers if item[1] is not queue]
+
+    def notify(self) -> None:
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except RuntimeError:
+                # 事件循环已关闭，订阅者随连接一起失效
+                self.unsubscribe(queue)
+
+    def to_public_dict(self) -> Dict[str, Any]:
+        with self._state_lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "total": self.total,
+                "completed": self.seq,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """
+    进程内任务表。任务只对提交者可见；已结束的任务超过保留期后在下一次访问时清理。
+    """
+
+    def __init__(self, max_workers: int = 2, retention_seconds: float = 3600.0):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ocr-job")
+        self._jobs: Dict[str, OcrJob] = {}
+        # 任务 ID -> cleanup，供关闭时处理从未开始执行的任务
+        self._cleanups: Dict[str, Optional[Callable[[], None]]] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        username: str,
+        total: int,
+        runner: Callable[[OcrJob], List[Dict[str, Any]]],
+        cleanup: Optional[Callable[[], None]] = None,
+    ) -> OcrJob:
+        """
+        登记任务并放入后台执行；runner(job) 返回最终报告，执行期间可通过 job.append_results 回传进度，
+        并应在 job.cancel_event 置位后尽快返回。cleanup 在任务结束后调用（如删除临时图片）。
+        """
+        self.purge_expired()
+        job = OcrJob(job_id=uuid.uuid4().hex, username=username, total=total)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._cleanups[job.job_id] = cleanup
+        job.future = self._executor.submit(self._run, job, runner, cleanup)
+        logger.info("OCR任务已提交 job=%s user=%s images=%d", job.job_id, username, total)
+        return job
+
+    def _run(
+        self,
+        job: OcrJob,
+        runner: Callable[[OcrJob], List[Dict[str, Any]]],
+        cleanup: Optional[Callable[[], None]],
+    ) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        # 最终状态在 _finish 中与结束时间一起写入
+        final_status = JOB_FAILED
+        try:
+            if job.cancel_event.is_set():
+                final_status = JOB_CANCELLED
+                return job.results
+            job.mark_running()
+            job.notify()
+            report = runner(job)
+            job.finalize_results(report)
+            final_status = JOB_CANCELLED if job.cancel_event.is_set() else JOB_COMPLETED
+            return report
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("OCR任务失败 job=%s", job.job_id)
+            job.error = str(exc)
+            return job.results
+        finally:
+            with self._lock:
+                self._cleanups.pop(job.job_id, None)
+            self._finish(job, final_status, cleanup)
+            logger.info(
+                "OCR任务结束 job=%s status=%s completed=%d/%d 耗时=%.2fs",
+                job.job_id, job.status, len(job.results), job.total, time.perf_counter() - start,
+            )
+
+    @staticmethod
+    def _finish(job: OcrJob, status: str, cleanup: Optional[Callable[[], None]]) -> None:
+        job.mark_finished(status)
+        if cleanup:
+            try:
+                cleanup()
+            except Exception:  # noqa: BLE001
+                logger.warning("OCR任务清理失败 job=%s", job.job_id, exc_info=True)
+        job.notify()
+
+    def get(self, username: str, job_id: str) -> Optional[OcrJob]:
+        self.purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.username != username:
+            return None
+        return job
+
+    def list_jobs(self, username: str) -> List[OcrJob]:
+        self.purge_expired()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.username == username]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, username: str, job_id: str) -> Optional[OcrJob]:
+        """请求取消；排队中的任务不再执行，运行中的任务在当前图片完成后停止"""
+        job = self.get(username, job_id)
+        if job is None:
+            return None
+        if not job.finished:
+            job.cancel_event.set()
+            job.notify()
+            logger.info("OCR任务取消请求 job=%s", job_id)
+        return job
+
+    def remove(self, username: str, job_id: str) -> bool:
+        """删除已结束的任务；运行中的任务需先取消"""
+        job = self.get(username, job_id)
+        if job is None or not job.finished:
+            return False
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        return True
+
+    def purge_expired(self) -> int:
+        if self.retention_seconds < 0:
+            return 0
+        deadline = time.monotonic() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished and job.finished_monotonic is not None and job.finished_monotonic <= deadline
+            ]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+        if expired:
+            logger.info("已清理过期OCR任务 %d 个", len(expired))
+        return len(expired)
+
+    def shutdown(self) -> None:
+        """取消全部任务；排队中的任务不再执行，直接标记为已取消并执行 cleanup"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for job in jobs:
+            if job.future is None or not job.future.cancelled():
+                continue
+            with self._lock:
+                cleanup = self._cleanups.pop(job.job_id, None)
+            self._finish(job, JOB_CANCELLED, cleanup)
+            logger.info("OCR任务未执行即取消 job=%s", job.job_id)
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_job_events(job: OcrJob, after: int = 0, heartbeat_seconds: float = 15.0) -> AsyncIterator[str]:
+    """
+    以 Server-Sent Events 推送任务进度：每完成一张图片发送一条 result 事件（仅该图片的结果），
+    状态变化时发送 status 事件，任务结束后发送 end 事件并关闭。
+
+    after 为客户端已收到的图片数，断线重连时只补发其后的结果；空闲时定期发送注释行保持连接。
+    """
+    queue = job.subscribe()
+    sent = max(0, after)
+    last_status: Optional[Dict[str, Any]] = None
+    try:
+        while True:
+            new_items, seq = job.results_since(sent)
+            for item in new_items:
+                yield _sse_event("result", item)
+            sent = max(sent, seq)
+            status = {**job.to_public_dict(), "completed": seq}
+            if status != last_status:
+                last_status = status
+                yield _sse_event("status", status)
+            if job.finished and sent >= job.seq:
+                yield _sse_event("end", status)
+                return
+            try:
+                await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            # 合并积压的唤醒信号，下一轮一次性发送全部新增结果
+            while not queue.empty():
+                queue.get_nowait()
+    finally:
+        job.unsubscribe(queue)
+
+
+job_manager = JobManager(JOB_MAX_WORKERS, JOB_RETENTION_SECONDS)
@@ -1,5 +1,5 @@
 """
-用户会话管理：负责在一次登录周期内缓存 Excel 解析结果与最新比对记录。
+用户会话管理：负责在一次登录周期内缓存 Excel 解析结果与最近一次 OCR 任务。
 """
 from __future__ import annotations
 
@@ -15,7 +15,10 @@ class SessionState:
     excel_sheet_order: List[str] = field(default_factory=list)
     last_excel_filename: Optional[str] = None
     last_excel_uploaded_at: Optional[str] = None
-    latest_results: List[Dict[str, Any]] = field(default_factory=list)
+    # 最近一次提交的 OCR 任务，比对结果由 job_manager 保存
+    latest_job_id: Optional[str] = None
+    # 上传 Excel 时预构建的方案索引（logic.SchemeIndex），供 OCR 标题匹配复用
+    scheme_index: Optional[Any] = None
 
     def to_public_dict(self) -> Dict[str, Any]:
         return {
@@ -23,7 +26,7 @@ class SessionState:
             "sheet_order": self.excel_sheet_order,
             "last_excel_filename": self.last_excel_filename,
             "last_excel_uploaded_at": self.last_excel_uploaded_at,
-            "latest_results": self.latest_results,
+            "latest_job_id": self.latest_job_id,
         }
 
 
@@ -46,9 +49,11 @@ class SessionManager:
         excel_data: Dict[str, Dict[str, List[str]]],
         sheet_order: List[str],
         filename: str,
+        scheme_index: Optional[Any] = None,
     ) -> SessionState:
         state = self._get_or_create(username)
         state.excel_data = excel_data
+        state.scheme_index = scheme_index
         state.excel_sheet_order = sheet_order
         state.last_excel_filename = filename
         state.last_excel_uploaded_at = datetime.utcnow().isoformat() + "Z"
@@ -57,10 +62,9 @@ class SessionManager:
     def get_excel_payload(self, username: str) -> SessionState:
         return self._get_or_create(username)
 
-    def update_results(self, username: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def set_latest_job(self, username: str, job_id: Optional[str]) -> None:
         state = self._get_or_create(username)
-        state.latest_results = results
-        return results
+        state.latest_job_id = job_id
 
     def reset(self, username: str) -> None:
         with self._lock: